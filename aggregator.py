@@ -0,0 +1,821 @@
+# ---------------------------------------------------------------
+# 誠致 2025 敬業度調查 - 增量彙總 (Streaming Aggregation)
+# 表單回覆檔只會持續增加：只讀取新增的列，並累加到既有的充分統計量，
+# 不必每次都從頭重算 N/Mean/SD/Median/Min/Max。
+# ---------------------------------------------------------------
+
+import hashlib
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import datacache
+import derived
+import dtypes
+import ingest
+import preprocess
+import privacy
+
+# 檢查檔案是否被「改寫」(而非單純附加) 時，比對的尾端位元組數
+TAIL_FINGERPRINT_BYTES = 64
+# 增量讀入的列數累積超過此值時，重新寫一次欄式快取
+CACHE_SNAPSHOT_ROWS = 500
+# 組間差異檢定結果的磁碟快取 (依資料版本與檢定參數命名)
+TESTS_CACHE_DIR = os.path.join(datacache.CACHE_DIR, "tests")
+# 衍生結果的相依關係 (見 derived.py)：輸入為 responses (回覆資料版本) 與 schema (題號與欄位分類)
+DERIVED_DEPENDENCIES = {
+    "overall": ["responses", "schema"],
+    "group": ["responses", "schema"],
+    "seniority": ["responses", "schema"],
+    "grouped": ["group", "seniority"],
+    "suppressed": ["grouped"],
+    "intervals": ["suppressed"],
+    "tests": ["responses", "schema"],
+    "scale_scores": ["responses", "schema"],
+    "scale_reliability": ["responses", "schema"],
+    "scale_stats": ["scale_scores"],
+    "correlations": ["responses", "schema"],
+}
+
+
+class RunningStats:
+    """
+    單一分群維度 (整體 / Q2 / Q4_grouped) 的充分統計量。
+    每個 (組別, 題目) 保存 count, sum, sum of squares, min, max，
+    以及一個「數值 -> 次數」的分佈 sketch 用來求中位數。
+    問卷的數值皆為有限個選項 (Likert 0-4、年資、0-10 分)，因此 sketch 的大小
+    只與選項數有關，與回覆筆數無關，中位數也是精確值。
+    """
+
+    def __init__(self, groups, questions):
+        self.groups = list(groups)
+        self.questions = list(questions)
+        shape = (len(self.groups), len(self.questions))
+        self.rows = np.zeros(len(self.groups), dtype=np.int64)
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.sum = np.zeros(shape)
+        self.sumsq = np.zeros(shape)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+        self.hist = [[{} for _ in self.questions] for _ in self.groups]
+        self._group_index = {g: i for i, g in enumerate(self.groups)}
+
+    def update(self, values, group_labels=None):
+        """
+        將一批新的列累加進來。
+        values: (列數, 題目數) 的 float 陣列，NaN 代表未填答。
+        group_labels: 每一列的組別；None 代表整體 (只有一組)。
+        不在 groups 內的列會被略過 (與 R 腳本的 filter 相同)。
+        """
+        if group_labels is None:
+            codes = np.zeros(len(values), dtype=np.intp)
+        else:
+            codes = pd.Series(group_labels).map(self._group_index).to_numpy(dtype=float)
+            keep = ~np.isnan(codes)
+            values, codes = values[keep], codes[keep].astype(np.intp)
+        if len(values) == 0:
+            return
+
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
+
+        # (1) count / sum / sumsq：以組別代碼一次累加
+        np.add.at(self.rows, codes, 1)
+        np.add.at(self.count, codes, present.astype(np.int64))
+        np.add.at(self.sum, codes, filled)
+        np.add.at(self.sumsq, codes, filled * filled)
+
+        # (2) min / max
+        np.minimum.at(self.min, codes, np.where(present, values, np.inf))
+        np.maximum.at(self.max, codes, np.where(present, values, -np.inf))
+
+        # (3) 分佈 sketch：逐題把 (組別, 數值) 編成一個整數鍵 (組別 * 選項數 + 選項代碼)，
+        #     以 bincount 一次計數 (不排序；暫存陣列只與列數有關)，迴圈只走過有次數的格子
+        n_groups = len(self.groups)
+        for q in range(values.shape[1]):
+            answered = present[:, q]
+            if not answered.any():
+                continue
+            level_codes, levels = pd.factorize(values[answered, q])
+            keys = codes[answered] * len(levels) + level_codes
+            counts = np.bincount(keys, minlength=n_groups * len(levels))
+            for key in np.flatnonzero(counts):
+                g, level = divmod(int(key), len(levels))
+                bucket = self.hist[g][q]
+                v = float(levels[level])
+                bucket[v] = bucket.get(v, 0) + int(counts[key])
+
+    def _median(self, g, q):
+        """
+        由分佈 sketch 求中位數 (偶數筆時取中間兩數平均，與 R 的 median 相同)。
+        """
+        bucket = self.hist[g][q]
+        n = self.count[g, q]
+        if n == 0:
+            return np.nan
+        levels = sorted(bucket)
+        cum = np.cumsum([bucket[v] for v in levels])
+        lower = levels[np.searchsorted(cum, (n - 1) // 2 + 1)]
+        upper = levels[np.searchsorted(cum, n // 2 + 1)]
+        return (lower + upper) / 2
+
+    def quantile(self, g, q, p):
+        """
+        由分佈 sketch 求任意分位數 (R 預設的 type 7 線性內插)。
+        """
+        bucket = self.hist[g][q]
+        n = self.count[g, q]
+        if n == 0:
+            return np.nan
+        levels = sorted(bucket)
+        cum = np.cumsum([bucket[v] for v in levels])
+        h = (n - 1) * p
+        lo, hi = int(np.floor(h)), int(np.ceil(h))
+        v_lo = levels[np.searchsorted(cum, lo + 1)]
+        v_hi = levels[np.searchsorted(cum, hi + 1)]
+        return v_lo + (h - lo) * (v_hi - v_lo)
+
+    def to_frame(self):
+        """
+        轉為 (組別, 題目) 的長表格，欄位為 N/Mean/SD/Median/Min/Max。
+        """
+        n = self.count.astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sum / n
+            var = (self.sumsq - self.sum * mean) / (n - 1)
+        var = np.where(n > 1, np.maximum(var, 0.0), np.nan)
+        mean = np.where(n > 0, mean, np.nan)
+
+        median = np.array([
+            [self._median(g, q) for q in range(len(self.questions))]
+            for g in range(len(self.groups))
+        ])
+
+        index = pd.MultiIndex.from_product([self.groups, self.questions])
+        return pd.DataFrame({
+            "N": self.count.ravel(),
+            "Mean": mean.ravel(),
+            "SD": np.sqrt(var).ravel(),
+            "Median": median.ravel(),
+            "Min": self.min.ravel(),
+            "Max": self.max.ravel(),
+        }, index=index)
+
+
+class StreamingAggregator:
+    """
+    同時維護「整體」、「依 Q2 組別」、「依 Q4 年資」三組充分統計量，
+    輸出與 preprocess.describe_numeric / describe_dimensions 相同格式的表格。
+    """
+
+    def __init__(self, codebook, col_types):
+        self.codebook = codebook
+        self.col_types = col_types
+        self.numeric_cols = preprocess.numeric_analysis_columns(col_types)
+        self.seniority_cols = [c for c in self.numeric_cols if c != "Q4"]
+        self.n_rows = 0
+
+        self.overall = RunningStats(["All"], self.numeric_cols)
+        self.by_group = RunningStats(sorted(preprocess.TARGET_GROUPS), self.numeric_cols)
+        self.by_seniority = RunningStats(preprocess.TARGET_SENIORITY_GROUPS, self.seniority_cols)
+
+    def update(self, df_cleaned):
+        """
+        累加一批「已清理」的資料列 (preprocess.clean_data 的輸出)。
+        """
+        values = df_cleaned[self.numeric_cols].to_numpy(dtype=float)
+        self.overall.update(values)
+        self.by_group.update(values, df_cleaned["Q2"])
+
+        seniority = preprocess.seniority_labels(df_cleaned["Q4"])
+        sen_idx = [self.numeric_cols.index(c) for c in self.seniority_cols]
+        self.by_seniority.update(values[:, sen_idx], seniority)
+        self.n_rows += len(df_cleaned)
+
+    def _finish(self, stats, group_col=None):
+        frame = stats.to_frame()
+        frame.index.names = ["_group", "New_Column"]
+        frame = frame.reset_index()
+        if group_col is not None:
+            # 比照 R 的 group_by：沒有任何回覆的組別不會出現在結果中
+            observed = [g for g, n in zip(stats.groups, stats.rows) if n > 0]
+            frame = frame[frame["_group"].isin(observed)]
+        frame = frame.merge(self.codebook, on="New_Column", how="left")
+        frame["_q_key"] = preprocess.q_sort_key(frame["New_Column"])
+        frame["_group_key"] = frame["_group"].map({g: i for i, g in enumerate(stats.groups)})
+        frame = frame.sort_values(["_group_key", "_q_key"], kind="stable")
+
+        columns = ["New_Column", "Original_Column"] + preprocess.STAT_COLUMNS
+        if group_col is not None:
+            frame = frame.rename(columns={"_group": group_col})
+            columns = [group_col] + columns
+        return frame[columns].reset_index(drop=True)
+
+    def overall_stats(self):
+        """對應 df_overall / numeric_descriptive_stats.csv"""
+        return self._finish(self.overall)
+
+    def group_stats(self):
+        """對應 df_group / grouped_numeric_stats_by_Q2.csv"""
+        return self._finish(self.by_group, "Q2")
+
+    def seniority_stats(self):
+        """對應 df_seniority / grouped_numeric_stats_by_Q4.csv"""
+        return self._finish(self.by_seniority, "Q4_grouped")
+
+
+class DistributionIndex:
+    """
+    每一題的選項次數分配索引：整體、依 Q2 組別、依 Q4 年資各一份。
+    次數可直接相加，新回覆進來時只累加新增的列；
+    佔比與 Wilson 95% 信賴區間在次數表 (大小只與選項數有關) 上一次算完。
+    查詢某一題只是字典查表 + 切片，不需再掃描原始資料。
+    """
+
+    ALL = "全體"
+    DIMENSIONS = ["All", "Q2", "Q4_grouped"]
+    KEY_COLUMNS = ["Dimension", "Group", "New_Column", "Value"]
+
+    def __init__(self, questions, numeric_questions=()):
+        self.questions = list(questions)
+        self.numeric_questions = set(numeric_questions)
+        self.option_orders = {} # 題號 -> 選項順序 (由原始資料的 Categorical 類別而來)
+        self.counts = pd.Series(
+            dtype="int64", index=pd.MultiIndex.from_tuples([], names=self.KEY_COLUMNS)
+        )
+        self._table = None
+        self._slices = None
+
+    @staticmethod
+    def _option_labels(series):
+        """
+        選項轉為文字：數值題的整數值不帶小數點 (4.0 -> "4", 2.5 -> "2.5")。
+        只對「不同的值」做格式化，再以字典對應回每一列。
+        """
+        if not pd.api.types.is_numeric_dtype(series):
+            return series
+        mapping = {v: f"{v:g}" for v in series.dropna().unique()}
+        return series.map(mapping)
+
+    def record_orders(self, df_raw):
+        """
+        記錄各題的選項順序 (df_raw 中以 Categorical 保存的題目，見 dtypes.option_order)。
+        """
+        for q in self.questions:
+            if isinstance(df_raw[q].dtype, pd.CategoricalDtype):
+                known = self.option_orders.get(q, [])
+                self.option_orders[q] = dtypes.option_order(q, known + list(df_raw[q].cat.categories))
+        self._table = None
+
+    def update(self, df_raw, df_cleaned):
+        """
+        累加一批原始資料列 (df_raw 提供選項文字，df_cleaned 提供 Q4 年資分組)。
+        """
+        self.record_orders(df_raw)
+        labels = pd.DataFrame(
+            {q: self._option_labels(df_raw[q]) for q in self.questions}, index=df_raw.index
+        )
+        long = labels.melt(ignore_index=False, var_name="New_Column", value_name="Value")
+        long = long.dropna(subset=["Value"])
+
+        groupings = {
+            "All": pd.Series(self.ALL, index=df_raw.index),
+            "Q2": df_raw["Q2"],
+            "Q4_grouped": preprocess.seniority_labels(df_cleaned["Q4"]),
+        }
+        parts = []
+        for dimension, group in groupings.items():
+            counts = long.groupby(
+                [group.reindex(long.index).to_numpy(), long["New_Column"], long["Value"]],
+                sort=False,
+                dropna=True,
+            ).size()
+            parts.append(pd.concat({dimension: counts}, names=["Dimension"]))
+
+        new_counts = pd.concat(parts)
+        new_counts.index.names = self.KEY_COLUMNS
+        self.counts = self.counts.add(new_counts, fill_value=0).astype("int64")
+        self._table = None
+
+    @classmethod
+    def from_frame(cls, frame, questions, numeric_questions=()):
+        """
+        由 counts_frame() 的輸出 (例如從快取讀回) 重建索引。
+        """
+        index = cls(questions, numeric_questions)
+        index.counts = frame.set_index(cls.KEY_COLUMNS)["Count"].astype("int64")
+        return index
+
+    def counts_frame(self):
+        return self.counts.rename("Count").reset_index()
+
+    def _build(self):
+        """
+        計算 N、佔比、Wilson 信賴區間，並排序、建立 (維度, 組別, 題目) -> 列範圍 的查表字典。
+        """
+        import analysis
+
+        table = self.counts_frame()
+        keys = ["Dimension", "Group", "New_Column"]
+        table["N"] = table.groupby(keys)["Count"].transform("sum")
+        table["Proportion"] = table["Count"] / table["N"]
+        table["CI_Low"], table["CI_High"] = analysis.wilson_interval(table["Count"], table["N"])
+
+        # 排序：數值題依數值大小，文字題依選項順序 (Likert 依開頭數字、Q4 / Q100 依編碼表)，
+        # 沒有記錄順序的選項依文字
+        is_numeric = table["New_Column"].isin(self.numeric_questions)
+        table["_num_key"] = pd.to_numeric(table["Value"].where(is_numeric), errors="coerce")
+        positions = pd.Series(
+            {(q, v): i for q, order in self.option_orders.items() for i, v in enumerate(order)}, dtype=float
+        )
+        keys_index = pd.MultiIndex.from_frame(table[["New_Column", "Value"]])
+        table["_opt_key"] = positions.reindex(keys_index).to_numpy() if len(positions) else np.nan
+        table["_q_key"] = preprocess.q_sort_key(table["New_Column"])
+        table["_dim_key"] = table["Dimension"].map({d: i for i, d in enumerate(self.DIMENSIONS)})
+        table = table.sort_values(
+            ["_dim_key", "Group", "_q_key", "_num_key", "_opt_key", "Value"], kind="stable"
+        ).reset_index(drop=True)
+        table = table.drop(columns=["_num_key", "_opt_key", "_q_key", "_dim_key"])
+
+        self._slices = {
+            key: (rows.min(), rows.max() + 1)
+            for key, rows in table.groupby(keys, sort=False).indices.items()
+        }
+        self._table = table
+
+    def get(self, question, dimension="All", group=ALL):
+        """
+        取得某一題 (可指定組別) 的選項分配：Value, Count, N, Proportion, CI_Low, CI_High。
+        """
+        if self._table is None:
+            self._build()
+        span = self._slices.get((dimension, group, question))
+        if span is None:
+            return self._table.iloc[0:0]
+        return self._table.iloc[span[0]:span[1]]
+
+    def groups(self, dimension, k=None, question=None):
+        """
+        某個維度下有資料的組別 (依 Q2 / Q4_grouped 切片時使用)。
+        k：只列出可公開切片的組別 (privacy.public_groups：人數少於 k 的組別與互補隱藏的組別除外)，
+        避免切片後的選項分配直接、或由「全體 - 其他組別」透露個人的回答。
+        question：只看這一題的作答人數；未指定時任何一題被隱藏的組別都不列出 (例如回饋篩選)。
+        """
+        counts = self.counts[self.counts.index.get_level_values("Dimension") == dimension]
+        if question is not None:
+            counts = counts[counts.index.get_level_values("New_Column") == question]
+        values = counts.index.get_level_values("Group").unique()
+        if k is not None:
+            sizes = counts.groupby(level=["Group", "New_Column"]).sum().rename("N").reset_index()
+            values = privacy.public_groups(sizes.rename(columns={"Group": dimension}), dimension, k)
+        if dimension == "Q4_grouped":
+            return [g for g in preprocess.TARGET_SENIORITY_GROUPS if g in set(values)]
+        return sorted(values)
+
+
+class SurveyStream:
+    """
+    追蹤原始表單 CSV：第一次完整載入，之後只讀取檔案尾端新增的位元組，
+    清理後累加到 StreamingAggregator，並附加到 raw / cleaned 資料表。
+    若偵測到檔案被改寫 (變短或尾端內容不同)，則自動完整重新載入。
+    傳入 cache (datacache.FrameCache) 時，冷啟動會優先從欄式快取讀回資料表。
+    傳入 registry (store.QuestionRegistry) 時以題目文字對應穩定題號 (多年度共用同一套 Q 編號)。
+    傳入 schema (codebook 的 DataFrame 或檔案路徑) 時，完整載入前先以 ingest.read_export 驗證欄位；
+    沒有 schema 時，檔案被改寫而重新載入的那一次會以「上一次的 codebook」驗證。
+    驗證結果存在 ingest_report；policy="reject" 時欄位不一致會丟出 ingest.SchemaError。
+    """
+
+    def __init__(self, path=preprocess.RAW_FILE, cache=None, registry=None, wave=None,
+                 schema=None, policy=ingest.DRIFT_POLICY):
+        self.path = path
+        self.cache = cache
+        self.registry = registry
+        self.wave = wave
+        self.schema = schema
+        self.policy = policy
+        self.ingest_report = None
+        self._cache_key = "raw_" + hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+        self._lock = threading.RLock() # 衍生結果的 build 可能再讀取其他已快取的結果
+        self.derived = derived.DerivedCache(DERIVED_DEPENDENCIES)
+        if self._load_from_cache():
+            self.refresh() # 快取之後新增的回覆
+        else:
+            self._full_load()
+
+    def _new_distribution_index(self, frame=None):
+        # 選項分配只對「有固定選項」的題目建立 (數值、Likert、類別題)，不含開放題
+        questions = preprocess.numeric_analysis_columns(self.col_types) + self.col_types["categorical"]
+        if frame is not None:
+            return DistributionIndex.from_frame(frame, questions, self.col_types["numeric"])
+        return DistributionIndex(questions, self.col_types["numeric"])
+
+    def _set_state(self, codebook, col_types, raw, cleaned, offset, tail, distributions=None):
+        self.codebook = codebook
+        self.col_types = col_types
+        self._raw_chunks = [raw]
+        self._cleaned_chunks = [cleaned]
+
+        self.aggregator = StreamingAggregator(self.codebook, self.col_types)
+        self.aggregator.update(cleaned)
+        self._snapshot_rows = self.aggregator.n_rows
+
+        if distributions is None:
+            distributions = self._new_distribution_index()
+            distributions.update(raw, cleaned)
+        self.distributions = distributions
+
+        self.offset = offset
+        self._tail = tail
+        self.derived.set_input("schema", self._schema_fingerprint())
+        self.derived.set_input("responses", self.data_version)
+
+    def _schema_fingerprint(self):
+        text = self.codebook.to_csv(index=False) + repr(sorted(self.col_types.items()))
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+    # --- 完整載入 ---
+    def _full_load(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        expected = self._expected_schema()
+        df_raw, self.ingest_report = ingest.read_export(data, expected, policy=self.policy)
+        results = preprocess.run_pipeline(df_raw=df_raw, registry=self.registry, wave=self.wave)
+        if self.registry is not None and self.registry.dirty:
+            self.registry.save() # 有新題目 -> 寫回題號登錄表
+        self.source_columns = self._source_columns(expected, results["codebook"])
+        self._set_state(
+            results["codebook"],
+            results["col_types"],
+            dtypes.compact_raw(results["raw"], results["col_types"]),
+            dtypes.compact_cleaned(results["cleaned"], results["col_types"]),
+            len(data),
+            data[-TAIL_FINGERPRINT_BYTES:],
+        )
+        self._save_cache(hashlib.sha256(data).hexdigest())
+
+    def _source_columns(self, expected, codebook):
+        """
+        表單匯出檔每一欄 (依檔案中的位置) 對應的題號。欄位與 codebook 不一致而重新對應過時，
+        新增的回覆也必須依同樣的對應讀入，不能再依位置套上題號。
+        """
+        header = self.ingest_report["header"]
+        n_columns = len(self.ingest_report["column_stats"])
+        if header is None or self.policy != "remap":
+            positions = list(range(n_columns))
+        else:
+            positions = ingest.source_positions(header, expected)
+        columns = [None] * n_columns
+        for qid, pos in zip(codebook["New_Column"], positions):
+            if pos is not None:
+                columns[pos] = qid
+        return columns
+
+    def _expected_schema(self):
+        if isinstance(self.schema, str):
+            return pd.read_csv(self.schema)
+        if self.schema is not None:
+            return self.schema
+        return getattr(self, "codebook", None) # 檔案被改寫：以上一次載入的欄位為準
+
+    # --- 欄式快取 ---
+    def _load_from_cache(self):
+        if self.cache is None:
+            return False
+        loaded = self.cache.load(self._cache_key, self.path)
+        if loaded is None:
+            return False
+
+        frames, manifest = loaded
+        if manifest["meta"].get("registry") != self._registry_fingerprint():
+            return False # 題號對應已改變，快取中的 Q 編號不再適用
+        if "source_columns" not in manifest["meta"]:
+            return False # 舊版快取沒有記錄欄位對應
+        offset = manifest["offset"]
+        with open(self.path, "rb") as f:
+            start = max(offset - TAIL_FINGERPRINT_BYTES, 0)
+            f.seek(start)
+            tail = f.read(offset - start)
+
+        self.col_types = manifest["meta"]["col_types"]
+        self.source_columns = manifest["meta"]["source_columns"]
+        self._set_state(
+            frames["codebook"],
+            self.col_types,
+            frames["raw"],
+            frames["cleaned"],
+            offset,
+            tail,
+            distributions=self._new_distribution_index(frames["distributions"]),
+        )
+        self.distributions.record_orders(frames["raw"])
+        return True
+
+    def _registry_fingerprint(self):
+        return None if self.registry is None else self.registry.fingerprint()
+
+    def _save_cache(self, sha256=None):
+        if self.cache is None:
+            return
+        if sha256 is None:
+            sha256 = datacache.file_sha256(self.path, self.offset)
+        self.cache.save(
+            self._cache_key,
+            self.path,
+            self.offset,
+            sha256,
+            {
+                "codebook": self.codebook,
+                "raw": self.raw,
+                "cleaned": self.cleaned,
+                "distributions": self.distributions.counts_frame(),
+            },
+            meta={
+                "col_types": self.col_types,
+                "registry": self._registry_fingerprint(),
+                "source_columns": self.source_columns,
+            },
+        )
+        self._snapshot_rows = self.aggregator.n_rows
+
+    # --- 增量讀取 ---
+    def _read_new_rows(self, data):
+        """
+        解析新增的位元組 (不含標頭)：欄位依完整載入時的對應 (self.source_columns) 套上題號，
+        欄位型別沿用第一次載入時的分類結果；表單中缺少的題目補 NA。
+        """
+        names = [qid or f"_unmapped_{i}" for i, qid in enumerate(self.source_columns)]
+        df = pd.read_csv(
+            io.BytesIO(data),
+            header=None,
+            names=names,
+            dtype=str,
+            keep_default_na=False,
+            na_values=["", "NA"],
+        )
+        present = set(df.columns)
+        df = df.reindex(columns=self.codebook["New_Column"].tolist())
+        for col in df.columns:
+            if col not in present:
+                continue
+            if col in self.col_types["numeric"]:
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+            else:
+                df[col] = df[col].str.strip()
+        return df
+
+    def refresh(self):
+        """
+        檢查檔案是否有新的回覆；有的話只處理新增的部分。
+        回傳新增的列數 (完整重新載入時回傳全部列數)。
+        """
+        with self._lock:
+            size = os.path.getsize(self.path)
+            if size == self.offset:
+                return 0
+
+            with open(self.path, "rb") as f:
+                start = max(self.offset - TAIL_FINGERPRINT_BYTES, 0)
+                f.seek(start)
+                tail = f.read(self.offset - start)
+                new_data = f.read()
+
+            # 檔案變短或被改寫 -> 完整重新載入
+            if size < self.offset or tail != self._tail:
+                self._full_load()
+                return self.aggregator.n_rows
+
+            records = new_data.lstrip(b"\r\n")
+            if not records.strip():
+                return 0
+
+            df_new = self._read_new_rows(records)
+            n_old = self.aggregator.n_rows
+            df_new.index = pd.RangeIndex(n_old, n_old + len(df_new))
+            cleaned_new = dtypes.compact_cleaned(preprocess.clean_data(df_new, self.col_types), self.col_types)
+            df_new = dtypes.compact_raw(df_new, self.col_types)
+
+            self.aggregator.update(cleaned_new)
+            self.distributions.update(df_new, cleaned_new)
+            self._raw_chunks.append(df_new)
+            self._cleaned_chunks.append(cleaned_new)
+
+            self.offset += len(new_data)
+            self._tail = (tail + new_data)[-TAIL_FINGERPRINT_BYTES:]
+            self.derived.set_input("responses", self.data_version)
+
+            if self.aggregator.n_rows - self._snapshot_rows >= CACHE_SNAPSHOT_ROWS:
+                self._save_cache()
+            return len(df_new)
+
+    @property
+    def data_version(self):
+        """
+        目前資料狀態的識別字串 (有新回覆或重新載入時改變)，給下游快取當鍵使用。
+        """
+        return f"{self._cache_key}:{self.offset}:{hashlib.sha1(self._tail).hexdigest()[:8]}"
+
+    # --- 對應 Dashboard 使用的資料表 ---
+    @staticmethod
+    def _merge_chunks(chunks):
+        # 新增的列先分批保存，真正需要完整資料表時才合併一次
+        if len(chunks) > 1:
+            chunks[:] = [dtypes.concat(chunks)]
+        return chunks[0]
+
+    @property
+    def raw(self):
+        return self._merge_chunks(self._raw_chunks)
+
+    @property
+    def cleaned(self):
+        return self._merge_chunks(self._cleaned_chunks)
+
+    def overall_stats(self):
+        return self._cached("overall", self.aggregator.overall_stats)
+
+    def group_stats(self):
+        return self._cached("group", self.aggregator.group_stats)
+
+    def seniority_stats(self):
+        return self._cached("seniority", self.aggregator.seniority_stats)
+
+    def grouped_stats(self, dims, k=privacy.MIN_CELL_SIZE):
+        """
+        任意維度 (或多個維度交叉，例如 ("Q2", "Q4_grouped")) 的分群統計，依資料版本快取。
+        Q2 / Q4_grouped 單一維度直接取自增量彙總器，其他維度一次 groupby 算完。
+        建表時即套用小樣本隱藏 (作答人數 < k 的格子與其互補格不公開，見 privacy.py)，
+        頁面與匯出只讀取這份已遮罩的表；k=None 時回傳未隱藏的原始統計 (僅供內部計算)。
+        """
+        dims = (dims,) if isinstance(dims, str) else tuple(dims)
+        if k is not None:
+            return self._cached(
+                "suppressed",
+                lambda: privacy.apply_suppression(self.grouped_stats(dims, None), list(dims), k),
+                (dims, k),
+            )
+
+        def build():
+            if dims == ("Q2",):
+                return self.group_stats()
+            if dims == ("Q4_grouped",):
+                return self.seniority_stats()
+            return preprocess.describe_dimensions(
+                self.cleaned, self.aggregator.numeric_cols, self.codebook, list(dims)
+            )
+
+        return self._cached("grouped", build, (dims,))
+
+    def grouped_intervals(self, dims, n_resamples=None, seed=None, k=privacy.MIN_CELL_SIZE):
+        """
+        grouped_stats 再加上每組平均數的 bootstrap 95% 信賴區間 (CI_Low, CI_High, SE)，依資料版本快取。
+        所有題目 x 組別一次重抽 (analysis.bootstrap_means)；被小樣本隱藏的格子不提供區間。
+        """
+        import analysis
+
+        dims = (dims,) if isinstance(dims, str) else tuple(dims)
+        n_resamples = n_resamples or analysis.BOOTSTRAP_RESAMPLES
+        seed = analysis.BOOTSTRAP_SEED if seed is None else seed
+
+        def build():
+            with self._lock:
+                stats = self.grouped_stats(dims, k)
+                values, keys, _ = preprocess.dimension_block(
+                    self.cleaned, self.aggregator.numeric_cols, list(dims)
+                )
+            # 重抽在鎖外進行 (可能需要數秒)，避免擋住其他使用者的查詢
+            intervals = analysis.bootstrap_means(values, keys, n_resamples=n_resamples, seed=seed)
+            result = stats.merge(intervals.reset_index(), on=list(dims) + ["New_Column"], how="left")
+            hidden = result["Suppressed"] != ""
+            result.loc[hidden, ["CI_Low", "CI_High", "SE"]] = np.nan
+            return result
+
+        return self.derived.get("intervals", build, (dims, k, n_resamples, seed))
+
+    def group_tests(self, dim, n_permutations=None, seed=None, min_group_size=privacy.MIN_CELL_SIZE):
+        """
+        某個分群維度 (Q2 / Q4_grouped / 其他類別欄位) 上，所有題目的組間差異排列檢定 + FDR 校正
+        (analysis.permutation_test)，與 Original_Column 合併後依 p 值排序。
+        人數少於 min_group_size 的組別不列入檢定。結果依資料版本快取在記憶體，
+        有欄式快取時也寫到磁碟，重新啟動後不必重算。
+        """
+        import analysis
+
+        n_permutations = n_permutations or analysis.PERMUTATIONS
+        seed = analysis.PERMUTATION_SEED if seed is None else seed
+        key = ((dim,), "permutation", n_permutations, seed, min_group_size)
+        return self.derived.get("tests", lambda: self._group_tests(dim, key), key)
+
+    def _group_tests(self, dim, key):
+        import analysis
+
+        n_permutations, seed, min_group_size = key[2:]
+        with self._lock:
+            # 磁碟快取的鍵：資料版本 + 題號登錄表 + 題目 / 欄位分類 (任何一個改變都要重算)
+            fingerprint = (self.data_version, self._registry_fingerprint(), self._schema_fingerprint())
+            values, keys, _ = preprocess.dimension_block(
+                self.cleaned, self.aggregator.numeric_cols, [dim]
+            )
+
+        path = None
+        if self.cache is not None:
+            name = hashlib.sha1(repr(fingerprint + key).encode("utf-8")).hexdigest()[:16]
+            path = os.path.join(TESTS_CACHE_DIR, f"{name}.csv")
+            try:
+                return pd.read_csv(path, dtype={"New_Column": str, "Original_Column": str})
+            except FileNotFoundError:
+                pass
+
+        groups = keys[0]
+        sizes = groups.value_counts()
+        if min_group_size:
+            groups = groups[groups.isin(sizes.index[sizes >= min_group_size])]
+        tests = analysis.permutation_test(
+            values.loc[groups.index], groups, n_permutations=n_permutations, seed=seed
+        )
+        result = tests.reset_index().merge(self.codebook, on="New_Column", how="left")
+        result = result[["New_Column", "Original_Column"] + list(tests.columns)]
+        result = result.sort_values(["P_Value", "Eta_Squared"], ascending=[True, False], kind="stable")
+        result = result.reset_index(drop=True)
+        if path is not None:
+            os.makedirs(TESTS_CACHE_DIR, exist_ok=True)
+            result.to_csv(path + ".tmp", index=False)
+            os.replace(path + ".tmp", path)
+        return result
+
+    # --- 量表分數與信度 (scales.py) ---
+    def _cached(self, kind, build, params=()):
+        """
+        快取衍生結果 (self.derived，依 DERIVED_DEPENDENCIES 的相依關係失效)；
+        計算時持有資料鎖，不會與 refresh 同時進行。
+        """
+        with self._lock:
+            return self.derived.get(kind, build, params)
+
+    def derived_result(self, kind, build, params=()):
+        """
+        給頁面使用的衍生結果快取 (kind 需先以 self.derived.define 登記相依關係)。
+        build(stream) 在資料鎖內執行，應從 stream 讀取目前的統計 (例如 stream.overall_stats())，
+        不要使用鎖外先取得的資料表，否則 refresh 後可能把舊資料的結果存到新的版本下。
+        """
+        return self._cached(kind, lambda: build(self), params)
+
+    def scale_scores(self):
+        """
+        每位受訪者的量表分數 (scales.SCALES 中題目都存在的量表)。
+        """
+        import scales
+
+        return self._cached("scale_scores", lambda: scales.scale_scores(self.cleaned))
+
+    def scale_reliability(self):
+        """
+        (量表表, 題目表)：Cronbach's alpha、校正後題目-總分相關、刪題後 alpha。
+        """
+        import scales
+
+        return self._cached(
+            "scale_reliability", lambda: scales.reliability(self.cleaned, self.codebook)
+        )
+
+    def scale_stats(self, dims=(), k=privacy.MIN_CELL_SIZE):
+        """
+        量表分數的描述性統計；dims 為空時是全體，否則依 Q2 / Q4_grouped 等維度分群
+        (格式同 grouped_stats，New_Column 為量表代號、Original_Column 為量表名稱，已套用小樣本隱藏)。
+        """
+        import scales
+
+        dims = (dims,) if isinstance(dims, str) else tuple(dims)
+
+        def build():
+            scores = self.scale_scores()
+            codebook = scales.scale_codebook()
+            if not dims:
+                return preprocess.describe_numeric(scores, list(scores.columns), codebook)
+            sources = list(dict.fromkeys(preprocess.dimension_config(d)["source"] for d in dims))
+            frame = pd.concat([self.cleaned[sources], scores], axis=1)
+            stats = preprocess.describe_dimensions(frame, list(scores.columns), codebook, list(dims))
+            return stats if k is None else privacy.apply_suppression(stats, list(dims), k)
+
+        return self._cached("scale_stats", build, (dims, k))
+
+    # --- 相關篩選 (analysis.correlation_screen) ---
+    def correlations(self, y, excluded=()):
+        """
+        Y 與所有有作答的評分題 (excluded 中的題目除外) 的相關係數，依 r 由高到低排序：
+        New_Column, Original_Column, r, N。
+        """
+        import analysis
+
+        def build():
+            overall = self.overall_stats()
+            x_df = overall[~overall["New_Column"].isin(excluded) & (overall["N"] > 0)]
+            screen = analysis.correlation_screen(self.cleaned, y, x_df["New_Column"])
+            screen = screen[screen["N"] > 1].reset_index()
+            screen = screen.merge(self.codebook, on="New_Column", how="left")
+            return screen[["New_Column", "Original_Column", "r", "N"]].sort_values("r", ascending=False)
+
+        return self._cached("correlations", build, (y, tuple(excluded)))
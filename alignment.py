@@ -0,0 +1,311 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 題目對照資料庫 (SQLite)
+# 記錄「後台題目 <-> 學校報表題目」的對照結果，讓 mapping.py 重跑時：
+# (1) 只對新出現 / 文字有改動的題目計算模糊相似度 (其餘沿用資料庫中的分數)
+# (2) 保留人工確認 (confirmed) 與否決 (rejected) 的配對，不會被重新計算蓋掉
+# (3) 每次執行的建議配對與分數都記錄在 pair_history，可追蹤變化
+# Dashboard 也可以直接讀取此資料庫，不必再開 Excel。
+# ---------------------------------------------------------------
+
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import matching
+
+# --- 設定 ---
+ALIGNMENT_DB = "question_alignment.sqlite"
+SCORER = "ratio" # 目前使用的相似度函式 (rapidfuzz fuzz.ratio)
+# 低於此分數的配對不寫入 scores 表 (不可能成為建議配對，只會佔空間)
+STORE_MIN_SCORE = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    source TEXT NOT NULL,            -- 'backend' 或 'teacher'
+    original TEXT NOT NULL,          -- 原始題目文字
+    normalized_key TEXT NOT NULL,    -- ingest.normalize_question 的結果
+    mean REAL,
+    n INTEGER,
+    scored INTEGER NOT NULL DEFAULT 0, -- 是否已和另一方的所有題目計算過相似度
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (source, original)
+);
+CREATE TABLE IF NOT EXISTS scores (
+    backend TEXT NOT NULL,
+    teacher TEXT NOT NULL,
+    scorer TEXT NOT NULL,
+    score REAL NOT NULL,
+    computed_at TEXT NOT NULL,
+    PRIMARY KEY (backend, teacher, scorer)
+);
+CREATE TABLE IF NOT EXISTS pairs (
+    backend TEXT NOT NULL,
+    teacher TEXT NOT NULL,
+    method TEXT NOT NULL,            -- 'normalized' / 'fuzzy' / 'manual'
+    score REAL,
+    status TEXT NOT NULL,            -- 'suggested' / 'confirmed' / 'rejected'
+    run_id INTEGER,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (backend, teacher)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    new_backend INTEGER NOT NULL,
+    new_teacher INTEGER NOT NULL,
+    scored_pairs INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pair_history (
+    run_id INTEGER NOT NULL,
+    backend TEXT NOT NULL,
+    teacher TEXT NOT NULL,
+    method TEXT NOT NULL,
+    score REAL
+);
+"""
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class AlignmentStore:
+    """
+    題目對照資料庫。所有題目以「原始文字」為鍵 (文字有改動就視為新題目重新計算)。
+    """
+
+    def __init__(self, path=ALIGNMENT_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # --- 題目 ---
+    def upsert_questions(self, source, df):
+        """
+        寫入一方的題目 (df 需有 Original_Column, normalized_key，可選 Mean, N)。
+        已存在的題目只更新平均與樣本數；回傳新題目數。
+        """
+        mean = df["Mean"] if "Mean" in df else pd.Series(np.nan, index=df.index)
+        n = df["N"] if "N" in df else pd.Series(np.nan, index=df.index)
+        rows = [
+            (source, text, key, None if pd.isna(m) else float(m), None if pd.isna(c) else int(c), _now())
+            for text, key, m, c in zip(df["Original_Column"], df["normalized_key"], mean, n)
+        ]
+        before = self._count(source)
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO questions (source, original, normalized_key, mean, n, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (source, original) DO UPDATE SET
+                    mean = excluded.mean, n = excluded.n, updated_at = excluded.updated_at
+                """,
+                rows,
+            )
+        return self._count(source) - before
+
+    def _count(self, source):
+        return self.conn.execute("SELECT COUNT(*) FROM questions WHERE source = ?", (source,)).fetchone()[0]
+
+    def _texts(self, source, scored=None):
+        sql = "SELECT original FROM questions WHERE source = ?"
+        params = [source]
+        if scored is not None:
+            sql += " AND scored = ?"
+            params.append(int(scored))
+        return [row[0] for row in self.conn.execute(sql, params)]
+
+    # --- 相似度 ---
+    def update_scores(self):
+        """
+        只計算「新題目 x 另一方全部題目」的相似度並寫入 scores 表：
+        新後台 x 全部學校 + 舊後台 x 新學校。回傳計算的配對數。
+        """
+        new_backend = self._texts("backend", scored=False)
+        old_backend = self._texts("backend", scored=True)
+        new_teacher = self._texts("teacher", scored=False)
+        all_teacher = self._texts("teacher")
+
+        rows, n_scored = [], 0
+        for backend, teacher in ((new_backend, all_teacher), (old_backend, new_teacher)):
+            if not backend or not teacher:
+                continue
+            scores = matching.score_matrix(backend, teacher, threshold=STORE_MIN_SCORE)
+            n_scored += scores.size
+            b_idx, t_idx = np.nonzero(scores >= STORE_MIN_SCORE)
+            now = _now()
+            rows.extend(
+                (backend[i], teacher[j], SCORER, float(scores[i, j]), now) for i, j in zip(b_idx, t_idx)
+            )
+
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.execute("UPDATE questions SET scored = 1 WHERE scored = 0")
+        return n_scored
+
+    def score_matrix(self, backend, teacher):
+        """
+        從資料庫組出 backend x teacher 的相似度矩陣 (未記錄的配對為 0)。
+        """
+        scores = np.zeros((len(backend), len(teacher)), dtype=float)
+        b_pos = {text: i for i, text in enumerate(backend)}
+        t_pos = {text: j for j, text in enumerate(teacher)}
+        for b, t, score in self.conn.execute(
+            "SELECT backend, teacher, score FROM scores WHERE scorer = ?", (SCORER,)
+        ):
+            if b in b_pos and t in t_pos:
+                scores[b_pos[b], t_pos[t]] = score
+        return scores
+
+    # --- 配對 ---
+    def decisions(self, status):
+        """
+        人工決定過的配對 (status = 'confirmed' 或 'rejected')，回傳 [(backend, teacher), ...]。
+        """
+        return self.conn.execute(
+            "SELECT backend, teacher FROM pairs WHERE status = ?", (status,)
+        ).fetchall()
+
+    def align(self, backend, teacher, threshold):
+        """
+        對未匹配的兩方題目做一對一配對：
+        人工確認過的配對直接採用，否決過的配對不再建議，其餘以資料庫中的分數求最佳配對。
+        回傳 DataFrame：query_index, choice_index, Similarity_Score, Status。
+        """
+        scores = self.score_matrix(backend, teacher)
+        b_pos = {text: i for i, text in enumerate(backend)}
+        t_pos = {text: j for j, text in enumerate(teacher)}
+
+        for b, t in self.decisions("rejected"):
+            if b in b_pos and t in t_pos:
+                scores[b_pos[b], t_pos[t]] = 0.0
+
+        fixed = [
+            (b_pos[b], t_pos[t]) for b, t in self.decisions("confirmed") if b in b_pos and t in t_pos
+        ]
+        for i, j in fixed:
+            scores[i, :] = 0.0
+            scores[:, j] = 0.0
+
+        result = matching.assign_pairs(scores, threshold)
+        result["Status"] = "suggested"
+        if fixed:
+            confirmed = pd.DataFrame({
+                "query_index": [i for i, _ in fixed],
+                "choice_index": [j for _, j in fixed],
+                "Similarity_Score": [self._score(backend[i], teacher[j]) for i, j in fixed],
+                "Status": "confirmed",
+            })
+            result = pd.concat([confirmed, result], ignore_index=True)
+        return result
+
+    def _score(self, backend, teacher):
+        row = self.conn.execute(
+            "SELECT score FROM scores WHERE backend = ? AND teacher = ? AND scorer = ?",
+            (backend, teacher, SCORER),
+        ).fetchone()
+        return row[0] if row else np.nan
+
+    def record_run(self, new_backend, new_teacher, scored_pairs, pairs):
+        """
+        記錄一次執行：pairs 為 DataFrame (Backend_Question, Teacher_Question, Method, Similarity_Score)。
+        建議配對寫入 pairs 表 (已人工確認 / 否決的狀態保留)，並附加到 pair_history。
+        """
+        now = _now()
+        with self.conn:
+            run_id = self.conn.execute(
+                "INSERT INTO runs (started_at, new_backend, new_teacher, scored_pairs) VALUES (?, ?, ?, ?)",
+                (now, new_backend, new_teacher, scored_pairs),
+            ).lastrowid
+            rows = [
+                (b, t, method, None if pd.isna(score) else float(score), run_id, now)
+                for b, t, method, score in zip(
+                    pairs["Backend_Question"], pairs["Teacher_Question"], pairs["Method"], pairs["Similarity_Score"]
+                )
+            ]
+            self.conn.executemany(
+                """
+                INSERT INTO pairs (backend, teacher, method, score, status, run_id, updated_at)
+                VALUES (?, ?, ?, ?, 'suggested', ?, ?)
+                ON CONFLICT (backend, teacher) DO UPDATE SET
+                    score = excluded.score, run_id = excluded.run_id, updated_at = excluded.updated_at
+                """,
+                rows,
+            )
+            # 這次沒有再被建議、也沒有人工決定過的舊配對 -> 移除
+            self.conn.execute(
+                "DELETE FROM pairs WHERE status = 'suggested' AND run_id <> ?", (run_id,)
+            )
+            self.conn.executemany(
+                "INSERT INTO pair_history VALUES (?, ?, ?, ?, ?)",
+                [(run_id, b, t, m, s) for b, t, m, s, _, _ in rows],
+            )
+        return run_id
+
+    def set_status(self, backend, teacher, status):
+        """
+        人工確認 / 否決一組配對 (不存在的配對會以 method='manual' 新增)。
+        """
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO pairs (backend, teacher, method, score, status, updated_at)
+                VALUES (?, ?, 'manual', ?, ?, ?)
+                ON CONFLICT (backend, teacher) DO UPDATE SET
+                    status = excluded.status, updated_at = excluded.updated_at
+                """,
+                (backend, teacher, self._score(backend, teacher), status, _now()),
+            )
+
+    def comparison(self):
+        """
+        目前有效的對照表 (不含否決的配對)，附上學校報表的平均分：
+        Backend_Question, Teacher_Question, Method, Similarity_Score, Status, Mean_Teacher
+        """
+        return pd.read_sql_query(
+            """
+            SELECT p.backend AS Backend_Question, p.teacher AS Teacher_Question,
+                   p.method AS Method, p.score AS Similarity_Score, p.status AS Status,
+                   q.mean AS Mean_Teacher
+            FROM pairs p
+            LEFT JOIN questions q ON q.source = 'teacher' AND q.original = p.teacher
+            WHERE p.status <> 'rejected'
+            ORDER BY p.method, p.score DESC
+            """,
+            self.conn,
+        )
+
+
+def load_comparison(path=ALIGNMENT_DB):
+    """
+    Dashboard 用：讀取對照表；資料庫不存在時回傳 None。
+    """
+    if not os.path.exists(path):
+        return None
+    alignment = AlignmentStore(path)
+    try:
+        return alignment.comparison()
+    finally:
+        alignment.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 用法：python alignment.py confirm|reject "<後台題目>" "<學校題目>"
+    #       python alignment.py list
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    alignment = AlignmentStore()
+    if command in ("confirm", "reject") and len(sys.argv) == 4:
+        alignment.set_status(sys.argv[2], sys.argv[3], "confirmed" if command == "confirm" else "rejected")
+        print(f"已將配對標記為 {command}。")
+    else:
+        with pd.option_context("display.max_rows", None, "display.width", 200):
+            print(alignment.comparison())
+    alignment.close()
@@ -0,0 +1,360 @@
+# ---------------------------------------------------------------
+# 誠致 2025 敬業度調查 - 分析函式
+# 提供 Dashboard 各頁面共用的批次 (向量化) 計算，
+# 不依賴 Streamlit，方便在其他腳本中重複使用。
+# ---------------------------------------------------------------
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# 判斷「變異數為 0」的相對門檻
+ZERO_VARIANCE_RTOL = 1e-10
+
+# Bootstrap 設定
+BOOTSTRAP_RESAMPLES = 10_000
+BOOTSTRAP_SEED = 2025 # 固定種子：同一份資料每次得到相同的區間
+# 每批重抽的次數 (權重矩陣大小 = 批次 x 組內人數，控制記憶體用量)
+BOOTSTRAP_CHUNK = 500
+BOOTSTRAP_WORKERS = None # None = CPU 數 (NumPy 矩陣運算會釋放 GIL，以執行緒平行即可)
+
+# 排列檢定設定
+PERMUTATIONS = 10_000
+PERMUTATION_SEED = 2025
+PERMUTATION_CHUNK = 200 # 每次一起計算的排列數 (one-hot 張量 = 批次 x 組數 x 人數)
+PERMUTATION_TASK = 2_000 # 每個行程任務負責的排列數 (與行程數無關，結果才可重現)
+# 人數 x 題數 x 排列數 小於此值時直接在本行程計算 (行程啟動本身約需 0.5 秒)
+PARALLEL_MIN_WORK = 2e9
+PERMUTATION_WORKERS = None # None = CPU 數
+FDR_ALPHA = 0.05
+
+
+# --- 1. 相關係數 (Pairwise-complete Pearson r) ---
+def _centered(values):
+    """
+    每欄減去自己的平均 (忽略 NA)，再把 NA 補 0，回傳 (補值後矩陣, 非 NA 遮罩, 各欄平均)。
+    相關係數不受平移影響，先置中可避免大數相減的誤差。
+    """
+    mask = ~np.isnan(values)
+    filled = np.where(mask, values, 0.0)
+    means = filled.sum(axis=0) / np.maximum(mask.sum(axis=0), 1)
+    centered = np.where(mask, values - means, 0.0)
+    return centered, mask.astype(float), means
+
+
+def _pearson_from_sums(n, sx, sy, sxx, syy, sxy):
+    """
+    由成對的次數與動差和計算 Pearson r；變異數為 0 或 N < 2 時為 NaN。
+    (成對樣本中某題全部相同時，n * sxx - sx^2 只剩捨入誤差，以相對門檻視為 0)
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * sxy - sx * sy
+        var_x = n * sxx - sx * sx
+        var_y = n * syy - sy * sy
+        r = cov / np.sqrt(var_x * var_y)
+    nonzero_x = var_x > ZERO_VARIANCE_RTOL * n * sxx
+    nonzero_y = var_y > ZERO_VARIANCE_RTOL * n * syy
+    r = np.where((n > 1) & nonzero_x & nonzero_y, r, np.nan)
+    return np.clip(r, -1.0, 1.0)
+
+
+def _paired_sums(df, y_col, x_cols):
+    """
+    Y 與每個 X 在「成對有效樣本」上的次數與動差和 (皆以各欄平均置中)。
+    回傳 n, sx, sy, sxx, syy, sxy 以及 X、Y 的置中基準 (平均)。
+    """
+    y = df[y_col].to_numpy(dtype=float)
+    x = df[list(x_cols)].to_numpy(dtype=float)
+
+    # 成對遮罩：X 與 Y 都有填答
+    mask = ~np.isnan(x) & ~np.isnan(y)[:, None]
+    xc, _, x_means = _centered(x)
+    yc, _, y_means = _centered(y[:, None])
+    xm = np.where(mask, xc, 0.0)
+    ym = np.where(mask, yc, 0.0)
+
+    return {
+        "n": mask.sum(axis=0),
+        "sx": xm.sum(axis=0),
+        "sy": ym.sum(axis=0),
+        "sxx": (xm * xm).sum(axis=0),
+        "syy": (ym * ym).sum(axis=0),
+        "sxy": (xm * ym).sum(axis=0),
+        "x_means": x_means,
+        "y_mean": y_means[0],
+    }
+
+
+def correlation_screen(df, y_col, x_cols):
+    """
+    一次算出 Y 與所有 X 的相關係數 (每一對各自移除 NA)。
+    回傳以 X 欄位為索引的 DataFrame，欄位為 r 與 N (該對的有效樣本數)。
+    """
+    sums = _paired_sums(df, y_col, x_cols)
+    r = _pearson_from_sums(
+        sums["n"], sums["sx"], sums["sy"], sums["sxx"], sums["syy"], sums["sxy"]
+    )
+    return pd.DataFrame({"r": r, "N": sums["n"]}, index=pd.Index(list(x_cols), name="New_Column"))
+
+
+def correlation_matrix(df, cols):
+    """
+    題目 x 題目的完整相關矩陣 (pairwise-complete)，以矩陣乘法一次完成。
+    回傳 (r 矩陣, N 矩陣) 兩個 DataFrame。
+    """
+    values = df[list(cols)].to_numpy(dtype=float)
+    xc, m, _ = _centered(values)
+
+    n = m.T @ m                # [i, j] = 兩題都有填答的人數
+    s = xc.T @ m               # [i, j] = 在 (i, j) 成對樣本中 i 的和
+    ss = (xc * xc).T @ m       # [i, j] = 在 (i, j) 成對樣本中 i 的平方和
+    sxy = xc.T @ xc            # [i, j] = 成對樣本中 i * j 的和
+
+    r = _pearson_from_sums(n, s, s.T, ss, ss.T, sxy)
+    r_df = pd.DataFrame(r, index=list(cols), columns=list(cols))
+    n_df = pd.DataFrame(n.astype(int), index=list(cols), columns=list(cols))
+    return r_df, n_df
+
+
+# --- 2. 簡單迴歸篩選 (Y ~ a + b X，一次算完所有 X) ---
+def regression_screen(df, y_col, x_cols):
+    """
+    對每個 X 做簡單線性迴歸 Y = a + bX (每一對各自移除 NA)，
+    以成對樣本的置中動差和直接求出封閉解，結果與 statsmodels OLS 相同：
+    slope (b), intercept (a), r2, t (b 的 t 值), p (雙尾), N。
+    N <= 2 的題目回傳 NaN；X 在成對樣本中沒有變異時 r2 = 0、slope / p 為 NaN。
+    """
+    from scipy import stats
+
+    sums = _paired_sums(df, y_col, x_cols)
+    n = sums["n"].astype(float)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # 成對樣本內的離均差平方和 / 交乘積和
+        sxx = sums["sxx"] - sums["sx"] ** 2 / n
+        syy = sums["syy"] - sums["sy"] ** 2 / n
+        sxy = sums["sxy"] - sums["sx"] * sums["sy"] / n
+        x_const = sxx <= ZERO_VARIANCE_RTOL * sums["sxx"]
+        sxx = np.where(x_const, np.nan, sxx)
+
+        slope = sxy / sxx
+        mean_x = sums["x_means"] + sums["sx"] / n
+        mean_y = sums["y_mean"] + sums["sy"] / n
+        intercept = mean_y - slope * mean_x
+
+        sse = np.maximum(syy - slope * sxy, 0.0)
+        r2 = 1.0 - sse / syy
+        se = np.sqrt(sse / (n - 2) / sxx)
+        t = slope / se
+        p = 2 * stats.t.sf(np.abs(t), n - 2)
+
+    r2 = np.where(x_const, 0.0, r2)
+    valid = n > 2
+    result = pd.DataFrame({
+        "slope": slope,
+        "intercept": intercept,
+        "r2": r2,
+        "t": t,
+        "p": p,
+        "N": sums["n"],
+    }, index=pd.Index(list(x_cols), name="New_Column"))
+    result.loc[~valid, ["slope", "intercept", "r2", "t", "p"]] = np.nan
+    return result
+
+
+def fit_ols(df, y_col, x_col):
+    """
+    單一 X 的完整 statsmodels OLS 模型 (供使用者深入查看某一題時使用)。
+    """
+    import statsmodels.api as sm
+
+    data = df[[y_col, x_col]].astype(float).dropna()
+    return sm.OLS(data[y_col], sm.add_constant(data[x_col])).fit()
+
+
+# --- 3. 比例的信賴區間 ---
+def wilson_interval(count, nobs, alpha=0.05):
+    """
+    Wilson 信賴區間 (向量化，與 statsmodels proportion_confint(method='wilson') 相同)。
+    小樣本時比常態近似穩健。回傳 (下限, 上限)。
+    """
+    count = np.asarray(count, dtype=float)
+    nobs = np.asarray(nobs, dtype=float)
+    crit = NormalDist().inv_cdf(1 - alpha / 2) # 不必為了一個常態分位數載入 scipy.stats
+    crit2 = crit ** 2
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        prop = count / nobs
+        denom = 1 + crit2 / nobs
+        center = (prop + crit2 / (2 * nobs)) / denom
+        dist = crit * np.sqrt(prop * (1 - prop) / nobs + crit2 / (4 * nobs ** 2)) / denom
+    return center - dist, center + dist
+
+
+# --- 4. 分組平均數的 Bootstrap 信賴區間 ---
+def _bootstrap_chunk(filled, observed, size, seed):
+    """
+    一批 size 次重抽，回傳 size x 題目 的平均數矩陣。
+    先產生 size x n 的重抽索引矩陣，以 bincount 轉成「每位受訪者被抽到幾次」的權重矩陣，
+    所有題目的重抽平均數只需兩次矩陣乘法。
+    """
+    rng = np.random.default_rng(seed)
+    n = filled.shape[0]
+    index = rng.integers(0, n, size=(size, n))
+    index += np.arange(size)[:, None] * n # 每次重抽各自佔一段 bincount 區間
+    weights = np.bincount(index.ravel(), minlength=size * n).reshape(size, n).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (weights @ filled) / (weights @ observed)
+
+
+def bootstrap_means(values, by, n_resamples=BOOTSTRAP_RESAMPLES, alpha=0.05,
+                    seed=BOOTSTRAP_SEED, workers=BOOTSTRAP_WORKERS):
+    """
+    每個 (組別, 題目) 平均數的 percentile bootstrap 信賴區間 (每題各自忽略 NA)。
+    values 為受訪者 x 題目的 DataFrame，by 為組別標籤 Series 的 list (可多個維度交叉)。
+    所有組別、所有批次一起交給執行緒池；每批的亂數種子由 seed 依固定順序衍生，
+    結果與執行緒數無關。回傳以 (各維度, New_Column) 為索引的 DataFrame：CI_Low, CI_High, SE。
+    """
+    data = values.to_numpy(dtype=float)
+    observed = ~np.isnan(data)
+    filled = np.where(observed, data, 0.0)
+    groups = values.groupby(by, sort=True).indices
+
+    tasks = []
+    for key, rows in groups.items():
+        for start in range(0, n_resamples, BOOTSTRAP_CHUNK):
+            tasks.append((key, rows, min(BOOTSTRAP_CHUNK, n_resamples - start)))
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+
+    def run(task, task_seed):
+        key, rows, size = task
+        return _bootstrap_chunk(filled[rows], observed[rows].astype(float), size, task_seed)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        chunks = list(pool.map(run, tasks, seeds))
+
+    frames = {}
+    for key in groups:
+        means = np.vstack([c for t, c in zip(tasks, chunks) if t[0] == key])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning) # 組內沒有人作答的題目全為 NaN
+            low, high = np.nanpercentile(means, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+            se = np.nanstd(means, axis=0, ddof=1)
+        frames[key if isinstance(key, tuple) else (key,)] = pd.DataFrame(
+            {"CI_Low": low, "CI_High": high, "SE": se}, index=values.columns
+        )
+
+    names = [k.name for k in by] + ["New_Column"]
+    if not frames:
+        return pd.DataFrame(
+            columns=["CI_Low", "CI_High", "SE"],
+            index=pd.MultiIndex.from_tuples([], names=names),
+        )
+    result = pd.concat(frames)
+    result.index.names = names
+    return result
+
+
+# --- 5. 組間差異的排列檢定 (所有題目一起) ---
+def _group_score(codes, n_groups, filled, observed):
+    """
+    每個排列、每一題的 sum_g (組內總和^2 / 組內人數)。
+    每題的作答者與總和固定，因此這個值與組間平方和 (以及 one-way ANOVA 的 F) 單調對應。
+    codes 為 排列數 x 人數 的組別代碼矩陣，回傳 排列數 x 題目。
+    """
+    onehot = (codes[:, None, :] == np.arange(n_groups)[None, :, None]).astype(float)
+    sums = onehot @ filled
+    counts = onehot @ observed
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums * sums / counts, 0.0).sum(axis=1)
+
+
+def _permutation_task(filled, observed, codes, n_groups, size, threshold, seed):
+    """
+    一個任務：size 次隨機排列組別標籤，回傳每一題「排列統計量 >= 實際統計量」的次數。
+    (也是子行程的工作函式)
+    """
+    rng = np.random.default_rng(seed)
+    exceed = np.zeros(filled.shape[1], dtype=np.int64)
+    for start in range(0, size, PERMUTATION_CHUNK):
+        m = min(PERMUTATION_CHUNK, size - start)
+        perms = rng.permuted(np.tile(codes, (m, 1)), axis=1)
+        exceed += (_group_score(perms, n_groups, filled, observed) >= threshold).sum(axis=0)
+    return exceed
+
+
+def fdr_bh(p_values):
+    """
+    Benjamini-Hochberg FDR 校正後的 q 值 (NaN 不列入校正，維持 NaN)。
+    """
+    p = np.asarray(p_values, dtype=float)
+    q = np.full(p.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(p))
+    if len(valid) == 0:
+        return q
+    order = valid[np.argsort(p[valid], kind="stable")]
+    ranked = p[order] * len(order) / np.arange(1, len(order) + 1)
+    q[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return q
+
+
+def permutation_test(values, groups, n_permutations=PERMUTATIONS, seed=PERMUTATION_SEED,
+                     workers=PERMUTATION_WORKERS, alpha=FDR_ALPHA):
+    """
+    各題「組間平均數是否有差異」的排列檢定 (不需常態或大樣本假設)。
+    values 為受訪者 x 題目的 DataFrame，groups 為每位受訪者的組別 Series。
+    所有題目共用同一個排列矩陣一次計算；工作量大時分成固定大小的任務交給行程池。
+    p 值以 (1 + 超過次數) / (1 + 排列數) 計算，再以 Benjamini-Hochberg 做 FDR 校正。
+    回傳以 New_Column 為索引的 DataFrame：
+    Groups (有作答的組數), N, Eta_Squared (效果量), P_Value, Q_Value, Significant (Q_Value < alpha)。
+    """
+    codes, labels = pd.factorize(groups, sort=True)
+    keep = codes >= 0
+    codes = codes[keep]
+    data = values.to_numpy(dtype=float)[keep]
+    observed = ~np.isnan(data)
+    filled = np.where(observed, data, 0.0)
+    observed = observed.astype(float)
+    n_groups = len(labels)
+
+    actual = _group_score(codes[None, :], n_groups, filled, observed)[0]
+    # 浮點誤差容許：與實際值「相等」的排列也算超過
+    threshold = actual - 1e-9 * np.abs(actual)
+
+    sizes = [min(PERMUTATION_TASK, n_permutations - s) for s in range(0, n_permutations, PERMUTATION_TASK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(filled, observed, codes, n_groups, size, threshold, task_seed) for size, task_seed in zip(sizes, seeds)]
+    n_workers = min(workers or os.cpu_count() or 1, len(sizes))
+    if data.size * n_permutations < PARALLEL_MIN_WORK or n_workers == 1:
+        exceed = sum(_permutation_task(*a) for a in args)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            exceed = sum(pool.map(_permutation_task, *zip(*args)))
+
+    # 效果量 eta^2 = 組間平方和 / 總平方和
+    n = observed.sum(axis=0)
+    total = filled.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ss_total = (filled * filled).sum(axis=0) - total * total / n
+        eta2 = (actual - total * total / n) / ss_total
+    group_counts = np.zeros((n_groups, data.shape[1]))
+    np.add.at(group_counts, codes, observed)
+    n_answered_groups = (group_counts > 0).sum(axis=0)
+
+    p = (1 + exceed) / (1 + n_permutations)
+    testable = (n_answered_groups >= 2) & (ss_total > ZERO_VARIANCE_RTOL * (filled * filled).sum(axis=0))
+    p = np.where(testable, p, np.nan)
+    eta2 = np.where(testable, eta2, np.nan)
+    q = fdr_bh(p)
+    return pd.DataFrame({
+        "Groups": n_answered_groups,
+        "N": n.astype(int),
+        "Eta_Squared": eta2,
+        "P_Value": p,
+        "Q_Value": q,
+        "Significant": q < alpha,
+    }, index=pd.Index(values.columns, name="New_Column"))
@@ -0,0 +1,344 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 本機統計 API (HTTP / JSON，asyncio)
+# 讓其他工具 (人資報表、mapping.py 的學校報表比較...) 直接取得與 Dashboard 相同的數字，
+# 不必各自重新讀取 CSV 或擷取 Streamlit 頁面：
+# (1) 資料由 aggregator.SurveyStream 載入並常駐記憶體 (欄式快取、增量讀取新回覆)，
+#     所有用戶端共用同一個行程；分群統計已套用小樣本隱藏 (privacy.py)
+# (2) 統計表取自 SurveyStream 依資料版本快取的結果 (相關篩選也是)；
+#     回應附 ETag (資料版本 + 路徑與查詢參數)，用戶端帶 If-None-Match 且資料沒變時
+#     直接回傳 304 (不含內容，也不必重新計算)
+# (3) 表格類的回應以 page / page_size 分頁
+# 只使用標準函式庫 (asyncio)；計算在執行緒中進行，慢的查詢不會擋住其他連線。
+# 執行方式: python api.py [--host 127.0.0.1] [--port 8765]
+# ---------------------------------------------------------------
+
+import asyncio
+import hashlib
+import json
+import sys
+import threading
+import time
+from http import HTTPStatus
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import aggregator
+import datacache
+import preprocess
+import privacy
+import store
+
+# --- 設定 ---
+API_HOST = "127.0.0.1" # 預設只接受本機連線
+API_PORT = 8765
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+API_REFRESH_SECONDS = 5 # 距離上次檢查超過這麼多秒才檢查表單檔是否有新回覆
+MAX_HEADER_LINES = 100
+Y_QUESTIONS = ["Q104", "Q100"] # 相關篩選可用的依變項 (與 Dashboard 關聯性分析頁相同)
+X_EXCLUDED = ["Q100", "Q104", "Q4", "Q5"] # 不列為自變項的題目 (量尺不同)
+
+ENDPOINTS = {
+    "/api/sources": "資料來源 (年度 / 學校) 與資料版本",
+    "/api/questions": "題號、題目文字與題型",
+    "/api/overall": "各題描述性統計 (N/Mean/SD/Median/Min/Max)",
+    "/api/grouped": "分群統計 (dims=Q2 或 Q2,Q4_grouped；intervals=1 加上 bootstrap 95% CI)",
+    "/api/distributions/<題號>": "選項分配與 Wilson 95% CI (dimension=All|Q2|Q4_grouped, group=組別)",
+    "/api/correlations": "Y 與所有評分題的相關係數 (y=Q104|Q100)",
+}
+
+
+class ApiError(Exception):
+    """
+    回傳給用戶端的錯誤 (HTTP 狀態碼 + 說明)。
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _records(df):
+    """
+    DataFrame 轉成 JSON 物件的 list (NaN / Inf -> null)。
+    """
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+
+def _int_param(params, name, default, minimum=1, maximum=None):
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} 必須是整數") from None
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} 必須介於 {minimum} 與 {maximum or '∞'} 之間")
+    return value
+
+
+def _paginate(df, params):
+    """
+    依 page / page_size 切出一頁，回傳 {data, page, page_size, total, pages}。
+    """
+    page_size = _int_param(params, "page_size", API_PAGE_SIZE, maximum=API_MAX_PAGE_SIZE)
+    page = _int_param(params, "page", 1)
+    total = len(df)
+    start = (page - 1) * page_size
+    return {
+        "data": _records(df.iloc[start:start + page_size]),
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "pages": max(1, -(-total // page_size)),
+    }
+
+
+def _filter_questions(df, params):
+    if "questions" not in params:
+        return df
+    questions = [q.strip() for q in params["questions"].split(",") if q.strip()]
+    return df[df["New_Column"].isin(questions)]
+
+
+class StatsAPI:
+    """
+    路由與回應內容 (不含 HTTP 連線處理，方便直接呼叫)。
+    respond(method, target, headers) 回傳 (狀態碼, 標頭 dict, 內容 bytes)；
+    會讀取資料，請在執行緒中呼叫 (serve 已處理)。
+    """
+
+    def __init__(self, sources=None, k=privacy.MIN_CELL_SIZE, refresh_seconds=API_REFRESH_SECONDS):
+        self.sources = list(sources or store.SURVEY_SOURCES)
+        self.k = k
+        self.refresh_seconds = refresh_seconds
+        self._streams = {}
+        self._checked = {}
+        self._registry = None
+        self._lock = threading.Lock() # 多個請求同時到達時，同一個來源只載入一次
+
+    def stream(self, index):
+        """
+        第 index 個來源的 SurveyStream (第一次使用時載入，之後定期檢查新回覆)。
+        """
+        if not 0 <= index < len(self.sources):
+            raise ApiError(HTTPStatus.NOT_FOUND, f"沒有第 {index} 個資料來源 (見 /api/sources)")
+        with self._lock:
+            return self._stream(index)
+
+    def _stream(self, index):
+        now = time.monotonic()
+        if index not in self._streams:
+            if self._registry is None:
+                self._registry = store.QuestionRegistry.load()
+            source = self.sources[index]
+            stream = aggregator.SurveyStream(
+                source["path"], cache=datacache.FrameCache(), registry=self._registry,
+                wave=source["wave"], schema=source.get("schema"),
+            )
+            self._streams[index] = stream
+            self._checked[index] = now
+        elif now - self._checked[index] >= self.refresh_seconds:
+            self._streams[index].refresh()
+            self._checked[index] = now
+        return self._streams[index]
+
+    # --- 各端點 (回傳可轉成 JSON 的物件) ---
+    def sources_info(self, stream, params):
+        return {
+            "sources": [
+                {"source": i, "wave": s["wave"], "school": s["school"]} for i, s in enumerate(self.sources)
+            ],
+            "data_version": stream.data_version,
+            "respondents": len(stream.cleaned),
+            "min_cell_size": self.k,
+        }
+
+    def questions(self, stream, params):
+        kinds = {col: kind for kind, cols in stream.col_types.items() for col in cols}
+        df = stream.codebook.assign(Type=stream.codebook["New_Column"].map(kinds))
+        return _paginate(_filter_questions(df, params), params)
+
+    def overall(self, stream, params):
+        return _paginate(_filter_questions(stream.overall_stats(), params), params)
+
+    def grouped(self, stream, params):
+        dims = tuple(d.strip() for d in params.get("dims", "").split(",") if d.strip())
+        if not dims or len(dims) > 2:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "dims 需指定一到兩個分群維度，例如 dims=Q2 或 dims=Q2,Q4_grouped")
+        unknown = [d for d in dims if d not in preprocess.GROUP_DIMENSIONS]
+        if unknown:
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST,
+                f"未知的分群維度：{', '.join(unknown)} (可用：{', '.join(preprocess.GROUP_DIMENSIONS)})",
+            )
+        if params.get("intervals") == "1":
+            df = stream.grouped_intervals(dims, k=self.k)
+        else:
+            df = stream.grouped_stats(dims, k=self.k)
+        return _paginate(_filter_questions(df, params), params)
+
+    def distributions(self, stream, params, question):
+        index = stream.distributions
+        if question not in index.questions:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"{question} 沒有選項分配 (開放題或不存在的題號)")
+        dimension = params.get("dimension", "All")
+        if dimension == "All":
+            group = index.ALL
+        elif dimension in ("Q2", "Q4_grouped"):
+            group = params.get("group")
+            # 人數少於 k 或互補隱藏的組別不提供切片 (選項分配會直接、或經由全體相減透露個人回答)
+            if group not in index.groups(dimension, k=self.k, question=question):
+                raise ApiError(
+                    HTTPStatus.NOT_FOUND,
+                    f"{dimension} 沒有組別「{group}」，或因作答人數少於 {self.k} 人 (含互補隱藏) 而不公開",
+                )
+        else:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "dimension 只能是 All、Q2 或 Q4_grouped")
+        df = index.get(question, dimension, group)
+        return {"question": question, "dimension": dimension, "group": group, "data": _records(df)}
+
+    def correlations(self, stream, params):
+        y = params.get("y", Y_QUESTIONS[0])
+        if y not in Y_QUESTIONS:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"y 只能是 {' 或 '.join(Y_QUESTIONS)}")
+        return {"y": y, **_paginate(stream.correlations(y, X_EXCLUDED), params)}
+
+    def _route(self, path):
+        """
+        回傳 (處理函式, 路徑參數)。
+        """
+        routes = {
+            "/api/sources": self.sources_info,
+            "/api/questions": self.questions,
+            "/api/overall": self.overall,
+            "/api/grouped": self.grouped,
+            "/api/correlations": self.correlations,
+        }
+        if path in routes:
+            return routes[path], ()
+        prefix = "/api/distributions/"
+        if path.startswith(prefix) and "/" not in path[len(prefix):] and path[len(prefix):]:
+            return self.distributions, (path[len(prefix):],)
+        return None, ()
+
+    @staticmethod
+    def _etag(stream, path, params):
+        """
+        ETag 由資料版本 (含題目 / 欄位分類的指紋) 與正規化後的路徑、查詢參數 (依名稱排序) 算出，
+        不必先產生內容就能比對。
+        """
+        version = [stream.data_version, stream.derived.fingerprint("schema")]
+        key = json.dumps([version, path, sorted(params.items())], ensure_ascii=False)
+        return f'"{hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]}"'
+
+    def respond(self, method, target, headers):
+        url = urlsplit(target)
+        path = unquote(url.path).rstrip("/") or "/"
+        params = dict(parse_qsl(url.query))
+        json_headers = {"Content-Type": "application/json; charset=utf-8"}
+        try:
+            if method not in ("GET", "HEAD"):
+                raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "只支援 GET")
+            if path in ("/", "/api"):
+                body = json.dumps({"endpoints": ENDPOINTS}, ensure_ascii=False).encode("utf-8")
+                return HTTPStatus.OK, json_headers, body
+            handler, args = self._route(path)
+            if handler is None:
+                raise ApiError(HTTPStatus.NOT_FOUND, f"沒有這個端點：{path} (見 /api)")
+            stream = self.stream(_int_param(params, "source", 0, minimum=0))
+
+            # 資料沒變時內容相同：先比對 If-None-Match，符合就不必計算與序列化
+            etag = self._etag(stream, path, params)
+            response_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            tags = [t.strip().removeprefix("W/") for t in headers.get("if-none-match", "").split(",")]
+            if etag in tags or "*" in tags:
+                return HTTPStatus.NOT_MODIFIED, response_headers, b""
+            body = json.dumps(handler(stream, params, *args), ensure_ascii=False).encode("utf-8")
+        except ApiError as e:
+            return e.status, json_headers, json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+        return HTTPStatus.OK, {**response_headers, **json_headers}, body
+
+
+# --- HTTP 連線處理 (HTTP/1.1，支援 keep-alive) ---
+async def _read_request(reader):
+    """
+    讀取一個請求的請求列與標頭；連線結束時回傳 None。
+    """
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    parts = line.decode("latin-1").split()
+    if len(parts) != 3:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "無法解析的請求")
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        header = await reader.readline()
+        if header in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = header.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise ApiError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "標頭過多")
+    length = int(headers.get("content-length") or 0)
+    if length:
+        await reader.readexactly(length) # GET 不需要內容，讀掉以便處理下一個請求
+    return parts[0].upper(), parts[1], parts[2], headers
+
+
+def _write_response(writer, status, headers, body, keep_alive, head=False):
+    status = HTTPStatus(status)
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+    headers = {**headers, "Content-Length": str(len(body)), "Connection": "keep-alive" if keep_alive else "close"}
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    if not head:
+        writer.write(body)
+
+
+async def _handle_connection(api, reader, writer):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except (ApiError, ValueError) as e:
+                status = e.status if isinstance(e, ApiError) else HTTPStatus.BAD_REQUEST
+                body = json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+                _write_response(writer, status, {"Content-Type": "application/json; charset=utf-8"}, body, False)
+                break
+            if request is None:
+                break
+            method, target, version, headers = request
+            status, response_headers, body = await asyncio.to_thread(api.respond, method, target, headers)
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            _write_response(writer, status, response_headers, body, keep_alive, head=method == "HEAD")
+            await writer.drain()
+            if not keep_alive:
+                break
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=API_HOST, port=API_PORT, api=None):
+    """
+    啟動 API 伺服器 (直到被中斷)。第一個來源在啟動時就先載入，第一個請求不必等待。
+    """
+    api = api or StatsAPI()
+    await asyncio.to_thread(api.stream, 0)
+    server = await asyncio.start_server(lambda r, w: _handle_connection(api, r, w), host, port)
+    print(f"統計 API 已啟動：http://{host}:{port}/api")
+    async with server:
+        await server.serve_forever()
+
+
+def _option(name, default):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(_option("--host", API_HOST), int(_option("--port", API_PORT))))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,258 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 效能基準測試
+# 以 synthetic.py 產生 10^2 / 10^4 / 10^6 位受訪者的合成資料，量測各階段的耗時：
+#   讀檔與欄位驗證 (ingest)、R 版描述統計 (preprocess.run_pipeline)、增量彙總載入 (SurveyStream)、
+#   交叉分群、選項分配索引、相關 / 迴歸篩選、質性斷詞、題目模糊比對 (mapping.py 使用的 matching)
+# 每次的結果附加到 BENCH_HISTORY，並與同一項目最近幾次的中位數比較：
+# 變慢超過 REGRESSION_RATIO 倍時列出並以非 0 結束碼離開 (可放進 CI，在正式施測前抓到效能退步)。
+# 執行方式: python bench.py [--sizes 100,10000,1000000] [--steps 項目,...] [--no-record]
+# ---------------------------------------------------------------
+
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import datacache
+import synthetic
+
+# --- 設定 ---
+BENCH_SIZES = [100, 10_000] # 預設的受訪者人數 (10^6 需數 GB 記憶體，請以 --sizes 指定)
+BENCH_DATA_DIR = os.path.join(datacache.CACHE_DIR, "bench") # 合成資料檔 (同人數 / 種子重複使用)
+BENCH_HISTORY = "bench_history.csv"
+BENCH_REPEAT = 3 # 每個項目量測次數 (取最快的一次)；人數超過 REPEAT_MAX_SIZE 時只量一次
+REPEAT_MAX_SIZE = 100_000
+REGRESSION_RATIO = 1.5 # 比最近幾次的中位數慢這麼多倍視為退步
+REGRESSION_MIN_SECONDS = 0.05 # 差距小於此秒數時不算退步 (計時誤差)
+HISTORY_WINDOW = 5
+TOKENIZE_MAX_ANSWERS = 20_000 # 斷詞最多量測這麼多則回覆 (jieba 約每秒數萬字)
+MATCH_MAX_QUESTIONS = 2_000 # 模糊比對的題目數上限 (兩份題庫各這麼多題)
+FUZZY_THRESHOLD = 80 # 與 mapping.py 相同
+Y_QUESTION = "Q104" # 相關 / 迴歸篩選的依變項 (與 Dashboard 關聯性分析頁相同)
+
+HISTORY_COLUMNS = ["Timestamp", "Commit", "Size", "Step", "Items", "Seconds"]
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def synthetic_file(n, seed=synthetic.SYNTHETIC_SEED, profile=None):
+    """
+    n 位受訪者的合成資料檔路徑 (不存在時才產生)。
+    """
+    os.makedirs(BENCH_DATA_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DATA_DIR, f"synthetic_{n}_{seed}.csv")
+    if not os.path.exists(path):
+        synthetic.write_csv(path + ".tmp", n, profile=profile, seed=seed)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+# --- 量測項目：每個函式接收 context (dict)，回傳處理的項目數；需要的中間結果存回 context ---
+def step_ingest(ctx):
+    import ingest
+
+    ctx["raw"], _ = ingest.read_export(ctx["path"], pd.read_csv("codebook.csv"))
+    return len(ctx["raw"])
+
+
+def step_pipeline(ctx):
+    import preprocess
+
+    ctx["results"] = preprocess.run_pipeline(df_raw=ctx["raw"])
+    return len(ctx["raw"])
+
+
+def step_stream_load(ctx):
+    import aggregator
+
+    ctx["stream"] = aggregator.SurveyStream(ctx["path"])
+    return len(ctx["stream"].cleaned)
+
+
+def step_grouped_cross(ctx):
+    stream = ctx["stream"]
+    stream.derived.clear() # 每次都重新計算
+    return len(stream.grouped_stats(("Q2", "Q4_grouped")))
+
+
+def step_distributions(ctx):
+    import aggregator
+
+    # 以串流的次數表建立新的索引 (每次都重新計算佔比、信賴區間與排序)
+    source = ctx["stream"].distributions
+    index = aggregator.DistributionIndex.from_frame(
+        source.counts_frame(), source.questions, source.numeric_questions
+    )
+    index.option_orders = dict(source.option_orders)
+    index.get("Q6")
+    return len(index.counts)
+
+
+def _x_columns(ctx):
+    overall = ctx["results"]["overall"]
+    return [q for q in overall["New_Column"] if q not in ("Q100", "Q104", "Q4", "Q5")]
+
+
+def step_correlation(ctx):
+    import analysis
+
+    x_cols = _x_columns(ctx)
+    analysis.correlation_screen(ctx["results"]["cleaned"], Y_QUESTION, x_cols)
+    analysis.correlation_matrix(ctx["results"]["cleaned"], x_cols)
+    return len(x_cols)
+
+
+def step_regression(ctx):
+    import analysis
+
+    x_cols = _x_columns(ctx)
+    analysis.regression_screen(ctx["results"]["cleaned"], Y_QUESTION, x_cols)
+    return len(x_cols)
+
+
+def step_tokenize(ctx):
+    import jieba
+    import textmining
+
+    jieba.initialize() # 詞典載入 (約 1 秒) 不計入斷詞時間
+    raw = ctx["results"]["raw"]
+    texts = [
+        text
+        for q in textmining.QUALITATIVE_Q_NUMBERS if q in raw.columns
+        for text in textmining.answers(raw, q)
+    ][:TOKENIZE_MAX_ANSWERS]
+    textmining.tokenize(texts)
+    return len(texts)
+
+
+def step_fuzzy_match(ctx):
+    import matching
+
+    n = min(ctx["size"], MATCH_MAX_QUESTIONS)
+    texts = ctx["results"]["codebook"]["Original_Column"]
+    queries = synthetic.question_variants(texts, n, seed=1)
+    choices = synthetic.question_variants(texts, n, seed=2)
+    matching.match_questions(queries, choices, FUZZY_THRESHOLD)
+    return n
+
+
+# 依序執行 (後面的項目使用前面的結果)
+STEPS = {
+    "ingest": step_ingest,
+    "pipeline": step_pipeline,
+    "stream_load": step_stream_load,
+    "grouped_cross": step_grouped_cross,
+    "distributions": step_distributions,
+    "correlation": step_correlation,
+    "regression": step_regression,
+    "tokenize": step_tokenize,
+    "fuzzy_match": step_fuzzy_match,
+}
+STEP_REQUIRES = {
+    "pipeline": ["ingest"],
+    "grouped_cross": ["stream_load"],
+    "distributions": ["stream_load"],
+    "correlation": ["ingest", "pipeline"],
+    "regression": ["ingest", "pipeline"],
+    "tokenize": ["ingest", "pipeline"],
+    "fuzzy_match": ["ingest", "pipeline"],
+}
+
+
+def run(sizes=None, steps=None, repeat=BENCH_REPEAT):
+    """
+    執行基準測試，回傳結果 DataFrame (HISTORY_COLUMNS)。
+    steps 只指定部分項目時，其相依的項目仍會執行 (但不列入結果)。
+    """
+    selected = list(steps or STEPS)
+    needed = set(selected) | {dep for s in selected for dep in STEP_REQUIRES.get(s, [])}
+    profile = synthetic.survey_profile()
+    stamp = datetime.now().isoformat(timespec="seconds")
+    commit = _git_commit()
+
+    rows = []
+    for size in sizes or BENCH_SIZES:
+        ctx = {"size": size, "path": synthetic_file(size, profile=profile)}
+        n_repeat = repeat if size <= REPEAT_MAX_SIZE else 1
+        for name, step in STEPS.items():
+            if name not in needed:
+                continue
+            best = None
+            for _ in range(n_repeat):
+                start = time.perf_counter()
+                items = step(ctx)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            if name in selected:
+                rows.append([stamp, commit, size, name, items, best])
+                print(f"  n={size:<9,} {name:<14} {best:9.3f} s  ({items:,} 項)")
+    return pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+
+
+def compare(results, history):
+    """
+    與歷史紀錄中同一 (人數, 項目) 最近 HISTORY_WINDOW 次的中位數比較，
+    回傳加上 Baseline 與 Ratio 欄、以及 Regression (是否退步) 的 DataFrame。
+    """
+    recent = history.groupby(["Size", "Step"]).tail(HISTORY_WINDOW)
+    baseline = recent.groupby(["Size", "Step"])["Seconds"].median().rename("Baseline").reset_index()
+    out = results.merge(baseline, on=["Size", "Step"], how="left")
+    out["Ratio"] = out["Seconds"] / out["Baseline"]
+    out["Regression"] = (out["Ratio"] > REGRESSION_RATIO) & (
+        out["Seconds"] - out["Baseline"] > REGRESSION_MIN_SECONDS
+    )
+    return out
+
+
+def load_history(path=BENCH_HISTORY):
+    try:
+        return pd.read_csv(path)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+
+def record(results, path=BENCH_HISTORY):
+    results.to_csv(path, mode="a", index=False, header=not os.path.exists(path))
+
+
+def _option(name):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1].split(",")
+    return None
+
+
+if __name__ == "__main__":
+    sizes = [int(float(s)) for s in _option("--sizes") or BENCH_SIZES]
+    steps = _option("--steps")
+    unknown = [s for s in steps or [] if s not in STEPS]
+    if unknown:
+        print(f"未知的項目：{', '.join(unknown)}；可用的項目：{', '.join(STEPS)}")
+        sys.exit(2)
+
+    print(f"效能基準測試 (人數 {', '.join(f'{s:,}' for s in sizes)}，最多量測 {BENCH_REPEAT} 次取最快)")
+    results = run(sizes, steps)
+    report = compare(results, load_history())
+
+    regressions = report[report["Regression"]]
+    if report["Baseline"].notna().any():
+        print(f"\n與最近 {HISTORY_WINDOW} 次的中位數比較：")
+        for row in report.itertuples():
+            if pd.notna(row.Baseline):
+                flag = "變慢!" if row.Regression else ""
+                print(f"  n={row.Size:<9,} {row.Step:<14} {row.Baseline:9.3f} s -> {row.Seconds:9.3f} s  x{row.Ratio:.2f} {flag}")
+
+    if "--no-record" not in sys.argv:
+        record(results)
+        print(f"\n結果已附加到 {BENCH_HISTORY}")
+    sys.exit(1 if len(regressions) else 0)
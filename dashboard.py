@@ -3,17 +3,27 @@
 # 執行方式: python3 -m streamlit run dashboard.py
 # ---------------------------------------------------------------
 
-from pandas.core.nanops import F
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.io as pio
-import jieba 
-import wordcloud
-import matplotlib.pyplot as plt
+# [更新] jieba / wordcloud / statsmodels / scipy.stats 等較重的套件改為在需要的頁面才載入
+#        (啟動時間報告：python importprofile.py)
 import re # 用於質性頁面
-import statsmodels.api as sm # [新增] 迴歸分析套件
-from statsmodels.stats.proportion import proportion_confint
+import os # [新增] 檢查對照資料庫是否存在
+import preprocess # [新增] Python 版前處理 (取代 R 腳本)
+import aggregator # [新增] 增量彙總 (新回覆只累加，不重算)
+import datacache # [新增] 欄式快取 (冷啟動加速)
+import analysis # [新增] 批次 (向量化) 分析函式
+import store # [新增] 多年度 / 多校區資料模型 (穩定題號 + 緊湊回覆資料庫)
+import alignment # [新增] 題目對照資料庫 (mapping.py 產生，取代讀取 Excel)
+import figcache # [新增] 圖表快取 (所有使用者共用)
+import textmining # [新增] 質性回饋斷詞 / 詞雲快取
+import privacy # [新增] 小樣本隱藏 (分群統計已預先套用遮罩)
+import ingest # [新增] 表單匯出檔的欄位驗證
+import figures # [新增] 圖表產生函式 (與批次報表 report.py 共用)
+import textsearch # [新增] 質性回饋全文檢索 (倒排索引)
+import time # [新增] 顯示搜尋耗時
 
 # --- 0. 頁面設定 ---
 st.set_page_config(
@@ -25,52 +35,186 @@ st.set_page_config(
 pio.templates.default = "plotly_white"
 
 # --- 1. 資料載入 ---
-# 使用 @st.cache_data 來加速載入，避免重複讀取
-@st.cache_data
+# [更新] 使用 @st.cache_resource 保存增量彙總器 (所有使用者共用)，
+#        第一次完整載入，之後每次重新整理只讀取新增的表單回覆
+#        冷啟動時優先從 .survey_cache/ 的 Feather 快取讀回 (來源檔變動時自動失效)
+#        [新增] 題號由 question_registry.csv 對應 (表單改版、不同年度仍使用同一套 Q 編號)
+@st.cache_resource
+def get_question_registry():
+    return store.QuestionRegistry.load()
+
+# [新增] 頁面用到的衍生資料 (題目清單、X 選項、高低分題、質性題對照) 也放進資料串流的衍生結果快取 (derived.py)，
+#        依相依關係失效：只依賴題目 (schema) 的結果在有新回覆時不必重建
+DASHBOARD_DERIVED = {
+    "numeric_questions": ["schema"],
+    "ranked_questions": ["overall"],
+    "x_options": ["overall"],
+    "group_questions": ["suppressed"],
+    "qualitative_questions": ["schema"],
+}
+
+@st.cache_resource
+def get_survey_stream(path, wave, schema=None):
+    stream = aggregator.SurveyStream(
+        path, cache=datacache.FrameCache(), registry=get_question_registry(), wave=wave, schema=schema
+    )
+    for kind, depends in DASHBOARD_DERIVED.items():
+        stream.derived.define(kind, depends)
+    return stream
+
+# [新增] 跨年度 / 校區比較用的回覆資料庫 (只在有多個來源時載入)
+@st.cache_resource
+def get_response_store():
+    return store.load_store(store.SURVEY_SOURCES)
+
+# [新增] 選擇年度 / 學校 (只有一個來源時不顯示)
+SOURCE_LABELS = [f"{s['wave']} {s['school']}" for s in store.SURVEY_SOURCES]
+if len(SOURCE_LABELS) > 1:
+    source_label = st.sidebar.selectbox("年度 / 學校：", SOURCE_LABELS)
+else:
+    source_label = SOURCE_LABELS[0]
+source = store.SURVEY_SOURCES[SOURCE_LABELS.index(source_label)]
+
 def load_data():
     try:
-        # 彙總好的數值資料 (用於 Dashboard 主體)
-        df_overall = pd.read_csv("numeric_descriptive_stats.csv")
-        df_group = pd.read_csv("grouped_numeric_stats_by_Q2.csv")
-        df_seniority = pd.read_csv("grouped_numeric_stats_by_Q4.csv")
+        stream = get_survey_stream(source["path"], source["wave"], source.get("schema"))
+        stream.refresh() # 只處理新增的回覆 (沒有新資料時幾乎不花時間)
+        # [新增] 表單欄位與 codebook 不一致 (已依題目文字重新對應) 時提醒
+        if stream.ingest_report is not None and ingest.drift_summary(stream.ingest_report):
+            st.sidebar.warning(f"表單欄位有變動：{ingest.drift_summary(stream.ingest_report)}")
 
-        # 質性分析所需的「原始」資料
-        df_codebook = pd.read_csv("codebook.csv")
-        df_raw = pd.read_csv("2025 CZ Engagement survey (回覆) 的副本 - 表單回應 1.csv")
-        # [新增] 載入 R 腳本清理後的「全數值」原始資料 (N=18)
-        df_cleaned = pd.read_csv("cleaned_numeric_data.csv")
-        # [重要] 幫原始資料套上 Q 編號
-        df_raw.columns = df_codebook['New_Column'].values
-
-        return df_overall, df_group, df_seniority, df_raw, df_codebook, df_cleaned
+        # 彙總好的數值資料 (用於 Dashboard 主體)
+        df_overall = stream.overall_stats()
+        # [更新] 任意維度 / 交叉分群統計 + 各組平均數的 bootstrap 信賴區間 (依資料版本快取，已套用小樣本隱藏)
+        grouped_stats = stream.grouped_intervals
+
+        # 質性分析所需的「原始」資料 (已套上 Q 編號)
+        df_codebook = stream.codebook
+        df_raw = stream.raw
+        # 清理後的「全數值」原始資料
+        df_cleaned = stream.cleaned
+        # [新增] 預先算好的選項分配索引 (次數、佔比、Wilson 95% CI，可依 Q2 / Q4 切片)
+        dist_index = stream.distributions
+        # [新增] 資料版本 (有新回覆時改變，圖表快取以此為鍵的一部分)
+        data_version = stream.data_version
+        # [新增] 所有題目的組間差異排列檢定 (依資料版本快取，並存到磁碟)
+        group_tests = stream.group_tests
+
+        return df_overall, grouped_stats, df_raw, df_codebook, df_cleaned, dist_index, data_version, group_tests
 
     except FileNotFoundError as e:
-        st.error(f"錯誤：找不到必要的 CSV 檔案。請確保 {e.filename} 與 dashboard.py 在同一資料夾中。")
-        st.error("請確認您已執行 R 腳本，並產出 'codebook.csv', 'numeric_descriptive_stats.csv' 等檔案。")
-        return None, None, None, None, None, None
+        st.error(f"錯誤：找不到原始問卷檔案。請確保 {e.filename} 與 dashboard.py 在同一資料夾中。")
+        return None, None, None, None, None, None, None, None
+    except ingest.SchemaError as e:
+        st.error(f"錯誤：表單欄位與 codebook 不一致，已停止載入以免題號錯置。{e}")
+        return None, None, None, None, None, None, None, None
 
 # [重要] 修改這一行，接收新載入的資料
-df_overall, df_group, df_seniority, df_raw, df_codebook, df_cleaned = load_data()
+df_overall, grouped_stats, df_raw, df_codebook, df_cleaned, dist_index, DATA_VERSION, group_tests = load_data()
+
+# [新增] 圖表快取：以 (資料版本, 頁面, 題目, 分組...) 為鍵保存圖表 JSON (LRU，有記憶體上限)
+#        重複瀏覽同一張圖時跳過資料篩選與 Plotly 建圖
+@st.cache_resource
+def get_figure_cache():
+    return figcache.FigureCache()
+
+def cached_figure(key, builder):
+    return get_figure_cache().get_or_build((DATA_VERSION,) + key, builder)
+
+# [更新] build(stream) 在資料串流的鎖內執行並讀取目前的統計 (不與 refresh 同時進行，不會用到舊的資料表)
+def derived_result(kind, build, params=()):
+    stream = get_survey_stream(source["path"], source["wave"], source.get("schema"))
+    return stream.derived_result(kind, build, params)
+
+# [新增] 詞頻表 / 詞雲快取 (所有使用者共用)
+@st.cache_resource
+def get_text_miner():
+    return textmining.TextMiner()
+
+# [新增] 質性回饋全文檢索索引 (存在 .survey_cache/search/，有新回覆時只為新增的部分建索引)
+@st.cache_resource
+def get_feedback_index(path):
+    return textsearch.FeedbackIndex(textsearch.index_path(path))
 st.sidebar.title("分析維度")
-page = st.sidebar.radio(
-    "選擇您要查看的頁面：",
-    ("總體概況", 
+PAGES = ["總體概況", 
     "選項顯著性",
      "依「組別」分析", 
      "依「年資」分析", 
+     "交叉分析", # [新增]
+     "量表與信度", # [新增]
      "關聯性分析",
-     "質性回饋分析") # <-- 新增
+     "質性回饋分析"] # <-- 新增
+if len(SOURCE_LABELS) > 1:
+    PAGES.append("跨年度 / 校區比較") # [新增]
+if os.path.exists(alignment.ALIGNMENT_DB):
+    PAGES.append("與學校報表比較") # [新增] 執行過 mapping.py 後才會出現
+page = st.sidebar.radio(
+    "選擇您要查看的頁面：",
+    PAGES,
+    key="page", # [新增] importprofile.py 以此直接開啟指定頁面量測
 )
 
+# [新增] 分群頁面共用的繪圖函式：dims 為一個維度 (例如 ("Q2",)) 或兩個維度的交叉 (例如 ("Q2", "Q4_grouped"))
+GROUP_PAGES = {
+    "依「組別」分析": ("Q2",),
+    "依「年資」分析": ("Q4_grouped",),
+}
+
+def render_grouped_page(dims):
+    labels = [preprocess.dimension_config(d)["label"] for d in dims]
+    df_dim = grouped_stats(dims)
+
+    # (A) 讓使用者選擇要比較的題目
+    question_list = derived_result("group_questions", lambda s: s.grouped_stats(dims)['Original_Column'].unique(), dims)
+    selected_question = st.selectbox(
+        "請選擇您要比較的問題：",
+        question_list,
+        key=f"group_select_{'_'.join(dims)}"
+    )
+
+    # (B) 篩選出該題目的資料
+    df_dim_filtered = df_dim[df_dim['Original_Column'] == selected_question]
+    if df_dim_filtered.empty:
+        st.warning(f"找不到此題目的{labels[0]}資料。")
+        return
+
+    # 抓取該題的「整體平均數」
+    try:
+        overall_mean = df_overall.loc[df_overall['Original_Column'] == selected_question, 'Mean'].values[0]
+    except (IndexError, TypeError):
+        overall_mean = 0 # 備用，以防萬一
+
+    # (C) 繪製分組長條圖 (交叉分析時以顏色區分第二個維度；含 bootstrap 95% CI 與整體平均線)
+    st.plotly_chart(cached_figure(("分群", dims, selected_question), lambda: figures.group_figure(df_dim_filtered, dims, selected_question, overall_mean)), use_container_width=True)
+
+    # (D) [重要] 顯示 N 數
+    st.subheader("樣本數 (N) 提醒")
+    st.write(
+        "請注意：由於 N 數極小，以下圖表僅供『描述性觀察』。"
+        f"誤差線為 bootstrap 95% 信賴區間 (重抽 {analysis.BOOTSTRAP_RESAMPLES:,} 次)，N 小時區間很寬。"
+    )
+    st.dataframe(df_dim_filtered[list(dims) + ['N', 'Mean', 'CI_Low', 'CI_High', 'SD', 'Median', 'Suppressed']].set_index(list(dims)))
+
+    # [新增] 小樣本隱藏說明 (遮罩在建立統計表時就已套用)
+    hidden = df_dim_filtered[df_dim_filtered['Suppressed'] != ""]
+    if not hidden.empty:
+        names = [" x ".join(str(v) for v in row) for row in hidden[list(dims)].itertuples(index=False)]
+        st.info(
+            f"為保護個人作答隱私，作答人數少於 {privacy.MIN_CELL_SIZE} 人的組別不顯示數值；"
+            f"為避免由整體平均反推，另一組也會一併隱藏 (「{privacy.COMPLEMENTARY}」)。"
+            f"本題隱藏的組別：{'、'.join(names)}"
+        )
+
 # --- 3. 頁面內容 ---
-st.title("2025 誠致 Engagement Survey Dashboard")
+st.title(f"{source['wave']} {source['school']} Engagement Survey Dashboard")
+N_TOTAL = len(df_cleaned) if df_cleaned is not None else 0 # [更新] 樣本數不再寫死
 
 # ===================================================================
 # 頁面一：總體概況
 # ===================================================================
 if page == "總體概況":
     
-    st.header("總體概況 (N=18)")
+    st.header(f"總體概況 (N={N_TOTAL})")
     
     # (A) 顯示關鍵指標 (KPIs)
     st.subheader("關鍵指標 (Key Metrics)")
@@ -83,7 +227,7 @@ if page == "總體概況":
         col1.metric("整體滿意度 (Q104)", f"{overall_satisfaction:.2f} / 10")
         col2.metric("留任傾向 (Q100)", f"{retention:.2f} / 2")
     except IndexError:
-        st.error("錯誤：無法在 'numeric_descriptive_stats.csv' 中找到 Q104 或 Q100。請檢查 R 腳本是否正確執行。")
+        st.error("錯誤：無法在整體統計中找到 Q104 或 Q100。請檢查原始問卷資料是否包含這兩題。")
 
     st.divider()
 
@@ -91,53 +235,34 @@ if page == "總體概況":
     st.subheader("高分題 vs. 低分題")
     
     # 過濾掉 'Q4', 'Q5', 'Q100' (因為它們的量尺不同，不適合放在一起比較)
-    df_filtered_overall = df_overall[
-        ~df_overall['New_Column'].isin(['Q4', 'Q5', 'Q100', 'Q104']) & (df_overall['N'] > 0)
-    ]
+    def build_ranked_questions(stream):
+        df = stream.overall_stats()
+        return df[~df['New_Column'].isin(['Q4', 'Q5', 'Q100', 'Q104']) & (df['N'] > 0)]
+
+    df_filtered_overall = derived_result("ranked_questions", build_ranked_questions)
     
     col1, col2 = st.columns(2)
     
     # 高分題
     with col1:
         st.write("平均分數最高的 10 題：")
-        df_top10 = df_filtered_overall.nlargest(10, 'Mean')
-        fig_top = px.bar(
-            df_top10.sort_values('Mean'), # 排序以便繪圖
-            x="Mean", 
-            y="Original_Column", 
-            orientation='h',
-            text='Mean',
-            title="Top 10 最高分題目"
-        )
-        fig_top.update_traces(texttemplate='%{x:.2f}', textposition='outside')
-        fig_top.update_layout(yaxis_title=None, xaxis_range=[df_top10['Mean'].min() * 0.9, df_top10['Mean'].max() * 1.05])
-        st.plotly_chart(fig_top, use_container_width=True)
+        # [更新] 圖表由 figures.py 產生 (與批次報表共用)
+        st.plotly_chart(cached_figure(("總體概況", "top10"), lambda: figures.ranked_questions_figure(df_filtered_overall, largest=True)), use_container_width=True)
 
     # 低分題
     with col2:
         st.write("平均分數最低的 10 題：")
-        df_low10 = df_filtered_overall.nsmallest(10, 'Mean')
-        fig_low = px.bar(
-            df_low10.sort_values('Mean', ascending=False), # 排序以便繪圖
-            x="Mean", 
-            y="Original_Column", 
-            orientation='h',
-            text='Mean',
-            title="Top 10 最低分題目"
-        )
-        fig_low.update_traces(texttemplate='%{x:.2f}', textposition='outside')
-        fig_low.update_layout(yaxis_title=None, xaxis_range=[df_low10['Mean'].min() * 0.9, df_low10['Mean'].max() * 1.23])
-        st.plotly_chart(fig_low, use_container_width=True)
+        st.plotly_chart(cached_figure(("總體概況", "low10"), lambda: figures.ranked_questions_figure(df_filtered_overall, largest=False)), use_container_width=True)
 
     # --- [修改] 查看單一題目的描述性統計 (含選項分佈圖) ---
     st.subheader("查看單一題目統計與分佈")
     
     try:
         # (C.1) 取得所有數值型題目的列表
-        all_numeric_questions = df_overall.sort_values(
+        all_numeric_questions = derived_result("numeric_questions", lambda s: s.overall_stats().sort_values(
             by='New_Column', 
             key=lambda col: col.str.replace('Q', '').astype(int)
-        )['Original_Column'].tolist()
+        )['Original_Column'].tolist())
         
         # (C.2) 建立下拉選單
         selected_question_overall = st.selectbox(
@@ -159,30 +284,13 @@ if page == "總體概況":
                 # B.1: 取得 Q 編號 (例如 'Q15')
                 selected_q_id = selected_stats['New_Column'].values[0]
                 
-                # B.2: 從 df_raw (原始資料) 中取得該欄位的次數分配
-                #      dropna() 會移除 'NA' (未填答)
-                df_counts = df_raw[selected_q_id].dropna().value_counts().reset_index()
-                df_counts.columns = ['選項 (原始文字)', '次數 (N)']
+                # B.2: [更新] 從預先建好的選項分配索引查表 (不含 NA / 未填答)
+                df_counts = figures.option_table(dist_index.get(selected_q_id))
+                if df_counts.empty:
+                    raise KeyError(selected_q_id)
                 
-                # B.3: 繪圖 (依選項文字排序，使其符合 1, 2, 3, 4 的順序)
-                fig_dist = px.bar(
-                    df_counts.sort_values(by='選項 (原始文字)'), 
-                    x='選項 (原始文字)', 
-                    y='次數 (N)', 
-                    text='次數 (N)',
-                    title=f"「{selected_question_overall}」的選項分佈"
-                )
-                fig_dist.update_traces(textposition='outside')
-                
-                # B.4: [*** 修正 ***] 將 yaxis_range 放在正確的 update_layout 中
-                max_y_val = df_counts['次數 (N)'].max()
-                fig_dist.update_layout(
-                    xaxis_title="填答選項", 
-                    yaxis_title="次數 (N)",
-                    yaxis_range=[0, max_y_val * 1.15] # 增加 15% 緩衝
-                )
-                
-                st.plotly_chart(fig_dist, use_container_width=True)
+                # B.3: 繪圖 (索引已依選項排序：數值題依大小，Likert 題依 1, 2, 3, 4 的順序)
+                st.plotly_chart(cached_figure(("總體概況", "dist", selected_q_id), lambda: figures.distribution_figure(df_counts, selected_question_overall)), use_container_width=True)
 
             except KeyError:
                 # 如果 Q 編號不在 df_raw 中 (理論上不應發生)
@@ -211,10 +319,10 @@ elif page == "選項顯著性":
     
     try:
         # 1. 取得所有「數值型」題目的列表 (用於下拉選單)
-        all_numeric_questions = df_overall.sort_values(
+        all_numeric_questions = derived_result("numeric_questions", lambda s: s.overall_stats().sort_values(
             by='New_Column', 
             key=lambda col: col.str.replace('Q', '').astype(int)
-        )['Original_Column'].tolist()
+        )['Original_Column'].tolist())
         
         # 2. 建立下拉選單
         selected_question_ci = st.selectbox(
@@ -226,48 +334,25 @@ elif page == "選項顯著性":
         # 3. 取得 Q 編號
         selected_q_id = df_overall[df_overall['Original_Column'] == selected_question_ci]['New_Column'].values[0]
 
-        # 4. 從 df_raw (原始資料) 中取得該欄位的次數分配
-        df_counts = df_raw[selected_q_id].dropna().value_counts().reset_index()
-        df_counts.columns = ['選項 (原始文字)', '次數 (N)']
-        
-        # 5. 計算總 N 數 (用於計算佔比)
-        N_total = df_counts['次數 (N)'].sum()
-        
-        # 6. 計算佔比與 95% 信賴區間
-        df_counts['佔比'] = df_counts['次數 (N)'] / N_total
-        
-        # 使用 statsmodels 計算信賴區間 (Wilson C.I. 較適合小樣本)
-        ci_low, ci_high = proportion_confint(df_counts['次數 (N)'], N_total, method='wilson')
-        
-        # 計算誤差線 (error bar) 需要的值
-        df_counts['CI (下限)'] = ci_low
-        df_counts['CI (上限)'] = ci_high
-        df_counts['誤差 (上)'] = df_counts['CI (上限)'] - df_counts['佔比']
-        df_counts['誤差 (下)'] = df_counts['佔比'] - df_counts['CI (下限)']
+        # 4. [新增] 選擇要查看的族群 (全體 / 依組別 / 依年資)
+        #    [更新] 人數少於 privacy.MIN_CELL_SIZE 的族群與互補隱藏的族群不提供切片 (選項分配會透露個人回答)
+        slice_options = {"全體": ("All", dist_index.ALL)}
+        for g in dist_index.groups("Q2", k=privacy.MIN_CELL_SIZE, question=selected_q_id):
+            slice_options[f"組別：{g}"] = ("Q2", g)
+        for g in dist_index.groups("Q4_grouped", k=privacy.MIN_CELL_SIZE, question=selected_q_id):
+            slice_options[f"年資：{g}"] = ("Q4_grouped", g)
+        selected_slice = st.selectbox("篩選族群：", slice_options.keys(), key="ci_slice")
+        slice_dim, slice_group = slice_options[selected_slice]
 
-        
-        # 7. 繪圖 (依選項文字排序)
-        fig_ci = px.bar(
-            df_counts.sort_values(by='選項 (原始文字)'), 
-            x='選項 (原始文字)', 
-            y='佔比', 
-            text=df_counts.apply(lambda row: f"{row['佔比']:.1%} (N={row['次數 (N)']})", axis=1), # 顯示百分比和 N 數
-            title=f"「{selected_question_ci}」的選項分佈 (含 95% 信賴區間)",
-            error_y='誤差 (上)', # 加入誤差線 (上)
-            error_y_minus='誤差 (下)' # 加入誤差線 (下)
-        )
-        fig_ci.update_traces(textposition='outside')
-        
-        # 8. 調整 Y 軸緩衝，並設定 Y 軸為百分比格式
-        max_y_val = df_counts['CI (上限)'].max() # 以信賴區間的上限為基準
-        fig_ci.update_layout(
-            xaxis_title="填答選項", 
-            yaxis_title="佔比 (Percentage)",
-            yaxis_range=[0, max_y_val * 1.15], # 增加 15% 緩衝
-            yaxis_tickformat='.0%' # Y 軸改為百分比
-        )
-        
-        st.plotly_chart(fig_ci, use_container_width=True)
+        # 5. [更新] 從預先建好的索引查表：次數、佔比與 Wilson 95% 信賴區間都已算好
+        #    (Wilson C.I. 較適合小樣本)
+        df_counts = figures.option_table(dist_index.get(selected_q_id, slice_dim, slice_group))
+
+        # 6. 總 N 數
+        N_total = int(df_counts['次數 (N)'].sum())
+
+        # 7. 繪圖 (索引已依選項排序)
+        st.plotly_chart(cached_figure(("選項顯著性", selected_q_id, slice_dim, slice_group), lambda: figures.ci_figure(df_counts, selected_question_ci)), use_container_width=True)
         
         st.info(
             "**如何解讀上圖：**\n"
@@ -278,157 +363,110 @@ elif page == "選項顯著性":
 
     except Exception as e_ci:
         st.error(f"繪製選項顯著性圖表時發生錯誤: {e_ci}")
-        st.error(f"請確認 `statsmodels` 套件已加入 `requirements.txt` 並安裝成功。")
+        st.error("請確認所選的題目有選項分配 (開放題不適用)，且所選族群的作答人數足夠。")
+
+    # [新增] 組間差異篩選：所有題目的排列檢定 (不需卡方 / 常態假設)，已預先算好並快取
+    st.markdown("---")
+    st.subheader("組間差異篩選 (排列檢定)")
+    test_dims = {"組別 (Q2)": "Q2", "年資 (Q4)": "Q4_grouped"}
+    selected_test_dim = st.radio("比較的分群：", list(test_dims), horizontal=True, key="perm_dim")
+    df_tests = group_tests(test_dims[selected_test_dim])
+    st.caption(
+        f"每一題隨機重排組別標籤 {analysis.PERMUTATIONS:,} 次，p 值 = 排列後組間差異 ≥ 實際差異的比例；"
+        f"Q 值為 Benjamini-Hochberg FDR 校正 (同時檢定多題時控制誤判比例)。"
+        f"人數少於 {privacy.MIN_CELL_SIZE} 人的組別不列入檢定。Eta² 為組間差異可解釋的變異比例。"
+    )
+    st.dataframe(
+        df_tests.rename(columns={
+            'Original_Column': '問題',
+            'Groups': '組數',
+            'Eta_Squared': 'Eta²',
+            'P_Value': 'p 值',
+            'Q_Value': 'Q 值 (FDR)',
+            'Significant': f'顯著 (Q < {analysis.FDR_ALPHA})'
+        }).set_index('New_Column'),
+        use_container_width=True
+    )
 
 # ===================================================================
-# 頁面二：依「組別」分析
+# 頁面二 / 三：依「組別」、「年資」分析 + 交叉分析  <-- [更新] 共用同一個分群引擎
 # ===================================================================
-elif page == "依「組別」分析":
-    st.header("依「組別」(Q2) 分析")
-    
-    # (A) 讓使用者選擇要比較的題目
-    question_list = df_group['Original_Column'].unique()
-    
-    selected_question = st.selectbox(
-        "請選擇您要比較的問題：",
-        question_list
-    )
-    
-    # (B) 篩選出該題目的資料
-    df_group_filtered = df_group[df_group['Original_Column'] == selected_question]
-    
-    # [新增] 抓取該題的「整體平均數」
-    try:
-        overall_mean_row = df_overall[df_overall['Original_Column'] == selected_question]
-        overall_mean = overall_mean_row['Mean'].values[0]
-    except (IndexError, TypeError):
-        overall_mean = 0 # 備用，以防萬一
-    
-    # (C) 繪製分組長條圖
-    if not df_group_filtered.empty:
-        fig_group = px.bar(
-            df_group_filtered,
-            x="Q2",
-            y="Mean",
-            color="Q2",
-            text="Mean",
-            title=f"各組別在「{selected_question}」的平均分數"
-        )
-        fig_group.update_traces(texttemplate='%{y:.2f}', textposition='outside')
-        
-        # [修改] 加入整體平均紅線 (使用手動座標)
-        fig_group.add_hline(
-            y=overall_mean, 
-            line_dash="dot", 
-            line_color="red",
-            
-            # 使用 annotation 字典手動指定位置
-            annotation=dict(
-                text=f"Mean: {overall_mean:.2f}",
-                xref="paper",       # 使用圖表寬度的百分比
-                x=0.85,             # 放在 95% 的位置 (非 100%)
-                xanchor='right',    # 文字的右側對齊 95% 的位置
-                yref="y",
-                y=overall_mean,
-                yanchor='bottom',   # 錨定在線的下方 (文字在線的上方)
-                font=dict(color="gray"),
-                showarrow=True
-            )
-        )
-        
-        # [修改] 整合 Y 軸範圍 (確保能容納長條圖與紅線)
-        max_val = max(df_group_filtered['Mean'].max(), overall_mean)
-        fig_group.update_layout(
-            xaxis_title="組別",
-            yaxis_range=[0, max_val * 1.15] # 增加 15% 緩衝
+elif page in GROUP_PAGES:
+    dims = GROUP_PAGES[page]
+    st.header(f"依「{preprocess.dimension_config(dims[0])['label']}」({dims[0].replace('_grouped', '')}) 分析")
+    render_grouped_page(dims)
+
+elif page == "交叉分析":
+    st.header("交叉分析 (任意分群維度)")
+
+    dimension_options = list(preprocess.GROUP_DIMENSIONS)
+    dimension_label = lambda d: f"{preprocess.dimension_config(d)['label']} ({d})"
+    col1, col2 = st.columns(2)
+    with col1:
+        main_dim = st.selectbox("主要維度 (X 軸)：", dimension_options, format_func=dimension_label)
+    with col2:
+        cross_dim = st.selectbox(
+            "交叉維度 (顏色)：",
+            ["(無)"] + [d for d in dimension_options if d != main_dim],
+            format_func=lambda d: d if d == "(無)" else dimension_label(d),
         )
+    render_grouped_page((main_dim,) if cross_dim == "(無)" else (main_dim, cross_dim))
 
-        st.plotly_chart(fig_group, use_container_width=True)
-        
-        # (D) [重要] 顯示 N 數
-        st.subheader("樣本數 (N) 提醒")
-        st.write("請注意：由於 N 數極小，以下圖表僅供『描述性觀察』，不具統計推論意義。")
-        st.dataframe(df_group_filtered[['Q2', 'N', 'Mean', 'SD', 'Median']].set_index('Q2'))
-        
-    else:
-        st.warning("找不到此題目的分組資料。")
 
 # ===================================================================
-# 頁面三：依「年資」分析
+# [新增] 量表與信度：多題組合指標 (例如敬業度指標)、Cronbach's alpha、依組別 / 年資切片
 # ===================================================================
-elif page == "依「年資」分析":
-    st.header("依「年資」(Q4) 分析")
+elif page == "量表與信度":
+    st.header("量表與信度分析")
+    st.info(
+        "量表分數為該量表題目的平均 (反向題已轉換)，至少回答一半題目才計分。"
+        "Cronbach's alpha ≥ 0.7 一般視為內部一致性可接受；"
+        f"N={N_TOTAL} 時 alpha 的估計誤差很大，僅供參考。"
+    )
+    stream = get_survey_stream(source["path"], source["wave"], source.get("schema"))
+    df_reliability, df_items = stream.scale_reliability()
+
+    st.subheader("各量表信度")
+    st.dataframe(
+        df_reliability.rename(columns={
+            'Label': '量表',
+            'Items': '題數',
+            'N_Complete': '完整作答人數',
+            'Mean_Inter_Item_r': '題目間平均相關'
+        }).set_index('Scale'),
+        use_container_width=True
+    )
 
-    # (A) 讓使用者選擇要比較的題目
-    question_list_sen = df_seniority['Original_Column'].unique()
-    
-    selected_question_sen = st.selectbox(
-        "請選擇您要比較的問題：",
-        question_list_sen
+    scale_labels = dict(zip(df_reliability['Scale'], df_reliability['Label']))
+    selected_scale = st.selectbox(
+        "請選擇量表：", list(scale_labels), format_func=scale_labels.get, key="scale_select"
     )
-    
-    # (B) 篩選出該題目的資料
-    df_sen_filtered = df_seniority[df_seniority['Original_Column'] == selected_question_sen]
-    
-    # [新增] 抓取該題的「整體平均數」
-    try:
-        overall_mean_row_sen = df_overall[df_overall['Original_Column'] == selected_question_sen]
-        overall_mean_sen = overall_mean_row_sen['Mean'].values[0]
-    except (IndexError, TypeError):
-        overall_mean_sen = 0 # 備用，以防万一
-    
-    # (C) [重要] 確保年資的排序正確
-    seniority_order = ["1 年以下", "1-2 年", "2-3 年", "3 年以上"]
-    
-    if not df_sen_filtered.empty:
-        fig_sen = px.bar(
-            df_sen_filtered,
-            x="Q4_grouped",
-            y="Mean",
-            color="Q4_grouped",
-            text="Mean",
-            title=f"不同年資在「{selected_question_sen}」的平均分數"
-        )
-        fig_sen.update_traces(texttemplate='%{y:.2f}', textposition='outside')
-        
-        # [修改] 加入整體平均紅線 (使用手動座標)
-        fig_sen.add_hline(
-            y=overall_mean_sen, 
-            line_dash="dot", 
-            line_color="red",
-            
-            # 使用 annotation 字典手動指定位置
-            annotation=dict(
-                text=f"Mean: {overall_mean_sen:.2f}",
-                xref="paper",       # 使用圖表寬度的百分比
-                x=0.85,             # 放在 95% 的位置 (非 100%)
-                xanchor='right',    # 文字的右側對齊 95% 的位置
-                yref="y",
-                y=overall_mean_sen,
-                yanchor='bottom',   # 錨定在線的下方 (文字在線的上方)
-                font=dict(color="gray"),
-                showarrow=True
-            )
-        )
 
-        # [修改] 整合 Y 軸範圍 (確保能容納長條圖與紅線)
-        max_val_sen = max(df_sen_filtered['Mean'].max(), overall_mean_sen)
-        fig_sen.update_layout(
-            xaxis_title="總工作年資",
-            xaxis_categoryorder='array',
-            xaxis_categoryarray=seniority_order,
-            yaxis_range=[0, max_val_sen * 1.15] # 增加 15% 緩衝
-        )
+    # (A) 題目分析：刪題後 alpha 明顯上升的題目，可能與量表其他題目測量的不是同一件事
+    st.subheader("題目分析")
+    st.dataframe(
+        df_items[df_items['Scale'] == selected_scale].drop(columns='Scale').rename(columns={
+            'Original_Column': '題目',
+            'Item_Total_r': '校正後題目-總分相關',
+            'Alpha_If_Deleted': '刪除此題後 alpha'
+        }).set_index('New_Column'),
+        use_container_width=True
+    )
 
-        st.plotly_chart(fig_sen, use_container_width=True)
-        
-        # (D) [重要] 顯示 N 數
-        st.subheader("樣本數 (N) 提醒")
-        st.write("請注意：由於 N 數極小，以下圖表僅供『描述性觀察』，不具統計推論意義。")
-        st.dataframe(df_sen_filtered[['Q4_grouped', 'N', 'Mean', 'SD', 'Median']].set_index('Q4_grouped'))
-        
+    # (B) 依組別 / 年資切片 (已套用小樣本隱藏)
+    st.subheader("量表分數")
+    scale_dims = {"全體": (), "組別 (Q2)": ("Q2",), "年資 (Q4)": ("Q4_grouped",)}
+    selected_scale_dim = st.radio("分群：", list(scale_dims), horizontal=True, key="scale_dim")
+    dims = scale_dims[selected_scale_dim]
+    df_scale = stream.scale_stats(dims)
+    df_scale = df_scale[df_scale['New_Column'] == selected_scale]
+
+    if dims:
+        st.plotly_chart(cached_figure(("量表", selected_scale, dims), lambda: figures.scale_figure(df_scale, dims[0], scale_labels[selected_scale])), use_container_width=True)
+        st.dataframe(df_scale[list(dims) + ['N', 'Mean', 'SD', 'Median', 'Suppressed']].set_index(list(dims)))
     else:
-        st.warning("找不到此題目的年資資料。")
+        st.dataframe(df_scale[['Original_Column', 'N', 'Mean', 'SD', 'Median', 'Min', 'Max']].set_index('Original_Column'))
+
 
 # ===================================================================
 # 頁面四：關聯性分析 (Correlation)  <-- [*** 修改後的區塊 ***]
@@ -438,8 +476,8 @@ elif page == "關聯性分析":
     st.header("關聯性分析")
     st.warning(f"""
     **[重要] 統計限制提醒：**
-    由於總樣本數 N={len(df_cleaned)}，以下的相關係數與迴歸分析僅供**描述性觀察**。
-    此樣本數 (N=18) 太小，無法進行有意義的統計推論。
+    由於總樣本數 N={N_TOTAL}，以下的相關係數與迴歸分析僅供**描述性觀察**。
+    此樣本數 (N={N_TOTAL}) 太小，無法進行有意義的統計推論。
     """)
     st.markdown("---")
 
@@ -453,15 +491,20 @@ elif page == "關聯性分析":
     
     # 自變項 (X) 的選項 (排除 Q100, Q104, 和其他非評分題)
     # 我們從 df_overall 抓取所有題目，再排除 Y 軸的
-    x_options_df = df_overall[
-        ~df_overall['New_Column'].isin(['Q100', 'Q104', 'Q4', 'Q5']) & (df_overall['N'] > 0)
-    ].sort_values(by='New_Column', key=lambda col: col.str.replace('Q', '').astype(int))
-    
-    # 建立 {題目文字: Q編號} 的 X 軸字典
-    X_OPTIONS = x_options_df.set_index('Original_Column')['New_Column'].to_dict()
-    
-    # 建立 {Q編號: 題目文字} 的反向字典，供迴歸表使用
-    X_MAP_INV = x_options_df.set_index('New_Column')['Original_Column'].to_dict()
+    def build_x_options(stream):
+        df = stream.overall_stats()
+        x_options_df = df[
+            ~df['New_Column'].isin(['Q100', 'Q104', 'Q4', 'Q5']) & (df['N'] > 0)
+        ].sort_values(by='New_Column', key=lambda col: col.str.replace('Q', '').astype(int))
+
+        # 建立 {題目文字: Q編號} 的 X 軸字典，與 {Q編號: 題目文字} 的反向字典 (供迴歸表使用)
+        return (
+            x_options_df.set_index('Original_Column')['New_Column'].to_dict(),
+            x_options_df.set_index('New_Column')['Original_Column'].to_dict(),
+        )
+
+    # [更新] 依資料版本快取 (有新回覆才重建)
+    X_OPTIONS, X_MAP_INV = derived_result("x_options", build_x_options)
 
     # --- 2. 建立子分頁 (Tabs) ---
     tab1, tab2, tab3 = st.tabs([
@@ -505,24 +548,27 @@ elif page == "關聯性分析":
         st.metric(f"Pearson 相關係數 (r)", f"{correlation_r:.4f}")
         
         # 繪製散佈圖
-        fig_corr = px.scatter(
-            df_corr_data,
-            x="X_Value",
-            y="Y_Value",
-            labels={"X_Value": f"X: {selected_x_text}", "Y_Value": f"Y: {selected_y_text}"},
-            title=f"關聯性散佈圖",
-            trendline="ols",
-        )
+        def build_scatter_figure():
+            fig_corr = px.scatter(
+                df_corr_data,
+                x="X_Value",
+                y="Y_Value",
+                labels={"X_Value": f"X: {selected_x_text}", "Y_Value": f"Y: {selected_y_text}"},
+                title=f"關聯性散佈圖",
+                trendline="ols",
+            )
         
-        if y_q_id == 'Q100':
-             fig_corr.update_layout(
-                yaxis=dict(
-                    tickmode='array',
-                    tickvals=[0, 0.5, 1.5, 2.0],
-                    ticktext=["不考慮", "考慮 1 年內", "考慮 1-2 年", "考慮 2 年以上"]
+            if y_q_id == 'Q100':
+                 fig_corr.update_layout(
+                    yaxis=dict(
+                        tickmode='array',
+                        tickvals=[0, 0.5, 1.5, 2.0],
+                        ticktext=["不考慮", "考慮 1 年內", "考慮 1-2 年", "考慮 2 年以上"]
+                    )
                 )
-            )
-        st.plotly_chart(fig_corr, use_container_width=True)
+            return fig_corr
+
+        st.plotly_chart(cached_figure(("關聯性", y_q_id, x_q_id), build_scatter_figure), use_container_width=True)
 
     # ==================== TAB 2: 相關係數總表 ====================
     with tab2:
@@ -535,22 +581,17 @@ elif page == "關聯性分析":
         )
         y_q_id_corr = Y_OPTIONS[selected_y_corr_text]
 
-        all_correlations = []
-        y_series = df_cleaned[y_q_id_corr].dropna()
+        # [更新] 一次算出 Y 與所有 X 的相關係數 (每一對各自移除 NA)，不再逐題建立 DataFrame
+        df_screen = analysis.correlation_screen(df_cleaned, y_q_id_corr, X_OPTIONS.values())
+        df_screen = df_screen[df_screen['N'] > 1]
         
-        for x_text, x_id in X_OPTIONS.items():
-            x_series = df_cleaned[x_id]
-            combined_series = pd.DataFrame({'Y': y_series, 'X': x_series}).dropna()
-            
-            if len(combined_series) > 1:
-                corr = combined_series['Y'].corr(combined_series['X'])
-                all_correlations.append({
-                    "題目 (自變項)": x_text,
-                    "相關係數 (r)": corr,
-                    "N": len(combined_series)
-                })
+        all_correlations = pd.DataFrame({
+            "題目 (自變項)": df_screen.index.map(X_MAP_INV),
+            "相關係數 (r)": df_screen['r'].values,
+            "N": df_screen['N'].values
+        })
         
-        df_all_corr_sorted = pd.DataFrame(all_correlations).sort_values(
+        df_all_corr_sorted = all_correlations.sort_values(
             by="相關係數 (r)", 
             ascending=False
         )
@@ -564,7 +605,7 @@ elif page == "關聯性分析":
     # ==================== TAB 3: 最佳預測變項 (迴歸) ====================
     with tab3:
         st.subheader("最佳預測變項 (依 R-Squared 排序)")
-        st.error(f"**[!] 統計警告**：N=18，此表**不具推論意義**，僅供描述性參考。")
+        st.error(f"**[!] 統計警告**：N={N_TOTAL}，此表**不具推論意義**，僅供描述性參考。")
 
         selected_y_reg_text = st.selectbox(
             "選擇要預測的 依變項 (Y 軸)：",
@@ -573,51 +614,21 @@ elif page == "關聯性分析":
         )
         y_q_id_reg = Y_OPTIONS[selected_y_reg_text]
 
-        all_regressions = []
-        
-        # 取得 Y 軸的數值 (N=18)
-        Y_series_reg = df_cleaned[y_q_id_reg].dropna()
-
-        # 遍歷所有 X 變項
-        for x_text, x_id in X_OPTIONS.items():
-            
-            X_series_reg = df_cleaned[x_id]
-            
-            # 準備 X, Y 資料 (移除 NA)
-            df_reg_data = pd.DataFrame({'Y': Y_series_reg, 'X': X_series_reg}).dropna()
-            
-            N_effective = len(df_reg_data)
-            
-            # 必須至少有 N > 2 才能進行簡單迴歸
-            if N_effective > 2:
-                Y_reg = df_reg_data['Y']
-                X_reg = df_reg_data['X']
-                
-                # [重要] statsmodels 預設沒有截距項 (intercept)，我們必須手動加入
-                X_reg_with_const = sm.add_constant(X_reg) 
-                
-                try:
-                    model = sm.OLS(Y_reg, X_reg_with_const).fit()
-                    
-                    all_regressions.append({
-                        "題目 (自變項)": x_text,
-                        "R-Squared (解釋力)": model.rsquared,
-                        "Coef (係數)": model.params.iloc[1], # [1] 是 X 的係數, [0] 是 const
-                        "P>|t| (p-value)": model.pvalues.iloc[1],
-                        "N (有效樣本)": N_effective
-                    })
-                except Exception as e:
-                    # 處理計算錯誤 (例如 X 也是常數)
-                    all_regressions.append({
-                        "題目 (自變項)": x_text,
-                        "R-Squared (解釋力)": 0.0,
-                        "Coef (係數)": None,
-                        "P>|t| (p-value)": None,
-                        "N (有效樣本)": N_effective
-                    })
-
-        # 轉換為 DataFrame 並排序
-        df_all_reg_sorted = pd.DataFrame(all_regressions).sort_values(
+        # [更新] 以封閉解一次算出所有 X 的簡單迴歸 (斜率、R²、t 值、p 值)，
+        #        不再逐題呼叫 sm.OLS().fit()；必須至少有 N > 2 才能進行簡單迴歸
+        df_reg_screen = analysis.regression_screen(df_cleaned, y_q_id_reg, X_OPTIONS.values())
+        df_reg_screen = df_reg_screen[df_reg_screen['N'] > 2]
+
+        all_regressions = pd.DataFrame({
+            "題目 (自變項)": df_reg_screen.index.map(X_MAP_INV),
+            "R-Squared (解釋力)": df_reg_screen['r2'].values,
+            "Coef (係數)": df_reg_screen['slope'].values,
+            "P>|t| (p-value)": df_reg_screen['p'].values,
+            "N (有效樣本)": df_reg_screen['N'].values
+        })
+
+        # 依 R-Squared 排序
+        df_all_reg_sorted = all_regressions.sort_values(
             by="R-Squared (解釋力)", 
             ascending=False
         )
@@ -632,6 +643,17 @@ elif page == "關聯性分析":
             height=600,
             use_container_width=True
         )
+
+        # [新增] 只對使用者選定的題目執行完整的 statsmodels OLS
+        selected_x_reg_text = st.selectbox(
+            "查看單一題目的完整迴歸結果：",
+            df_all_reg_sorted["題目 (自變項)"],
+            key="reg_x_detail"
+        )
+        if selected_x_reg_text is not None:
+            with st.expander("完整迴歸報表 (statsmodels OLS)"):
+                model = analysis.fit_ols(df_cleaned, y_q_id_reg, X_OPTIONS[selected_x_reg_text])
+                st.text(model.summary().as_text())
 # ===================================================================
 # 頁面四：質性回饋分析 (修正版，處理 int 錯誤)
 # ===================================================================
@@ -641,36 +663,33 @@ elif page == "質性回饋分析":
     
 # --- (A) 準備質性資料 ---
     
-    # [真正正確的清單 v5.1，基於 codebook.csv]
-    # (包含 Q105, Q108; 排除 Q106, Q107)
-    QUALITATIVE_Q_NUMBERS = [
-        "Q13",  # 承上題，如有「其他」原因...
-        "Q42",  # 請描述或形容後台與學校協作的關係？
-        "Q43",  # 與學校協作方式，做什麼樣的改變...
-        "Q44",  # 針對 KIST 聯盟，我想要許願...
-        "Q45",  # 針對聯盟協作經驗，我想要補充...
-        "Q70",  # 我最喜歡 誠致 的地方是：
-        "Q71",  # 如果調整或改變這些事情...
-        "Q72",  # 相較過去我待過的組織...[更好]
-        "Q73",  # 相較過去我待過的組織...[需要加強]
-        "Q83",  # 誠致 所提供的 職場體驗，做什麼樣的改變...
-        "Q95",  # 我目前工作上，最有意義感或持續成長的時刻？
-        "Q102", # 對於自己在 誠致 的發展規劃與許願？
-        "Q105", # 歡迎補充上一題滿意度評分的原因是？
-        "Q107", #針對 誠致，我想要許願（非必填）
-        "Q108"  # 最後，我還想說（非必填）
-    ]
+    # [更新] 質性題目清單移到 textmining.py (斷詞快取會預先處理所有這些題目)
+    QUALITATIVE_Q_NUMBERS = textmining.QUALITATIVE_Q_NUMBERS
     
-    # 建立一個 {Q編號: 原始題目} 的對應字典
-    qual_questions_map = df_codebook[
-        df_codebook['New_Column'].isin(QUALITATIVE_Q_NUMBERS)
-    ].set_index('New_Column')['Original_Column'].to_dict()
-
-    # 建立一個 {原始題目: Q編號} 的反向對應
-    qual_questions_map_inv = {v: k for k, v in qual_questions_map.items()}
+    # 建立一個 {Q編號: 原始題目} 的對應字典，與 {原始題目: Q編號} 的反向對應
+    # [更新] 只依賴題目 (schema)，有新回覆時不必重建
+    def build_qualitative_maps(stream):
+        questions_map = stream.codebook[
+            stream.codebook['New_Column'].isin(QUALITATIVE_Q_NUMBERS)
+        ].set_index('New_Column')['Original_Column'].to_dict()
+        return questions_map, {v: k for k, v in questions_map.items()}
+
+    qual_questions_map, qual_questions_map_inv = derived_result("qualitative_questions", build_qualitative_maps)
+
+    # [新增] 質性回饋索引 (回饋瀏覽的排序 / 分頁與全文搜尋共用；資料版本沒變時直接跳過)
+    feedback_index = get_feedback_index(source["path"])
+    with st.spinner("更新回饋索引..."):
+        feedback_index.refresh(df_raw, df_cleaned, DATA_VERSION)
+
+    FEEDBACK_SORTS = {
+        "填答時間 (新 → 舊)": "newest",
+        "填答時間 (舊 → 新)": "oldest",
+        "字數 (多 → 少)": "longest",
+        "字數 (少 → 多)": "shortest",
+    }
 
     # --- (B) 建立子頁面 (Tabs) ---
-    tab1, tab2 = st.tabs(["回饋瀏覽", "詞雲"])
+    tab1, tab2, tab3 = st.tabs(["回饋瀏覽", "詞雲", "全文搜尋"]) # [新增] 全文搜尋
 
 # --- Tab 1: 互動式回饋瀏覽器 ---
     with tab1:
@@ -684,27 +703,37 @@ elif page == "質性回饋分析":
         )
         selected_q_id = qual_questions_map_inv[selected_q_text]
 
-        # (2) 篩選資料 [已移除]
-        # (No filtering needed)
-            
+        # (2) [更新] 排序與分頁：在索引 (SQLite) 中排序並只取出目前這一頁，
+        #     不再為每一筆回饋建立一個 st.expander (回饋多時頁面會非常慢)
+        col1, col2 = st.columns(2)
+        with col1:
+            selected_sort = st.selectbox("排序：", list(FEEDBACK_SORTS), key="browse_sort")
+        with col2:
+            browse_page_size = st.selectbox("每頁筆數：", [10, 20, 50, 100], index=1, key="browse_page_size")
+
         # (3) 顯示結果
         st.divider()
-        
-        # 取得該題目的所有非空回饋 (直接從 df_raw 取得)
-        feedbacks = df_raw[selected_q_id].dropna().tolist()
-        
-        st.write(f"#### 顯示 {len(feedbacks)} 筆回饋 (來自 {selected_q_text})")
-        
-        # --- [BUG 修正] ---
-        # 補回顯示回饋的迴圈 (Loop)
-        if not feedbacks:
+        n_feedbacks = feedback_index.count(questions=[selected_q_id])
+        st.write(f"#### 共 {n_feedbacks} 筆回饋 (來自 {selected_q_text})")
+
+        if not n_feedbacks:
             st.info("此問題沒有任何回饋。")
         else:
-            # 使用 expander 顯示每一筆回饋
-            for i, feedback in enumerate(feedbacks):
-                with st.expander(f"回饋 #{i+1}"):
-                    st.write(str(feedback)) 
-        # --- [修正結束] ---
+            n_pages = -(-n_feedbacks // browse_page_size)
+            browse_page = st.number_input(
+                f"頁數 (共 {n_pages} 頁)：", min_value=1, max_value=n_pages, value=1, step=1,
+                key=f"browse_page_{selected_q_id}"
+            )
+            feedbacks, _ = feedback_index.search(
+                questions=[selected_q_id], page=browse_page, page_size=browse_page_size,
+                sort=FEEDBACK_SORTS[selected_sort]
+            )
+            first = (browse_page - 1) * browse_page_size + 1
+            for i, feedback in enumerate(feedbacks.itertuples(), start=first):
+                submitted = feedback.Submitted[:10] if feedback.Submitted else "填答時間不明"
+                st.caption(f"回饋 #{i} · {submitted} · {len(feedback.Text)} 字")
+                st.write(str(feedback.Text))
+                st.divider()
     # --- Tab 2: 詞雲 ---
     with tab2:
         st.subheader("詞雲")
@@ -726,66 +755,177 @@ elif page == "質性回饋分析":
         
         if st.button("生成詞雲"):
             try:
-                # 載入詞雲套件
-                from wordcloud import WordCloud
-                import matplotlib.pyplot as plt
-                import jieba
-                
-                # (A) 取得所有文字並合併
                 selected_q_id_wc = qual_questions_map_inv[selected_q_text_wc]
-                
-                # --- [FIX] ---
-                # 1. 取得 non-null list
-                raw_list = df_raw[selected_q_id_wc].dropna().tolist()
-                # 2. 強制將 list 中的 "所有" 項目轉換為 string
-                string_list = [str(item) for item in raw_list]
-                # 3. 再 join
-                text_corpus = " ".join(string_list)
-                # --- [FIX END] ---
-                
-                if not text_corpus:
+
+                # [更新] 斷詞結果與詞雲圖片都依「回覆內容」快取 (所有使用者共用、重啟後仍有效)，
+                #        只有回覆改變時才重新斷詞 / 繪圖
+                text_miner = get_text_miner()
+                text_miner.prepare(df_raw, QUALITATIVE_Q_NUMBERS)
+
+                if not textmining.answers(df_raw, selected_q_id_wc):
                     st.info("此問題沒有任何文字回饋可生成詞雲。")
                 else:
-                    # (B) 建立中文停用詞 (Stop Words)
-                    stop_words = set([
-                        "的", "了", "我", "你", "他", "她", "我們", "你們", "他們", "她們",
-                        "是", "在", "有", "也", "會", "就", "都", "還", "與", "和", "或",
-                        "一個", "一些", "這個", "那個", "這些", "那些", "可以", "可能", 
-                        "覺得", "希望", "比較", "如果", "但", "但是", "所以", "因為",
-                        "不", "沒", "太", "很", "更", "最",
-                        " ", "\n", "nan"
-                    ])
-                    
-                    # (C) 使用 Jieba 斷詞
-                    word_list = jieba.cut_for_search(text_corpus)
-                    
-                    # 過濾掉停用詞
-                    filtered_words = [
-                        word for word in word_list 
-                        if word not in stop_words and len(word.strip()) > 1 
-                    ]
-                    
-                    if not filtered_words:
+                    wordcloud_png = text_miner.wordcloud_png(df_raw, selected_q_id_wc, font_path)
+
+                    if wordcloud_png is None:
                         st.info("過濾停用詞後，沒有足夠的詞彙可生成詞雲。")
                     else:
-                        # (D) 生成詞雲
-                        wc = WordCloud(
-                            font_path=font_path, 
-                            width=800,
-                            height=400,
-                            background_color="white",
-                            collocations=False 
-                        ).generate(" ".join(filtered_words))
-                        
-                        # (E) 繪製
-                        fig, ax = plt.subplots()
-                        ax.imshow(wc, interpolation='bilinear')
-                        ax.axis("off")
-                        st.pyplot(fig)
+                        st.image(wordcloud_png, use_container_width=True)
+
+                        # [新增] 詞頻表
+                        with st.expander("詞頻表 (前 30 個詞)"):
+                            st.dataframe(
+                                text_miner.term_frequencies(df_raw, selected_q_id_wc).head(30).set_index("Term"),
+                                use_container_width=True
+                            )
 
             except FileNotFoundError:
                 st.error(f"錯誤：找不到字體檔案 '{font_path}'。請確認路徑是否正確。")
             except ImportError:
                 st.error("錯誤：缺少必要的套件。請執行 `pip3 install jieba wordcloud matplotlib`")
             except Exception as e:
-                st.error(f"生成詞雲時發生錯誤：{e}")
\ No newline at end of file
+                st.error(f"生成詞雲時發生錯誤：{e}")
+
+    # --- [新增] Tab 3: 全文搜尋 (所有開放題，可依組別 / 年資篩選) ---
+    with tab3:
+        st.subheader("全文搜尋")
+        search_query = st.text_input(
+            "關鍵字 (以空白分隔，所有關鍵字都要出現；以 \"雙引號\" 或「」括住的為完整片語)：",
+            key="search_query"
+        )
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            search_questions = st.multiselect(
+                "題目 (未選 = 全部)：",
+                list(qual_questions_map),
+                format_func=lambda q: f"{q}: {qual_questions_map[q][:20]}",
+                key="search_questions"
+            )
+        # 人數少於 privacy.MIN_CELL_SIZE 的組別與互補隱藏的組別不提供篩選 (回覆內容可能直接對應到個人)
+        with col2:
+            search_groups = st.multiselect(
+                "組別 (Q2)：", dist_index.groups("Q2", k=privacy.MIN_CELL_SIZE), key="search_q2"
+            )
+        with col3:
+            search_seniority = st.multiselect(
+                "年資 (Q4)：", dist_index.groups("Q4_grouped", k=privacy.MIN_CELL_SIZE), key="search_q4"
+            )
+        search_filters = {"Q2": search_groups, "Q4_grouped": search_seniority}
+
+        # 組別 x 年資交叉後人數仍可能太少
+        in_filter = pd.Series(True, index=df_cleaned.index)
+        for dim, groups in search_filters.items():
+            if groups:
+                in_filter &= preprocess.dimension_values(df_cleaned, dim).isin(groups)
+        if in_filter.sum() < privacy.MIN_CELL_SIZE:
+            st.warning(f"篩選後的作答人數少於 {privacy.MIN_CELL_SIZE} 人，為保護填答者不顯示回覆。")
+        else:
+            search_sorts = {"題號": "question", **FEEDBACK_SORTS}
+            col1, col2 = st.columns(2)
+            with col1:
+                search_sort = st.selectbox("排序：", list(search_sorts), key="search_sort")
+            with col2:
+                page_no = st.number_input("頁數：", min_value=1, value=1, step=1, key="search_page")
+            search_start = time.perf_counter()
+            hits, total = feedback_index.search(
+                search_query, search_questions, search_filters, page=page_no, sort=search_sorts[search_sort]
+            )
+            search_ms = (time.perf_counter() - search_start) * 1000
+            n_pages = max(1, -(-total // textsearch.SEARCH_PAGE_SIZE))
+            st.caption(f"共 {total} 筆符合 (第 {page_no} / {n_pages} 頁，查詢耗時 {search_ms:.0f} ms)")
+
+            terms = textsearch.highlight_terms(search_query)
+            for hit in hits.itertuples():
+                st.markdown(f"**{hit.New_Column}** · {qual_questions_map.get(hit.New_Column, '')}")
+                st.write(textsearch.highlight(str(hit.Text), terms))
+                st.divider()
+
+# ===================================================================
+# 頁面七：跨年度 / 校區比較  <-- [新增]
+# ===================================================================
+elif page == "跨年度 / 校區比較":
+
+    st.header("跨年度 / 校區比較")
+    st.info("題號依題目文字對應 (question_registry.csv)，表單改版後同一題仍可跨年度比較。")
+
+    response_store = get_response_store()
+    df_compare = response_store.compare()
+
+    question_options = (
+        df_compare[["Question_ID", "Original_Column"]]
+        .drop_duplicates("Question_ID")
+        .assign(key=lambda d: preprocess.q_sort_key(d["Question_ID"]))
+        .sort_values("key")
+    )
+    question_labels = [
+        f"{qid}: {text}" for qid, text in zip(question_options["Question_ID"], question_options["Original_Column"])
+    ]
+    selected_label = st.selectbox("選擇題目：", question_labels)
+    selected_qid = selected_label.split(":")[0]
+
+    df_q = df_compare[df_compare["Question_ID"] == selected_qid].copy()
+    df_q["來源"] = df_q["wave"] + " " + df_q["school"]
+    fig_compare = px.bar(
+        df_q,
+        x="來源",
+        y="Mean",
+        error_y="SD",
+        color="school",
+        text=df_q["Mean"].round(2),
+        hover_data=["N"],
+        title=f"{selected_qid} 平均分 (誤差線 = 標準差)",
+    )
+    st.plotly_chart(fig_compare, use_container_width=True)
+    st.dataframe(
+        df_q[["wave", "school", "N", "Mean", "SD"]].style.format({"Mean": "{:.2f}", "SD": "{:.2f}"}),
+        use_container_width=True,
+    )
+    st.caption(f"回覆資料庫：{response_store.n_respondents()} 位填答者，陣列共 {response_store.memory_usage() / 1024:.1f} KB")
+
+# ===================================================================
+# 頁面八：與學校報表比較  <-- [新增]
+# ===================================================================
+elif page == "與學校報表比較":
+
+    st.header("與學校報表比較")
+    st.info("題目對照來自 mapping.py 產生的對照資料庫；後台平均分為目前最新的資料。")
+
+    df_alignment = alignment.load_comparison()
+    df_compare_school = df_alignment.merge(
+        df_overall[["Original_Column", "New_Column", "Mean", "N"]].rename(
+            columns={"Original_Column": "Backend_Question", "Mean": "Mean_Backend", "N": "N_Backend"}
+        ),
+        on="Backend_Question",
+        how="inner",
+    )
+    df_compare_school["差異 (後台 - 學校)"] = df_compare_school["Mean_Backend"] - df_compare_school["Mean_Teacher"]
+
+    status_filter = st.multiselect(
+        "配對狀態：",
+        ["confirmed", "suggested"],
+        default=["confirmed", "suggested"],
+    )
+    df_show = df_compare_school[df_compare_school["Status"].isin(status_filter)].sort_values(
+        "差異 (後台 - 學校)"
+    )
+
+    fig_school = px.bar(
+        df_show,
+        x="差異 (後台 - 學校)",
+        y="New_Column",
+        orientation="h",
+        color="Method",
+        hover_data=["Backend_Question", "Teacher_Question", "Mean_Backend", "Mean_Teacher", "Similarity_Score"],
+        title="後台平均分 - 學校報表平均分",
+    )
+    fig_school.update_layout(yaxis={"categoryorder": "array", "categoryarray": df_show["New_Column"].tolist()})
+    st.plotly_chart(fig_school, use_container_width=True)
+    st.dataframe(
+        df_show[[
+            "New_Column", "Backend_Question", "Teacher_Question", "Method", "Similarity_Score", "Status",
+            "N_Backend", "Mean_Backend", "Mean_Teacher", "差異 (後台 - 學校)",
+        ]].style.format({
+            "Similarity_Score": "{:.1f}", "Mean_Backend": "{:.2f}", "Mean_Teacher": "{:.2f}", "差異 (後台 - 學校)": "{:+.2f}",
+        }),
+        use_container_width=True,
+    )
@@ -0,0 +1,138 @@
+# ---------------------------------------------------------------
+# 誠致 2025 敬業度調查 - 欄式快取 (Feather)
+# 將解析、清理好的資料表存成未壓縮的 Feather 檔，冷啟動時以 memory map 讀回，
+# 不必再解析 CSV 與重跑前處理。
+# 快取以來源檔的 mtime / 大小 / 內容雜湊 (SHA-256) 為鍵，來源改變時自動失效。
+# ---------------------------------------------------------------
+
+import hashlib
+import json
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError: # pyarrow 未安裝時停用快取 (功能不受影響，只是比較慢)
+    pa = None
+    feather = None
+
+# --- 設定 ---
+CACHE_DIR = ".survey_cache"
+# 前處理邏輯有變動時請遞增，舊的快取會自動失效
+CACHE_VERSION = 3
+HASH_CHUNK_BYTES = 1 << 20
+
+
+def file_sha256(path, length=None):
+    """
+    計算檔案 (或前 length 個位元組) 的 SHA-256。
+    """
+    hasher = hashlib.sha256()
+    remaining = length
+    with open(path, "rb") as f:
+        while remaining is None or remaining > 0:
+            size = HASH_CHUNK_BYTES if remaining is None else min(HASH_CHUNK_BYTES, remaining)
+            chunk = f.read(size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return hasher.hexdigest()
+
+
+class FrameCache:
+    """
+    一個來源檔對應一組快取：<key>.manifest.json + <key>.<資料表名稱>.feather。
+    manifest 記錄來源檔的 mtime_ns、大小、已處理的位元組數 (offset) 與其 SHA-256。
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    @property
+    def enabled(self):
+        return feather is not None
+
+    def _path(self, key, name):
+        return os.path.join(self.cache_dir, f"{key}.{name}")
+
+    def _read_manifest(self, key):
+        try:
+            with open(self._path(key, "manifest.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def load(self, key, source_path):
+        """
+        來源檔未變 (或只在尾端新增資料) 時回傳 (資料表 dict, manifest)，否則回傳 None。
+        - mtime 與大小都相同：直接使用快取 (不需讀取來源檔)
+        - 其他情況：比對來源檔前 offset 個位元組的雜湊，相同代表只是附加了新回覆
+        呼叫端再從 manifest["offset"] 之後讀取新增的部分。
+        """
+        if not self.enabled:
+            return None
+        manifest = self._read_manifest(key)
+        if manifest is None or manifest.get("version") != CACHE_VERSION:
+            return None
+
+        stat = os.stat(source_path)
+        unchanged = stat.st_mtime_ns == manifest["mtime_ns"] and stat.st_size == manifest["size"]
+        if not unchanged:
+            if stat.st_size < manifest["offset"]:
+                return None
+            if file_sha256(source_path, manifest["offset"]) != manifest["sha256"]:
+                return None
+
+        try:
+            frames = {
+                name: feather.read_table(self._path(key, f"{name}.feather"), memory_map=True).to_pandas()
+                for name in manifest["frames"]
+            }
+        except (OSError, pa.ArrowException):
+            return None
+        return frames, manifest
+
+    def save(self, key, source_path, offset, sha256, frames, meta=None):
+        """
+        寫入快取。先寫資料檔再寫 manifest (皆以暫存檔 + rename 完成)，
+        中途失敗也不會留下不一致的快取。
+        """
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        for name, df in frames.items():
+            path = self._path(key, f"{name}.feather")
+            # 未壓縮才能真正以 memory map 讀取
+            feather.write_feather(df, path + ".tmp", compression="uncompressed")
+            os.replace(path + ".tmp", path)
+
+        stat = os.stat(source_path)
+        manifest = {
+            "version": CACHE_VERSION,
+            "source": os.path.abspath(source_path),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "offset": offset,
+            "sha256": sha256,
+            "frames": list(frames),
+            "meta": meta or {},
+        }
+        path = self._path(key, "manifest.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def clear(self, key):
+        """
+        刪除某個來源檔的所有快取檔案。
+        """
+        manifest = self._read_manifest(key)
+        names = ["manifest.json"] + [f"{n}.feather" for n in (manifest or {}).get("frames", [])]
+        for name in names:
+            try:
+                os.remove(self._path(key, name))
+            except FileNotFoundError:
+                pass
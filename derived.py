@@ -0,0 +1,102 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 衍生結果快取 (依資料版本與相依關係)
+# 分群統計、信賴區間、量表分數、頁面用的題目清單等都是「由資料算出來的結果」。
+# 每一種結果宣告它依賴哪些輸入 (例如 responses = 回覆資料版本、schema = 題目與欄位分類)
+# 或哪些其他結果，快取以「所依賴輸入的指紋」為鍵：
+# - 有新回覆時，只有依賴 responses 的結果失效；只依賴 schema 的結果 (題目清單...) 繼續使用
+# - 結果 A 依賴結果 B 時，B 的輸入改變也會讓 A 失效 (依相依關係遞移)
+# ---------------------------------------------------------------
+
+import hashlib
+import threading
+
+
+class DerivedCache:
+    """
+    執行緒安全的衍生結果快取。
+    dependencies：{結果種類: [依賴的輸入或結果種類, ...]}；沒有宣告的種類視為依賴所有輸入。
+    get(kind, build, params)：指紋相同時直接回傳快取的結果 (同一個物件，呼叫端請勿修改)，
+    否則呼叫 build() 重算。build 在鎖外執行 (可以再讀取其他結果，慢的計算也不會擋住其他使用者)；
+    計算期間輸入有變動時，結果只回傳、不存入快取。
+    """
+
+    def __init__(self, dependencies=None):
+        self.dependencies = {kind: list(deps) for kind, deps in (dependencies or {}).items()}
+        self._inputs = {} # 輸入名稱 -> 指紋
+        self._entries = {} # (種類, 參數) -> (指紋, 結果)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def define(self, kind, depends):
+        """
+        宣告 (或更新) 一種結果的相依關係。
+        """
+        with self._lock:
+            self.dependencies[kind] = list(depends)
+
+    def _fingerprint(self, name, seen=()):
+        if name in self._inputs:
+            return self._inputs[name]
+        if name in seen:
+            raise ValueError(f"衍生結果的相依關係有循環：{' -> '.join(seen + (name,))}")
+        deps = self.dependencies.get(name)
+        if deps is None:
+            deps = sorted(self._inputs) # 未宣告：保守地依賴所有輸入
+        parts = [f"{d}={self._fingerprint(d, seen + (name,))}" for d in deps]
+        return hashlib.sha1("|".join([name] + parts).encode("utf-8")).hexdigest()[:16]
+
+    def fingerprint(self, name):
+        """
+        輸入的指紋，或某種結果目前的指紋 (由所依賴輸入的指紋組成)。
+        """
+        with self._lock:
+            return self._fingerprint(name)
+
+    def set_input(self, name, fingerprint):
+        """
+        設定輸入的指紋 (例如 SurveyStream.data_version)。
+        指紋改變時移除所有受影響 (直接或間接依賴這個輸入) 的結果，回傳失效的結果種類。
+        """
+        fingerprint = str(fingerprint)
+        with self._lock:
+            if self._inputs.get(name) == fingerprint:
+                return []
+            self._inputs[name] = fingerprint
+            current = {}
+            stale = set()
+            for key, (fp, _) in list(self._entries.items()):
+                kind = key[0]
+                if kind not in current:
+                    current[kind] = self._fingerprint(kind)
+                if fp != current[kind]:
+                    del self._entries[key]
+                    stale.add(kind)
+            return sorted(stale, key=str)
+
+    def get(self, kind, build, params=()):
+        key = (kind, params)
+        with self._lock:
+            fp = self._fingerprint(kind)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fp:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = build()
+        with self._lock:
+            if self._fingerprint(kind) == fp:
+                self._entries[key] = (fp, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        快取狀態：結果數、命中 / 未命中次數。
+        """
+        with self._lock:
+            return {"items": len(self._entries), "hits": self.hits, "misses": self.misses}
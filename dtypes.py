@@ -0,0 +1,123 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 緊湊欄位型別
+# SurveyStream 保存的 raw / cleaned 資料表改用較小的型別：
+# (1) 分數 (Likert 0-4、0-10 分...)：整數且在 int8 範圍內 -> Int8 (以遮罩表示未填答)；
+#     Q4 / Q100 的 0.5、1.5 這類值 -> Float32 (只在轉換不失真時，否則維持 float64)
+# (2) 組別、職稱、Likert 選項文字等「選項少」的欄位 -> Categorical，
+#     類別順序依題型決定 (見 option_order)，不再依字串排序
+# 開放題與時間戳記維持字串。統計時一律以 to_numpy(dtype=float) 轉回 float64 (NA -> NaN)，結果不變。
+# ---------------------------------------------------------------
+
+import re
+
+import numpy as np
+import pandas as pd
+
+import preprocess
+
+# --- 設定 ---
+INT8_RANGE = (-128, 127)
+# 原始資料中以 Categorical 保存的題型 (數值題與開放題除外)
+RAW_CATEGORICAL_KINDS = ["likert_text", "custom_likert", "custom_numeric", "categorical"]
+
+SPECIAL_ORDERS = {
+    "Q4": list(preprocess.Q4_ENCODING),
+    "Q100": list(preprocess.Q100_ENCODING),
+}
+
+
+def option_order(q_id, values):
+    """
+    選項 (類別) 的順序：
+    - Q4 / Q100：依編碼表 (年資由短到長、留任意願由低到高)
+    - 有設定組別的分群欄位 (preprocess.GROUP_DIMENSIONS，例如 Q2)：依設定的組別順序
+    - Likert 選項 ("1 - 非常不同意" ...)：依開頭數字，不計分的選項 (例如「我不理解」) 排在最後
+    其餘選項依字元排序，接在上述順序之後。
+    """
+    values = list(dict.fromkeys(v for v in values if not pd.isna(v)))
+    present = set(values)
+    config = preprocess.GROUP_DIMENSIONS.get(q_id)
+    head = SPECIAL_ORDERS.get(q_id) or (config["groups"] if config else None) or []
+    head = [v for v in head if v in present]
+
+    rest = [v for v in values if v not in set(head)]
+    scored = [v for v in rest if re.match(preprocess.LIKERT_PATTERN, str(v))]
+    scored.sort(key=lambda v: (int(re.match(r"^\s*(\d+)", v).group(1)), v))
+    others = sorted((v for v in rest if v not in set(scored)), key=str)
+    return head + scored + others
+
+
+def _as_categorical(series, q_id):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = option_order(q_id, series.cat.categories)
+        return series.cat.set_categories(categories)
+    categories = option_order(q_id, series.dropna().unique())
+    return series.astype(pd.CategoricalDtype(categories))
+
+
+def downcast(series):
+    """
+    數值欄位改用最小的不失真型別：整數值 (含 NA) 且在 int8 範圍內 -> Int8，
+    float32 可精確表示的值 -> Float32，其他維持原樣。
+    """
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    present = values[~np.isnan(values)]
+    if np.isinf(present).any():
+        return series
+    if np.all(present == np.round(present)) and (
+        len(present) == 0 or INT8_RANGE[0] <= present.min() <= present.max() <= INT8_RANGE[1]
+    ):
+        return series.astype("Int8")
+    if np.array_equal(present.astype(np.float32), present):
+        return series.astype("Float32")
+    return series
+
+
+def _compact(df, categorical_cols, numeric_cols):
+    out = df.copy()
+    for col in categorical_cols:
+        if col in out.columns:
+            out[col] = _as_categorical(out[col], col)
+    for col in numeric_cols:
+        if col in out.columns:
+            out[col] = downcast(out[col])
+    return out
+
+
+def compact_raw(df_raw, col_types):
+    """
+    原始資料 (已套上 Q 編號)：選項文字 -> Categorical，數值題 -> Int8 / Float32。
+    """
+    categorical = [c for kind in RAW_CATEGORICAL_KINDS for c in col_types[kind]]
+    return _compact(df_raw, categorical, col_types["numeric"])
+
+
+def compact_cleaned(df_cleaned, col_types):
+    """
+    清理後的資料：所有分析用的數值欄位 -> Int8 / Float32，類別欄位 (Q2、Q3...) -> Categorical。
+    """
+    return _compact(df_cleaned, col_types["categorical"], preprocess.numeric_analysis_columns(col_types))
+
+
+def concat(frames):
+    """
+    合併分批載入的資料表。同一欄的 Categorical 先統一類別 (依 option_order 重新排序)，
+    否則 pd.concat 會把類別不同的欄位退回成字串。
+    """
+    frames = list(frames)
+    if len(frames) == 1:
+        return frames[0]
+    updates = [{} for _ in frames]
+    for col in frames[0].columns:
+        columns = [f[col] for f in frames]
+        if not any(isinstance(c.dtype, pd.CategoricalDtype) for c in columns):
+            continue
+        values = [
+            v for c in columns
+            for v in (c.cat.categories if isinstance(c.dtype, pd.CategoricalDtype) else c.dropna().unique())
+        ]
+        dtype = pd.CategoricalDtype(option_order(col, values))
+        for update, c in zip(updates, columns):
+            if c.dtype != dtype:
+                update[col] = c.astype(dtype)
+    return pd.concat([f.assign(**u) if u else f for f, u in zip(frames, updates)])
@@ -0,0 +1,78 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 圖表快取
+# 以 (頁面, 題目, 分組, 資料版本) 為鍵保存序列化後的 Plotly 圖表 (JSON)，
+# 同一張圖再次被瀏覽時不必重新篩選資料、也不必重新建立 Plotly 物件。
+# 採 LRU 淘汰，並限制總記憶體用量；所有使用者 (session) 共用同一份快取。
+# ---------------------------------------------------------------
+
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+# --- 設定 ---
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024 # 所有圖表 JSON 合計的上限
+FIGURE_CACHE_MAX_ITEMS = 1024
+
+
+class FigureCache:
+    """
+    執行緒安全的 LRU 圖表快取。
+    get_or_build(key, builder)：命中時直接回傳快取的圖表 (dict)；
+    否則呼叫 builder() 建立 Plotly Figure，序列化後存入快取。
+    回傳的 dict 每次都是新的複本，可直接交給 st.plotly_chart，也可放心修改。
+    """
+
+    def __init__(self, max_bytes=FIGURE_CACHE_MAX_BYTES, max_items=FIGURE_CACHE_MAX_ITEMS):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self._entries = OrderedDict() # key -> 圖表 JSON (UTF-8 bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, builder):
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if spec is None:
+            # 在鎖外建立圖表，避免一張慢的圖擋住其他使用者
+            spec = pio.to_json(builder(), validate=False).encode("utf-8")
+            self._store(key, spec)
+        return json.loads(spec)
+
+    def _store(self, key, spec):
+        size = len(spec)
+        with self._lock:
+            self.misses += 1
+            if size > self.max_bytes:
+                return # 單張圖就超過上限：不快取
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = spec
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_items:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        快取狀態：張數、總位元組數、命中 / 未命中次數。
+        """
+        with self._lock:
+            return {
+                "items": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
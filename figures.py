@@ -0,0 +1,173 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 圖表產生函式
+# Dashboard 各頁面與批次報表 (report.py) 共用同一套 Plotly 圖表，
+# 不依賴 Streamlit：輸入已彙總好的資料表，回傳 Plotly Figure。
+# ---------------------------------------------------------------
+
+import plotly.express as px
+
+import preprocess
+
+# 選項分配表 (aggregator.DistributionIndex.get 的輸出) 顯示用的欄位名稱
+OPTION_LABELS = {
+    "Value": "選項 (原始文字)",
+    "Count": "次數 (N)",
+    "Proportion": "佔比",
+    "CI_Low": "CI (下限)",
+    "CI_High": "CI (上限)",
+}
+
+
+def option_table(df_counts):
+    """
+    選項分配表改成顯示用的欄位名稱，並加上誤差線 (error bar) 需要的上下誤差。
+    """
+    table = df_counts.rename(columns=OPTION_LABELS)
+    if "佔比" in table.columns:
+        table = table.assign(**{
+            "誤差 (上)": table["CI (上限)"] - table["佔比"],
+            "誤差 (下)": table["佔比"] - table["CI (下限)"],
+        })
+    return table
+
+
+def ranked_questions_figure(df_overall, largest=True, n=10):
+    """
+    平均分數最高 (largest=True) 或最低的 n 題 (水平長條圖)。
+    """
+    if largest:
+        df_rank = df_overall.nlargest(n, "Mean")
+        df_plot = df_rank.sort_values("Mean") # 排序以便繪圖
+        title, margin = f"Top {n} 最高分題目", 1.05
+    else:
+        df_rank = df_overall.nsmallest(n, "Mean")
+        df_plot = df_rank.sort_values("Mean", ascending=False)
+        title, margin = f"Top {n} 最低分題目", 1.23
+    fig = px.bar(
+        df_plot,
+        x="Mean",
+        y="Original_Column",
+        orientation="h",
+        text="Mean",
+        title=title
+    )
+    fig.update_traces(texttemplate="%{x:.2f}", textposition="outside")
+    fig.update_layout(yaxis_title=None, xaxis_range=[df_rank["Mean"].min() * 0.9, df_rank["Mean"].max() * margin])
+    return fig
+
+
+def distribution_figure(df_counts, question):
+    """
+    單一題目的選項次數分佈 (df_counts 為 option_table 的輸出)。
+    """
+    fig = px.bar(
+        df_counts,
+        x="選項 (原始文字)",
+        y="次數 (N)",
+        text="次數 (N)",
+        title=f"「{question}」的選項分佈"
+    )
+    fig.update_traces(textposition="outside")
+    max_y_val = df_counts["次數 (N)"].max()
+    fig.update_layout(
+        xaxis_title="填答選項",
+        yaxis_title="次數 (N)",
+        yaxis_range=[0, max_y_val * 1.15] # 增加 15% 緩衝
+    )
+    return fig
+
+
+def ci_figure(df_counts, question):
+    """
+    單一題目的選項佔比與 Wilson 95% 信賴區間 (df_counts 為 option_table 的輸出)。
+    """
+    fig = px.bar(
+        df_counts,
+        x="選項 (原始文字)",
+        y="佔比",
+        text=df_counts.apply(lambda row: f"{row['佔比']:.1%} (N={row['次數 (N)']})", axis=1), # 顯示百分比和 N 數
+        title=f"「{question}」的選項分佈 (含 95% 信賴區間)",
+        error_y="誤差 (上)", # 加入誤差線 (上)
+        error_y_minus="誤差 (下)" # 加入誤差線 (下)
+    )
+    fig.update_traces(textposition="outside")
+
+    # 調整 Y 軸緩衝，並設定 Y 軸為百分比格式
+    max_y_val = df_counts["CI (上限)"].max() # 以信賴區間的上限為基準
+    fig.update_layout(
+        xaxis_title="填答選項",
+        yaxis_title="佔比 (Percentage)",
+        yaxis_range=[0, max_y_val * 1.15], # 增加 15% 緩衝
+        yaxis_tickformat=".0%" # Y 軸改為百分比
+    )
+    return fig
+
+
+def group_figure(df_dim, dims, question, overall_mean):
+    """
+    單一題目依分群維度的平均分數 (含 bootstrap 95% CI 與整體平均線)。
+    df_dim 為 SurveyStream.grouped_intervals 中該題的列；dims 有兩個時以顏色區分第二個維度。
+    """
+    labels = [preprocess.dimension_config(d)["label"] for d in dims]
+    # 組別順序 (例如年資依 1 年以下 -> 3 年以上)
+    category_orders = {
+        d: preprocess.dimension_config(d)["groups"] or sorted(df_dim[d].unique()) for d in dims
+    }
+    fig = px.bar(
+        df_dim,
+        x=dims[0],
+        y="Mean",
+        color=dims[-1],
+        barmode="group",
+        text="Mean",
+        error_y=df_dim["CI_High"] - df_dim["Mean"],
+        error_y_minus=df_dim["Mean"] - df_dim["CI_Low"],
+        category_orders=category_orders,
+        title=f"不同{' x '.join(labels)}在「{question}」的平均分數"
+    )
+    fig.update_traces(texttemplate="%{y:.2f}", textposition="outside")
+
+    # 加入整體平均紅線 (使用手動座標)
+    fig.add_hline(
+        y=overall_mean,
+        line_dash="dot",
+        line_color="red",
+        annotation=dict(
+            text=f"Mean: {overall_mean:.2f}",
+            xref="paper",
+            x=0.85,
+            xanchor="right",
+            yref="y",
+            y=overall_mean,
+            yanchor="bottom",
+            font=dict(color="gray"),
+            showarrow=True
+        )
+    )
+
+    # 整合 Y 軸範圍 (確保能容納長條圖與紅線；被隱藏的組別沒有平均數)
+    max_val = max(df_dim["CI_High"].fillna(0).max(), df_dim["Mean"].fillna(0).max(), overall_mean)
+    fig.update_layout(
+        xaxis_title=labels[0],
+        legend_title=labels[-1],
+        yaxis_range=[0, max_val * 1.15] # 增加 15% 緩衝
+    )
+    return fig
+
+
+def scale_figure(df_scale, dim, scale_label):
+    """
+    量表分數依分群維度的平均 (df_scale 為 SurveyStream.scale_stats 中該量表的列)。
+    """
+    config = preprocess.dimension_config(dim)
+    fig = px.bar(
+        df_scale,
+        x=dim,
+        y="Mean",
+        text="Mean",
+        category_orders={dim: config["groups"]},
+        title=f"不同{config['label']}的「{scale_label}」分數"
+    )
+    fig.update_traces(texttemplate="%{y:.2f}", textposition="outside")
+    fig.update_layout(yaxis_range=[0, 4.5])
+    return fig
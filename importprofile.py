@@ -0,0 +1,217 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - Dashboard 啟動時間 (import) 報告
+# 每個頁面在「全新的 Python 行程」中量測：
+#   (1) dashboard.py 頂層 import 的模組
+#   (2) 實際執行該頁面 (Streamlit AppTest) 時才載入的模組：以 python -X importtime 記錄，
+#       不需手動維護各頁面的模組清單，頁面改用其他套件時報告會自動反映
+#   (3) 頁面用到的套件第一次使用時的初始化 (例如 jieba 載入詞典，見 LAZY_INIT)
+# 並與 STARTUP_BUDGET_MS 比較，超過預算時以非 0 結束碼離開 (可放進 CI)。
+# 頁面清單取自 dashboard.py 的 PAGES (目前未啟用的頁面會略過)。
+# 執行方式: python importprofile.py [頁面名稱 ...] [--detail]
+# ---------------------------------------------------------------
+
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# --- 設定 ---
+DASHBOARD_FILE = "dashboard.py"
+# 每個頁面冷啟動 import 的時間預算 (毫秒)
+STARTUP_BUDGET_MS = 2500
+REPEAT = 3 # 每個頁面量測次數 (取中位數)
+PAGE_TIMEOUT_S = 300 # 執行一個頁面的時間上限 (第一次執行需載入資料)
+
+# 第一次使用時才做的初始化：頁面的執行路徑載入了這個模組時，在全新的行程中量測並計入該頁的預算
+LAZY_INIT = {
+    "jieba": "jieba.initialize()", # 載入斷詞詞典
+}
+
+_PROBE = """
+import importlib, json, sys, time
+sys.path.insert(0, {root!r})
+timings = []
+for name in {modules!r}:
+    start = time.perf_counter()
+    importlib.import_module(name)
+    timings.append([name, (time.perf_counter() - start) * 1000])
+print(json.dumps(timings))
+"""
+
+# 以 -X importtime 執行：先載入頂層模組與 AppTest，印出分隔標記後才執行頁面，
+# 標記之後的 import 紀錄就是這個頁面才載入的模組
+_PAGE_PROBE = """
+import importlib, json, os, sys
+sys.path.insert(0, {root!r})
+from streamlit.testing.v1 import AppTest
+for name in {modules!r}:
+    importlib.import_module(name)
+os.write(2, b"{marker}\\n")
+at = AppTest.from_file({dashboard!r}, default_timeout={timeout})
+at.session_state["page"] = {page!r}
+at.run()
+available = not at.exception and at.radio(key="page").value == {page!r}
+print(json.dumps({{"available": available, "modules": sorted(sys.modules)}}))
+"""
+_MARKER = "--- importprofile: page ---"
+
+
+def dashboard_imports(path=DASHBOARD_FILE):
+    """
+    dashboard.py 頂層 import 的模組 (依出現順序)。
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def dashboard_pages(path=DASHBOARD_FILE):
+    """
+    dashboard.py 的頁面清單：PAGES = [...] 以及之後依條件 PAGES.append(...) 的頁面。
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    pages = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "PAGES" for t in node.targets):
+            pages.extend(ast.literal_eval(node.value))
+        elif (
+            isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "append" and getattr(node.func.value, "id", None) == "PAGES"
+        ):
+            pages.append(ast.literal_eval(node.args[0]))
+    return list(dict.fromkeys(pages))
+
+
+def measure(modules, root="."):
+    """
+    在全新的行程中依序 import modules，回傳每個模組「額外」花費的毫秒數
+    (已被前面的模組載入的相依套件不重複計算)。
+    """
+    code = _PROBE.format(root=os.path.abspath(root), modules=list(modules))
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True
+    ).stdout
+    return dict(json.loads(out.strip().splitlines()[-1]))
+
+
+def _importtime(stderr):
+    """
+    解析 -X importtime 的輸出，回傳 [(模組, 自身毫秒, 累計毫秒, 巢狀層級), ...]。
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth))
+    return rows
+
+
+def measure_page(page, base, root="."):
+    """
+    在全新的行程中載入頂層模組後執行頁面，回傳該頁面才載入的模組：
+    {"available": 頁面目前是否啟用, "imports": {最外層模組: 累計毫秒}, "modules": 執行後已載入的模組}
+    """
+    code = _PAGE_PROBE.format(
+        root=os.path.abspath(root), modules=list(base), marker=_MARKER,
+        dashboard=os.path.abspath(os.path.join(root, DASHBOARD_FILE)), timeout=PAGE_TIMEOUT_S, page=page,
+    )
+    done = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=root, capture_output=True, text=True, check=True
+    )
+    result = json.loads(done.stdout.strip().splitlines()[-1])
+    _, _, after = done.stderr.partition(_MARKER)
+    result["imports"] = {name: cumulative for name, _, cumulative, depth in _importtime(after) if depth == 0}
+    return result
+
+
+def measure_init(module, call, root="."):
+    """
+    在全新的行程中 import module 後執行初始化 (LAZY_INIT)，回傳初始化本身的毫秒數。
+    """
+    code = (
+        f"import time, {module}; start = time.perf_counter(); {call}; "
+        "print((time.perf_counter() - start) * 1000)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True
+    ).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def heaviest_modules(modules, root=".", top=15):
+    """
+    以 python -X importtime 找出自身載入最久的模組 (self time)，回傳 [(模組, 毫秒), ...]。
+    """
+    code = "import sys; sys.path.insert(0, {!r}); ".format(os.path.abspath(root))
+    code += "; ".join(f"import {m}" for m in modules)
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=root, capture_output=True, text=True
+    ).stderr
+    rows = [(name, self_ms) for name, self_ms, _, _ in _importtime(err)]
+    return sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+
+
+def page_report(pages=None, root=".", repeat=REPEAT):
+    """
+    每個頁面的冷啟動時間。回傳 DataFrame 風格的 list of dict：
+    Page, Base_ms (頂層 import), Page_ms (執行該頁才載入的模組), Init_ms (LAZY_INIT 的初始化),
+    Total_ms, Over_Budget, Page_Modules (該頁才載入的最外層模組)
+    """
+    base = dashboard_imports(os.path.join(root, DASHBOARD_FILE))
+    base_ms = statistics.median(sum(measure(base, root).values()) for _ in range(repeat))
+    rows = []
+    for page in pages or dashboard_pages(os.path.join(root, DASHBOARD_FILE)):
+        runs = [measure_page(page, base, root) for _ in range(repeat)]
+        if not runs[0]["available"]:
+            continue
+        page_ms = statistics.median(sum(r["imports"].values()) for r in runs)
+        init_ms = sum(
+            statistics.median(measure_init(module, call, root) for _ in range(repeat))
+            for module, call in LAZY_INIT.items() if module in runs[0]["modules"]
+        )
+        total = base_ms + page_ms + init_ms
+        rows.append({
+            "Page": page,
+            "Base_ms": base_ms,
+            "Page_ms": page_ms,
+            "Init_ms": init_ms,
+            "Total_ms": total,
+            "Over_Budget": total > STARTUP_BUDGET_MS,
+            "Page_Modules": list(runs[0]["imports"]),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    detail = "--detail" in sys.argv
+
+    print(f"Dashboard 冷啟動時間 (預算 {STARTUP_BUDGET_MS} ms，每頁量測 {REPEAT} 次取中位數)")
+    rows = page_report(args or None)
+    for row in rows:
+        flag = "超過預算!" if row["Over_Budget"] else "OK"
+        print(
+            f"  {row['Page']:<12} 頂層 {row['Base_ms']:7.0f} ms + 頁面 {row['Page_ms']:7.0f} ms"
+            f" + 初始化 {row['Init_ms']:7.0f} ms = {row['Total_ms']:7.0f} ms  {flag}"
+        )
+
+    if detail:
+        base = dashboard_imports()
+        for row in rows:
+            print(f"\n[{row['Page']}] 頁面才載入的模組：{', '.join(row['Page_Modules']) or '(無)'}")
+            print("自身載入最久的模組：")
+            for name, ms in heaviest_modules(base + row["Page_Modules"]):
+                print(f"  {name:<40} {ms:7.1f} ms")
+
+    sys.exit(1 if any(row["Over_Budget"] for row in rows) else 0)
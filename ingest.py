@@ -0,0 +1,311 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 表單匯出檔讀取與欄位驗證
+# (1) 先只讀標頭，依「正規化後的題目文字」與預期的 codebook 比對：
+#     欄位順序改變 -> 依文字重新對應；新增 / 缺少的欄位 -> 依政策重新對應或拒絕
+#     (避免表單改版後，依位置套上的 Q 編號把每一題都標錯)
+# (2) 再分批 (chunk) 以明確的字串型別讀入資料，逐批統計每欄的型別與解析結果，
+#     最後才推斷數值欄位 (與 pandas read_csv 的推斷規則相同)
+# 執行方式: python ingest.py <表單匯出檔.csv> [--codebook codebook.csv] [--strict]
+# ---------------------------------------------------------------
+
+import csv
+import io
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+# --- 設定 ---
+INGEST_CHUNK_ROWS = 5000 # 每批讀入的列數 (限制解析時的記憶體用量)
+# 欄位與 codebook 不一致時的處理方式：
+# "remap"  = 依題目文字重新對應 (缺少的欄位補 NA，新增的欄位放在最後)
+# "reject" = 只要不一致就拒絕載入
+DRIFT_POLICY = "remap"
+NA_VALUES = ["", "NA"]
+
+REPORT_COLUMNS = ["Position", "Original_Column", "New_Column", "Expected_Position", "Status"]
+STATS_COLUMNS = ["Original_Column", "Type", "Non_Null", "Numeric", "Parse_Failures", "Max_Length"]
+
+
+def normalize_question(text):
+    """
+    題目文字正規化：只保留中文、英文和數字並轉小寫，讓標點、空白的小修改不影響比對。
+    標頭驗證、題號登錄表 (store.py) 與學校報表對照 (mapping.py) 共用這個規則。
+    """
+    if not isinstance(text, str):
+        return ""
+    return re.sub(r"[^\u4e00-\u9fa5a-zA-Z0-9]", "", text).lower()
+
+
+class SchemaError(ValueError):
+    """
+    表單欄位與 codebook 不一致，且政策為拒絕載入。
+    """
+
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+def _open_text(source):
+    if isinstance(source, (bytes, bytearray)):
+        return io.StringIO(bytes(source).decode("utf-8-sig"))
+    if isinstance(source, io.BytesIO):
+        return io.StringIO(source.getvalue().decode("utf-8-sig"))
+    return open(source, encoding="utf-8-sig", newline="")
+
+
+def read_header(source):
+    """
+    只讀取第一列 (欄位標題)，不解析任何資料列。
+    """
+    f = _open_text(source)
+    try:
+        return next(csv.reader(f), [])
+    finally:
+        f.close()
+
+
+def _mangle(columns):
+    """
+    重複的欄位名稱加上 .1、.2 (與 pandas read_csv 相同)。
+    """
+    seen, result = {}, []
+    for col in columns:
+        n = seen.get(col, 0)
+        seen[col] = n + 1
+        result.append(col if n == 0 else f"{col}.{n}")
+    return result
+
+
+def match_header(header, codebook):
+    """
+    依正規化後的題目文字 (同一文字出現多次時再依出現順序) 將標頭對應到 codebook。
+    回傳 (欄位報告, 缺少的 codebook 欄位)：
+    欄位報告每列一個標頭欄位：Position, Original_Column, New_Column, Expected_Position,
+    Status ("ok" / "moved" / "added")；缺少的欄位為 codebook 的子集 (New_Column, Original_Column)。
+    """
+    expected = {}
+    seen = {}
+    for pos, (qid, text) in enumerate(zip(codebook["New_Column"], codebook["Original_Column"])):
+        key = normalize_question(text)
+        occ = seen.get(key, 0)
+        seen[key] = occ + 1
+        expected[(key, occ)] = (qid, pos)
+
+    rows, matched, seen = [], set(), {}
+    for pos, text in enumerate(header):
+        key = normalize_question(text)
+        occ = seen.get(key, 0)
+        seen[key] = occ + 1
+        hit = expected.get((key, occ))
+        if hit is None:
+            rows.append([pos, text, None, None, "added"])
+            continue
+        qid, expected_pos = hit
+        matched.add(qid)
+        rows.append([pos, text, qid, expected_pos, "ok" if pos == expected_pos else "moved"])
+
+    report = pd.DataFrame(rows, columns=REPORT_COLUMNS)
+    missing = codebook[~codebook["New_Column"].isin(matched)][["New_Column", "Original_Column"]]
+    return report, missing.reset_index(drop=True)
+
+
+def _convert_chunk(values):
+    """
+    一批資料中的一欄 (已去除空白的字串)：只解析一次。
+    回傳 (可解析為數字的個數, 是否整批為數字, 這一批的值)：
+    整批都能解析 (或全部缺值) 時回傳解析後的數值，否則回傳原本的字串。
+    """
+    numbers = pd.to_numeric(values, errors="coerce")
+    parsed = int(numbers.notna().sum())
+    if parsed == int(values.notna().sum()):
+        return parsed, True, numbers
+    return parsed, False, values
+
+
+def _finish_column(parts):
+    """
+    合併一欄的各批數值，依 pandas read_csv 的推斷規則決定型別：
+    無缺值且皆為整數 -> int64，否則 float64 (全部缺值也是 float64)。
+    """
+    numbers = pd.concat(parts, ignore_index=True) if parts else pd.Series(dtype="float64")
+    if len(numbers) and numbers.notna().all() and (numbers == np.floor(numbers)).all():
+        return numbers.astype("int64")
+    return numbers.astype("float64")
+
+
+def _read_chunks(source, n_cols, chunksize, usecols=None):
+    if isinstance(source, io.BytesIO):
+        source.seek(0)
+    reader = pd.read_csv(
+        source,
+        header=0,
+        names=list(range(n_cols)),
+        usecols=usecols,
+        dtype=str,
+        keep_default_na=False,
+        na_values=NA_VALUES,
+        chunksize=chunksize,
+        encoding="utf-8-sig",
+    )
+    for chunk in reader:
+        yield chunk.apply(lambda s: s.str.strip())
+
+
+def read_export(source, codebook=None, policy=DRIFT_POLICY, chunksize=INGEST_CHUNK_ROWS):
+    """
+    讀取表單匯出檔 (路徑、bytes 或 BytesIO)，回傳 (df_raw, 報告 dict)。
+    df_raw 與 preprocess.load_raw 相同 (欄位為原始題目文字，字串已去除前後空白)。
+    傳入 codebook 時先驗證標頭 (在讀取任何資料列之前)：
+    - policy="remap"：欄位依 codebook 順序重排，缺少的欄位補 NA，新增的欄位接在最後
+    - policy="reject"：有任何不一致就丟出 SchemaError
+    報告：header (match_header 的欄位報告，沒有 codebook 時為 None)、missing、column_stats、rows
+    """
+    header = read_header(source)
+    report, missing = None, None
+    if codebook is not None:
+        report, missing = match_header(header, codebook)
+        drifted = (report["Status"] != "ok").any() or not missing.empty
+        if drifted and policy == "reject":
+            raise SchemaError(
+                f"表單欄位與 codebook 不一致：新增 {int((report['Status'] == 'added').sum())} 欄、"
+                f"缺少 {len(missing)} 欄、順序改變 {int((report['Status'] == 'moved').sum())} 欄",
+                report,
+            )
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    # 每一欄都以字串讀入 (不讓每一批各自推斷型別)，逐批去除空白、解析一次並累計統計；
+    # 整批都是數字的欄位只保留解析後的數值，不保留字串
+    n_cols = len(header)
+    parts = [[] for _ in range(n_cols)] # 每欄每批一個 (是否為數字, 值)
+    non_null = np.zeros(n_cols, dtype=np.int64)
+    numeric = np.zeros(n_cols, dtype=np.int64)
+    max_len = np.zeros(n_cols, dtype=np.int64)
+    for chunk in _read_chunks(source, n_cols, chunksize):
+        non_null += chunk.notna().sum().to_numpy()
+        lengths = chunk.apply(lambda s: s.str.len().max()).fillna(0).to_numpy(dtype=np.int64)
+        max_len = np.maximum(max_len, lengths)
+        for i in range(n_cols):
+            parsed, is_number, values = _convert_chunk(chunk[i])
+            numeric[i] += parsed
+            parts[i].append((is_number, values))
+
+    # 有任何一批無法完全解析 -> 文字欄位。前面幾批若已存成數值 (而且有值)，
+    # 只針對這些欄位再讀一次原始字串 (通常是少數選項被改成文字的欄位)
+    text = {i for i in range(n_cols) if not all(is_number for is_number, _ in parts[i])}
+    reread = [i for i in sorted(text) if any(is_number and values.notna().any() for is_number, values in parts[i])]
+    if reread:
+        strings = {i: [] for i in reread}
+        for chunk in _read_chunks(source, n_cols, chunksize, usecols=reread):
+            for i in reread:
+                strings[i].append((False, chunk[i]))
+        for i in reread:
+            parts[i] = strings[i]
+
+    columns = {}
+    for i in range(n_cols):
+        if i in text:
+            dtype = next(values.dtype for is_number, values in parts[i] if not is_number)
+            columns[i] = pd.concat([values.astype(dtype) for _, values in parts[i]], ignore_index=True)
+        else:
+            columns[i] = _finish_column([values for _, values in parts[i]])
+        parts[i] = None
+    df = pd.DataFrame(columns)
+    df.columns = _mangle(header)
+
+    column_stats = pd.DataFrame({
+        "Original_Column": header,
+        "Type": ["numeric" if pd.api.types.is_numeric_dtype(df.iloc[:, i]) else "text" for i in range(n_cols)],
+        "Non_Null": non_null,
+        "Numeric": numeric,
+        # 大部分可解析為數字、卻有少數解析失敗：可能是表單選項被改成文字
+        "Parse_Failures": np.where(numeric * 2 > non_null, non_null - numeric, 0),
+        "Max_Length": max_len,
+    }, columns=STATS_COLUMNS)
+
+    if report is not None and policy == "remap":
+        df = _remap(df, report, codebook)
+
+    return df, {"header": report, "missing": missing, "column_stats": column_stats, "rows": len(df)}
+
+
+def source_positions(report, codebook):
+    """
+    依 codebook 重新對應 (policy="remap") 後，每一欄來自表單匯出檔的第幾欄：
+    依 codebook 的順序 (缺少的題目為 None)，新增的欄位接在最後。
+    增量讀取新回覆時 (aggregator.SurveyStream.refresh) 也以此對應欄位，與完整載入一致。
+    """
+    by_position = dict(zip(report["Expected_Position"], report["Position"]))
+    positions = [by_position.get(pos) for pos in range(len(codebook))]
+    positions += report.loc[report["Status"] == "added", "Position"].tolist()
+    return [None if p is None else int(p) for p in positions]
+
+
+def _remap(df, report, codebook):
+    """
+    依 codebook 的順序重排欄位：缺少的題目補上全 NA 欄 (沿用 codebook 的題目文字)，
+    新增的欄位接在最後。依位置編號 (沒有題號登錄表) 時，原有題目的 Q 編號因此不會位移。
+    """
+    texts = list(codebook["Original_Column"])
+    parts = []
+    for i, src in enumerate(source_positions(report, codebook)):
+        if src is None:
+            parts.append(pd.Series(np.nan, index=df.index, dtype="float64", name=texts[i]))
+        else:
+            parts.append(df.iloc[:, src])
+    out = pd.concat(parts, axis=1)
+    out.columns = [s.name for s in parts]
+    return out
+
+
+def drift_summary(report):
+    """
+    給使用者看的簡短說明 (沒有不一致時回傳空字串)。
+    """
+    header, missing = report["header"], report["missing"]
+    if header is None:
+        return ""
+    parts = []
+    moved = header[header["Status"] == "moved"]
+    added = header[header["Status"] == "added"]
+    if not moved.empty:
+        parts.append(f"{len(moved)} 個欄位順序改變 (已依題目文字重新對應)")
+    if not added.empty:
+        parts.append(f"新增 {len(added)} 個欄位：{'、'.join(added['Original_Column'].str[:20])}")
+    if missing is not None and not missing.empty:
+        parts.append(f"缺少 {len(missing)} 個欄位：{'、'.join(missing['New_Column'])}")
+    return "；".join(parts)
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        print("用法: python ingest.py <表單匯出檔.csv> [--codebook codebook.csv] [--strict]")
+        sys.exit(2)
+
+    codebook = None
+    if "--codebook" in sys.argv:
+        codebook_path = sys.argv[sys.argv.index("--codebook") + 1]
+        args = [a for a in args if a != codebook_path]
+        codebook = pd.read_csv(codebook_path)
+    policy = "reject" if "--strict" in sys.argv else DRIFT_POLICY
+
+    try:
+        df, result = read_export(args[0], codebook, policy=policy)
+    except SchemaError as e:
+        print(f"拒絕載入：{e}")
+        print(e.report[e.report["Status"] != "ok"].to_string(index=False))
+        sys.exit(1)
+
+    print(f"已讀取 {result['rows']} 列, {df.shape[1]} 欄")
+    summary = drift_summary(result)
+    print(f"欄位檢查：{summary or '與 codebook 一致'}")
+    stats = result["column_stats"]
+    print(stats.to_string(index=False))
+    if (stats["Parse_Failures"] > 0).any():
+        print("\n[!] 以下欄位大多為數字，但有部分值無法解析：")
+        print(stats[stats["Parse_Failures"] > 0][["Original_Column", "Parse_Failures"]].to_string(index=False))
@@ -1,7 +1,7 @@
 import pandas as pd
 import os
-import re
-from rapidfuzz import fuzz # 用於模糊比對
+import alignment # [新增] 題目對照資料庫 (SQLite，重跑時只計算新題目)
+import ingest # [新增] 題目文字正規化 (與題號登錄表、欄位驗證共用同一規則)
 
 # --- 設定 ---
 BACKEND_FILE = os.path.join('numeric_descriptive_stats.csv')
@@ -9,19 +9,6 @@ TEACHER_FILE = '2025_Teacher_ES - mean.csv'
 OUTPUT_FILE = 'Backend_vs_Teacher_Comparison_ADVANCED.xlsx'
 FUZZY_THRESHOLD = 80 # 模糊比對的相似度門檻 (0-100)
 
-def normalize_string(text):
-    """
-    清理函式：移除所有標點符號、空格、和特殊字元，
-    只保留中文、英文和數字，以便比對。
-    """
-    if not isinstance(text, str):
-        return ""
-    # 移除所有非中、英、數的字元
-    text = re.sub(r'[^\u4e00-\u9fa5a-zA-Z0-9]', '', text)
-    # 移除所有空白 (雖然上一步已處理，但多做一層保險)
-    text = re.sub(r'\s+', '', text)
-    return text.lower() # 轉為小寫
-
 print("腳本開始執行...")
 
 # 1. 讀取後台資料 (Backend)
@@ -31,7 +18,7 @@ try:
         columns={'Mean': 'Mean_Backend', 'N': 'N_Backend'}
     )
     # 建立正規化 Key
-    df_backend['normalized_key'] = df_backend['Original_Column'].apply(normalize_string)
+    df_backend['normalized_key'] = df_backend['Original_Column'].apply(ingest.normalize_question)
     print(f"成功讀取 {len(df_backend)} 筆後台資料。")
 except Exception as e:
     print(f"讀取後台資料 {BACKEND_FILE} 失敗: {e}")
@@ -47,12 +34,23 @@ try:
     df_teacher['Mean_Teacher'] = pd.to_numeric(df_teacher['Mean_Teacher'], errors='coerce')
     df_teacher = df_teacher.dropna(subset=['Mean_Teacher'])
     # 建立正規化 Key
-    df_teacher['normalized_key'] = df_teacher['Original_Column'].apply(normalize_string)
+    df_teacher['normalized_key'] = df_teacher['Original_Column'].apply(ingest.normalize_question)
     print(f"成功讀取 {len(df_teacher)} 筆學校資料。")
 except Exception as e:
     print(f"讀取學校資料 {TEACHER_FILE} 失敗: {e}")
     exit()
 
+# [新增] 3. 寫入題目對照資料庫，只對新出現 / 文字有改動的題目計算相似度
+alignment_store = alignment.AlignmentStore(alignment.ALIGNMENT_DB)
+new_backend = alignment_store.upsert_questions(
+    'backend', df_backend.rename(columns={'Mean_Backend': 'Mean', 'N_Backend': 'N'})
+)
+new_teacher = alignment_store.upsert_questions(
+    'teacher', df_teacher.rename(columns={'Mean_Teacher': 'Mean'})
+)
+scored_pairs = alignment_store.update_scores()
+print(f"對照資料庫：新增後台 {new_backend} 題、學校 {new_teacher} 題，本次計算 {scored_pairs} 組相似度。")
+
 # --- 階段一：正規化匹配 (Normalized Match) ---
 print("執行階段一：正規化匹配...")
 
@@ -91,44 +89,43 @@ print(f"階段一後，後台剩 {len(df_backend_unmatched)} 筆未匹配, 學
 # --- 階段二：模糊匹配 (Fuzzy Match) ---
 print(f"執行階段二：模糊匹配 (相似度 > {FUZZY_THRESHOLD}%) ...")
 
-suggestions = []
-# 為了避免重複建議，我們在找到匹配後就將其從列表中移除
-teacher_fuzzy_matched_indices = set()
-
-# 遍歷所有 "未匹配的後台題目"
-for b_idx, b_row in df_backend_unmatched.iterrows():
-    best_match = None
-    best_score = FUZZY_THRESHOLD # 必須高於門檻
-
-    # 遍歷所有 "未匹配的學校題目"
-    for t_idx, t_row in df_teacher_unmatched.iterrows():
-        # 如果這個學校題目已經被用過了，就跳過
-        if t_idx in teacher_fuzzy_matched_indices:
-            continue
-            
-        # 我們用 "原始題目" 來計算模糊分數，因為 "正規化" 後的 key 可能太短
-        score = fuzz.ratio(b_row['Original_Column'], t_row['Original_Column'])
-        
-        if score > best_score:
-            best_score = score
-            best_match = t_row
-            best_match_index = t_idx
-            
-    # 如果找到了高於門檻的最佳匹配
-    if best_match is not None:
-        suggestions.append({
-            'Similarity_Score': best_score,
-            'Backend_Question': b_row['Original_Column'],
-            'Mean_Backend': b_row['Mean_Backend'],
-            'Suggested_Teacher_Question': best_match['Original_Column'],
-            'Mean_Teacher': best_match['Mean_Teacher'],
-        })
-        # 將這個學校題目標記為 "已使用"，避免 1-to-N 匹配
-        teacher_fuzzy_matched_indices.add(best_match_index)
-
-df_fuzzy_suggestions = pd.DataFrame(suggestions).sort_values(by='Similarity_Score', ascending=False)
+# [更新] 「未匹配後台 x 未匹配學校」的相似度矩陣 (rapidfuzz cdist 算好存在對照資料庫中)，
+#        再以匈牙利演算法求整體最佳的一對一配對 (取代逐列 iterrows 的貪婪比對)
+#        人工確認過的配對直接採用，否決過的不再建議
+# 我們用 "原始題目" 來計算模糊分數，因為 "正規化" 後的 key 可能太短
+backend_questions = df_backend_unmatched['Original_Column'].tolist()
+teacher_questions = df_teacher_unmatched['Original_Column'].tolist()
+df_pairs = alignment_store.align(backend_questions, teacher_questions, FUZZY_THRESHOLD)
+
+b_rows = df_backend_unmatched.iloc[df_pairs['query_index']]
+t_rows = df_teacher_unmatched.iloc[df_pairs['choice_index']]
+df_fuzzy_suggestions = pd.DataFrame({
+    'Similarity_Score': df_pairs['Similarity_Score'].values,
+    'Backend_Question': b_rows['Original_Column'].values,
+    'Mean_Backend': b_rows['Mean_Backend'].values,
+    'Suggested_Teacher_Question': t_rows['Original_Column'].values,
+    'Mean_Teacher': t_rows['Mean_Teacher'].values,
+    'Status': df_pairs['Status'].values,
+})
 print(f"階段二找到 {len(df_fuzzy_suggestions)} 筆模糊匹配建議。")
 
+# [新增] 記錄本次的配對結果 (Dashboard 直接讀取資料庫)
+alignment_store.record_run(new_backend, new_teacher, scored_pairs, pd.concat([
+    pd.DataFrame({
+        'Backend_Question': df_normalized_match['Original_Column_Backend'],
+        'Teacher_Question': df_normalized_match['Original_Column_Teacher'],
+        'Method': 'normalized',
+        'Similarity_Score': 100.0,
+    }),
+    pd.DataFrame({
+        'Backend_Question': df_fuzzy_suggestions['Backend_Question'],
+        'Teacher_Question': df_fuzzy_suggestions['Suggested_Teacher_Question'],
+        'Method': 'fuzzy',
+        'Similarity_Score': df_fuzzy_suggestions['Similarity_Score'],
+    }),
+], ignore_index=True))
+alignment_store.close()
+
 
 # --- 整理最終未匹配的清單 (Stages 1 & 2 都沒上的) ---
 
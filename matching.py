@@ -0,0 +1,159 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 題目文字比對引擎
+# 給 mapping.py (後台 vs 學校報表) 以及跨年度題庫對照使用：
+# (1) 以 rapidfuzz process.cdist 一次算出整個相似度矩陣 (多執行緒)
+# (2) 以匈牙利演算法 (linear_sum_assignment) 求整體最佳的一對一配對，
+#     不再是「先到先得」的貪婪配對
+# (3) 題庫很大時，先用字元 n-gram 倒排索引與長度上限篩出候選配對，只計算候選
+# ---------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+# --- 設定 ---
+NGRAM_SIZE = 2 # 中文以「兩個字」為一組效果最好
+# 候選配對至少要共有「較短一方 n-gram 數」的這個比例
+BLOCKING_MIN_OVERLAP = 0.2
+# 配對數超過此值才啟用 n-gram 篩選 (以下直接算完整矩陣，結果是精確的)
+BLOCKING_MIN_PAIRS = 250_000
+MATCH_WORKERS = -1 # rapidfuzz 使用的執行緒數 (-1 = 全部 CPU)
+
+
+def ngrams(text, n=NGRAM_SIZE):
+    """
+    字元 n-gram 集合 (字串比 n 短時以整個字串為一組)。
+    """
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class NgramIndex:
+    """
+    字元 n-gram 倒排索引：以稀疏矩陣 (文件 x n-gram) 表示，
+    查詢時一次矩陣乘法就得到每一對共有幾個 n-gram。
+    """
+
+    def __init__(self, texts, n=NGRAM_SIZE):
+        self.n = n
+        self.vocab = {}
+        self.matrix = self._incidence(texts, grow=True)
+
+    def _incidence(self, texts, grow=False):
+        from scipy import sparse
+
+        rows, cols = [], []
+        for i, text in enumerate(texts):
+            for gram in ngrams(text, self.n):
+                j = self.vocab.get(gram)
+                if j is None:
+                    if not grow:
+                        continue # 查詢端獨有的 n-gram 不可能與任何文件共用
+                    j = self.vocab[gram] = len(self.vocab)
+                rows.append(i)
+                cols.append(j)
+        data = np.ones(len(rows), dtype=np.float32)
+        shape = (len(texts), max(len(self.vocab), 1))
+        return sparse.csr_matrix((data, (rows, cols)), shape=shape)
+
+    def candidates(self, queries, min_overlap=BLOCKING_MIN_OVERLAP):
+        """
+        回傳候選配對 (query 索引陣列, 文件索引陣列)：
+        共有的 n-gram 數 >= min_overlap x 兩者中較少的 n-gram 數 (且至少 1 個)。
+        """
+        q_matrix = self._incidence(queries)
+        q_matrix.resize((len(queries), self.matrix.shape[1]))
+        shared = (q_matrix @ self.matrix.T).tocoo()
+
+        q_sizes = np.array([len(ngrams(t, self.n)) for t in queries])
+        d_sizes = np.asarray(self.matrix.sum(axis=1)).ravel()
+        need = np.maximum(min_overlap * np.minimum(q_sizes[shared.row], d_sizes[shared.col]), 1)
+        keep = shared.data >= need
+        return shared.row[keep], shared.col[keep]
+
+
+def _length_bound(queries, choices, threshold):
+    """
+    fuzz.ratio 的上限只由長度決定：200 x min(a, b) / (a + b)。
+    回傳「上限仍可能超過門檻」的布林矩陣 (精確篩選，不會漏掉配對)。
+    """
+    q_len = np.array([len(t) for t in queries], dtype=float)[:, None]
+    c_len = np.array([len(t) for t in choices], dtype=float)[None, :]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bound = 200 * np.minimum(q_len, c_len) / (q_len + c_len)
+    return bound > threshold
+
+
+def score_matrix(queries, choices, threshold=0, blocking=None, workers=MATCH_WORKERS):
+    """
+    queries x choices 的 fuzz.ratio 相似度矩陣 (float32，低於門檻者為 0)。
+    blocking=None 時依矩陣大小自動決定是否先用 n-gram 索引篩選候選。
+    """
+    queries, choices = list(queries), list(choices)
+    scores = np.zeros((len(queries), len(choices)), dtype=np.float32)
+    if not queries or not choices:
+        return scores
+
+    if blocking is None:
+        blocking = len(queries) * len(choices) > BLOCKING_MIN_PAIRS
+
+    if not blocking:
+        return process.cdist(
+            queries, choices, scorer=fuzz.ratio, score_cutoff=threshold, dtype=np.float32, workers=workers
+        )
+
+    q_idx, c_idx = NgramIndex(choices).candidates(queries)
+    keep = _length_bound(queries, choices, threshold)[q_idx, c_idx]
+    q_idx, c_idx = q_idx[keep], c_idx[keep]
+    if len(q_idx):
+        scores[q_idx, c_idx] = process.cpdist(
+            [queries[i] for i in q_idx],
+            [choices[j] for j in c_idx],
+            scorer=fuzz.ratio,
+            score_cutoff=threshold,
+            dtype=np.float32,
+            workers=workers,
+        )
+    return scores
+
+
+def assign_pairs(scores, threshold):
+    """
+    一對一配對：在相似度 > threshold 的配對中，求總相似度最高的組合 (匈牙利演算法)。
+    scores 為 queries x choices 的相似度矩陣 (不允許的配對請設為 0)。
+    回傳 DataFrame：query_index, choice_index, Similarity_Score (依分數由高到低)。
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    scores = np.asarray(scores, dtype=float)
+    # 門檻以下 (含) 的配對不允許，權重設為 0，指派後再濾掉
+    weights = np.where(scores > threshold, scores, 0.0)
+
+    # 只對「至少有一個合格配對」的列 / 欄求解，縮小問題規模
+    rows = np.flatnonzero(weights.any(axis=1))
+    cols = np.flatnonzero(weights.any(axis=0))
+    if len(rows) == 0:
+        return pd.DataFrame({
+            "query_index": np.array([], dtype=int),
+            "choice_index": np.array([], dtype=int),
+            "Similarity_Score": np.array([], dtype=float),
+        })
+
+    sub = weights[np.ix_(rows, cols)]
+    r, c = linear_sum_assignment(sub, maximize=True)
+    valid = sub[r, c] > 0
+    result = pd.DataFrame({
+        "query_index": rows[r[valid]],
+        "choice_index": cols[c[valid]],
+        "Similarity_Score": sub[r[valid], c[valid]],
+    })
+    return result.sort_values("Similarity_Score", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def match_questions(queries, choices, threshold, blocking=None, workers=MATCH_WORKERS):
+    """
+    一對一模糊配對：計算相似度矩陣後以 assign_pairs 求最佳配對。
+    """
+    scores = score_matrix(queries, choices, threshold, blocking=blocking, workers=workers)
+    return assign_pairs(scores, threshold)
@@ -0,0 +1,435 @@
+# ---------------------------------------------------------------
+# 誠致 2025 敬業度調查 - 資料前處理 (Python 版)
+# 取代 2025ES.Rmd：在同一個 Python 程序內完成欄位分類、清理與描述性統計
+# 執行方式: python3 preprocess.py [--no-suppress]  (會產出與 R 腳本相同格式的 CSV 檔案)
+# ---------------------------------------------------------------
+
+import math
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+import privacy
+
+# --- 設定 ---
+RAW_FILE = "2025 CZ Engagement survey (回覆) 的副本 - 表單回應 1.csv"
+
+# 與 R 腳本相同的分類規則
+LIKERT_PATTERN = r"^\s*\d+\s*-.+"
+MIN_AVG_LEN_FOR_QUALITATIVE = 50
+MAX_UNIQUE_FOR_CATEGORICAL = 15
+
+SPECIAL_LIKERT_COLS = ["Q31", "Q32", "Q33"]
+SPECIAL_NUMERIC_COLS = ["Q4", "Q100"]
+
+# Q4 (年資) 與 Q100 (留任) 的特殊數值編碼
+Q4_ENCODING = {
+    "1 年以下": 0.5,
+    "1-2 年": 1.5,
+    "2-3 年": 2.5,
+    "3 年以上": 3.0,
+}
+Q100_ENCODING = {
+    "不考慮持續任職": 0,
+    "考慮 1 年內持續任職": 0.5,
+    "考慮 1 - 2 年內持續任職": 1.5,
+    "考慮任職 2 年以上": 2.0,
+}
+
+# 分群統計要納入的組別
+TARGET_GROUPS = ["領導發展", "營運發展", "教學發展", "影響力發展", "聯盟發展"]
+TARGET_SENIORITY_GROUPS = list(Q4_ENCODING.keys())
+
+STAT_COLUMNS = ["N", "Mean", "SD", "Median", "Min", "Max"]
+
+# 可做分群分析的維度：{分組欄位: 設定}
+# - label：顯示名稱
+# - source：分組依據的原始欄位 (不列入該維度的數值統計)
+# - groups：組別與順序；None 表示使用資料中出現的所有組別 (依字元排序)
+GROUP_DIMENSIONS = {
+    "Q2": {"label": "組別", "source": "Q2", "groups": sorted(TARGET_GROUPS)},
+    "Q3": {"label": "職稱", "source": "Q3", "groups": None},
+    "Q4_grouped": {"label": "年資", "source": "Q4", "groups": TARGET_SENIORITY_GROUPS},
+}
+
+
+def q_sort_key(col):
+    """
+    排序用：將 'Q12' 這類 Q 編號轉為數字 12 (可直接給 sort_values 的 key 使用)。
+    非 Q 編號的欄位 (例如量表代號) 為 NaN，排在最後並維持原本順序。
+    """
+    return pd.to_numeric(col.str.replace("Q", ""), errors="coerce")
+
+
+# --- 1. 載入資料 ---
+def load_raw(path=RAW_FILE):
+    """
+    讀取 Google 表單匯出的原始 CSV。
+    比照 readr::read_csv：只把空字串與 "NA" 視為缺值，並去除字串前後空白。
+    """
+    df = pd.read_csv(path, keep_default_na=False, na_values=["", "NA"])
+    for col in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].str.strip()
+    return df
+
+
+# --- 2. 建立 Codebook 並重命名欄位 ---
+def build_codebook(df_raw, registry=None, wave=None):
+    """
+    建立 {New_Column: Q1..Qn, Original_Column: 原始題目} 對照表。
+    傳入 registry (store.QuestionRegistry) 時以題目文字查詢穩定題號，
+    表單在不同年度增刪題目也不會讓後面的題號位移；否則依欄位順序編號。
+    """
+    if registry is not None:
+        new_columns = registry.register(list(df_raw.columns), wave)
+    else:
+        new_columns = [f"Q{i}" for i in range(1, len(df_raw.columns) + 1)]
+    return pd.DataFrame({
+        "New_Column": new_columns,
+        "Original_Column": list(df_raw.columns),
+    })
+
+
+# --- 3. 自動分類欄位 ---
+def classify_columns(df_renamed):
+    """
+    依 R 腳本的規則將欄位分類，回傳各類別的 Q 編號清單 (dict)。
+    """
+    col_types = {
+        "numeric": [],
+        "likert_text": [],
+        "custom_likert": [],
+        "custom_numeric": [],
+        "qualitative": [],
+        "categorical": [],
+    }
+
+    for col in df_renamed.columns:
+        series = df_renamed[col]
+        non_na = series.dropna()
+        if non_na.empty:
+            continue
+
+        if pd.api.types.is_numeric_dtype(series):
+            col_types["numeric"].append(col)
+        elif col in SPECIAL_LIKERT_COLS:
+            col_types["custom_likert"].append(col)
+        elif col in SPECIAL_NUMERIC_COLS:
+            col_types["custom_numeric"].append(col)
+        elif re.match(LIKERT_PATTERN, str(non_na.iloc[0])):
+            col_types["likert_text"].append(col)
+        else:
+            avg_len = non_na.astype(str).str.len().mean()
+            n_unique = non_na.nunique()
+            if avg_len > MIN_AVG_LEN_FOR_QUALITATIVE or n_unique > MAX_UNIQUE_FOR_CATEGORICAL:
+                col_types["qualitative"].append(col)
+            else:
+                col_types["categorical"].append(col)
+
+    return col_types
+
+
+def numeric_analysis_columns(col_types):
+    """
+    最終的數值欄位 = 原始數值 + 標準 Likert + 自訂 Likert + Q4/Q100 (排除 Q1 時間戳記)。
+    """
+    cols = (
+        col_types["numeric"]
+        + col_types["likert_text"]
+        + col_types["custom_likert"]
+        + col_types["custom_numeric"]
+    )
+    return [c for c in cols if c != "Q1"]
+
+
+# --- 4. 執行資料清理 ---
+def clean_data(df_renamed, col_types):
+    """
+    將 Likert 文字、Q31-Q33 (我不理解=0)、Q4 與 Q100 轉換為數值。
+    """
+    df_cleaned = df_renamed.copy()
+
+    # (A) 標準 Likert 欄位 (抓開頭數字)
+    for col in col_types["likert_text"]:
+        df_cleaned[col] = pd.to_numeric(
+            df_renamed[col].str.extract(r"^\s*(\d+)", expand=False), errors="coerce"
+        )
+
+    # (B) Q31-Q33 特殊編碼欄位
+    for col in col_types["custom_likert"]:
+        text = df_renamed[col].astype("string")
+        df_cleaned[col] = np.select(
+            [
+                text.str.match("4", na=False),
+                text.str.match("3", na=False),
+                text.str.match("2", na=False),
+                text.str.match("1", na=False),
+                text.str.contains("我不理解", na=False),
+            ],
+            [4, 3, 2, 1, 0],
+            default=np.nan,
+        )
+
+    # (C) Q4 (年資) 與 (D) Q100 (留任) 特殊編碼
+    if "Q4" in df_cleaned.columns:
+        df_cleaned["Q4"] = df_renamed["Q4"].map(Q4_ENCODING).astype(float)
+    if "Q100" in df_cleaned.columns:
+        df_cleaned["Q100"] = df_renamed["Q100"].map(Q100_ENCODING).astype(float)
+
+    return df_cleaned
+
+
+# --- 5. 描述性統計 (數值型欄位) ---
+def _numeric_block(df_cleaned, numeric_cols):
+    """
+    將數值欄位整理成單一 float64 區塊，後續的統計都在這個連續陣列上運算。
+    """
+    return pd.DataFrame(
+        df_cleaned[numeric_cols].to_numpy(dtype=float), index=df_cleaned.index, columns=numeric_cols
+    )
+
+
+def _summarise(values, by=None):
+    """
+    一次算完 N/Mean/SD/Median/Min/Max。
+    by=None 時回傳以欄位為索引的表；否則回傳 (組別, 欄位) 的長表格。
+    """
+    # 每個統計量都是對整個數值區塊的一次向量化運算 (不逐欄呼叫)
+    source = values if by is None else values.groupby(by, sort=False)
+    parts = [source.count(), source.mean(), source.std(), source.median(), source.min(), source.max()]
+    if by is not None:
+        parts = [p.stack(future_stack=True) for p in parts]
+    stats = pd.concat(parts, axis=1, keys=STAT_COLUMNS)
+    stats["N"] = stats["N"].astype(int)
+
+    # 比照 R：全部為 NA 時 min = Inf, max = -Inf
+    empty = stats["N"] == 0
+    stats.loc[empty, "Min"] = np.inf
+    stats.loc[empty, "Max"] = -np.inf
+    return stats
+
+
+def describe_numeric(df_cleaned, numeric_cols, codebook):
+    """
+    整體描述性統計 (對應 numeric_descriptive_stats.csv)。
+    """
+    stats = _summarise(_numeric_block(df_cleaned, numeric_cols))
+    stats.index.name = "New_Column"
+    stats = stats.reset_index().merge(codebook, on="New_Column", how="left")
+    stats = stats.sort_values("New_Column", key=q_sort_key, kind="stable")
+    return stats[["New_Column", "Original_Column"] + STAT_COLUMNS].reset_index(drop=True)
+
+
+def dimension_values(df_cleaned, dim):
+    """
+    取得分群維度的組別標籤 (Q4_grouped 由 Q4 數值反推，其他維度直接取欄位)。
+    """
+    if dim == "Q4_grouped":
+        return seniority_labels(df_cleaned["Q4"]).rename(dim)
+    return df_cleaned[dim].rename(dim)
+
+
+def dimension_config(dim):
+    """
+    維度設定；未登錄在 GROUP_DIMENSIONS 的類別欄位也可以分群 (組別依資料排序)。
+    """
+    return GROUP_DIMENSIONS.get(dim, {"label": dim, "source": dim, "groups": None})
+
+
+def dimension_block(df_cleaned, numeric_cols, dims):
+    """
+    分群運算的共同前置：只保留屬於各維度組別的受訪者。
+    回傳 (數值區塊, 各維度的組別標籤 Series, 各維度的 {組別: 順序})；
+    分組依據的欄位本身不列入數值區塊。
+    """
+    mask = pd.Series(True, index=df_cleaned.index)
+    keys, orders = [], []
+    for dim in dims:
+        values = dimension_values(df_cleaned, dim)
+        groups = dimension_config(dim)["groups"] or sorted(values.dropna().unique())
+        mask &= values.isin(groups)
+        keys.append(values)
+        orders.append({g: i for i, g in enumerate(groups)})
+
+    sources = {dimension_config(dim)["source"] for dim in dims}
+    cols = [c for c in numeric_cols if c not in sources]
+    return _numeric_block(df_cleaned, cols)[mask], [k[mask] for k in keys], orders
+
+
+def describe_dimensions(df_cleaned, numeric_cols, codebook, dims):
+    """
+    任意維度的分群描述性統計 (一次 groupby 完成)；dims 傳入多個維度時為交叉分析 (例如 Q2 x Q4)。
+    輸出為長表格：各維度欄位, New_Column, Original_Column, N, Mean, SD, Median, Min, Max，
+    依各維度的組別順序與題號排序。分組依據的欄位本身不列入統計 (例如依年資分群時不含 Q4)。
+    """
+    dims = [dims] if isinstance(dims, str) else list(dims)
+    values, keys, orders = dimension_block(df_cleaned, numeric_cols, dims)
+    stats = _summarise(values, by=keys)
+    stats.index.names = dims + ["New_Column"]
+    stats = stats.reset_index().merge(codebook, on="New_Column", how="left")
+
+    sort_keys = []
+    for dim, order in zip(dims, orders):
+        stats[f"_{dim}_key"] = stats[dim].map(order)
+        sort_keys.append(f"_{dim}_key")
+    stats["_q_key"] = q_sort_key(stats["New_Column"])
+    stats = stats.sort_values(sort_keys + ["_q_key"], kind="stable")
+    stats[dims] = stats[dims].astype(str) # 組別標籤可能是 Categorical，輸出表一律為文字
+    return stats[dims + ["New_Column", "Original_Column"] + STAT_COLUMNS].reset_index(drop=True)
+
+
+# --- 6. 描述性統計 (類別型欄位) ---
+def describe_categorical(df_cleaned, categorical_cols, codebook):
+    """
+    類別型欄位次數分配 (對應 categorical_descriptive_stats.csv)。
+    Percentage 與 janitor::tabyl 的 percent 相同，分母包含 NA。
+    """
+    frames = []
+    for col in categorical_cols:
+        counts = df_cleaned[col].value_counts(dropna=False, sort=False)
+        counts = counts.reindex(sorted(counts.index, key=lambda v: (pd.isna(v), str(v))))
+        frames.append(pd.DataFrame({
+            "New_Column": col,
+            "Value": counts.index,
+            "Frequency": counts.values,
+            "Percentage": counts.values / counts.values.sum(),
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=["New_Column", "Original_Column", "Value", "Frequency", "Percentage"])
+
+    stats = pd.concat(frames, ignore_index=True)
+    stats = stats.merge(codebook, on="New_Column", how="left")
+    stats["_q_key"] = q_sort_key(stats["New_Column"])
+    stats = stats.sort_values(["_q_key", "Frequency"], ascending=[True, False], kind="stable")
+    return stats[["New_Column", "Original_Column", "Value", "Frequency", "Percentage"]].reset_index(drop=True)
+
+
+# --- 7. 完整流程 ---
+def parse_timestamps(values):
+    """
+    Q1 時間戳記 (Google 表單格式，例如 "2025/10/8 下午 1:26:10") 轉為 datetime；無法解析的為 NaT。
+    """
+    text = values.astype("string").str.replace("上午", "AM", regex=False).str.replace("下午", "PM", regex=False)
+    text = text.str.replace(r"^(\S+) (AM|PM) (\S+)$", r"\1 \3 \2", regex=True)
+    return pd.to_datetime(text, format="%Y/%m/%d %I:%M:%S %p", errors="coerce")
+
+
+def seniority_labels(q4_values):
+    """
+    由 Q4 數值反推「文字」年資組別 (Q4_grouped)，類別依年資由短到長排序。
+    """
+    inverse = {v: k for k, v in Q4_ENCODING.items()}
+    return q4_values.map(inverse).astype(pd.CategoricalDtype(TARGET_SENIORITY_GROUPS))
+
+
+def run_pipeline(path=RAW_FILE, df_raw=None, registry=None, wave=None):
+    """
+    從原始表單 CSV 一次產出所有 Dashboard 需要的資料表，回傳 dict：
+    codebook, raw (已套上 Q 編號), cleaned, overall, group, seniority, categorical
+    registry / wave：見 build_codebook。
+    """
+    if df_raw is None:
+        df_raw = load_raw(path)
+
+    codebook = build_codebook(df_raw, registry, wave)
+    df_renamed = df_raw.copy()
+    df_renamed.columns = codebook["New_Column"].values
+
+    col_types = classify_columns(df_renamed)
+    df_cleaned = clean_data(df_renamed, col_types)
+    numeric_cols = numeric_analysis_columns(col_types)
+
+    overall = describe_numeric(df_cleaned, numeric_cols, codebook)
+    group = describe_dimensions(df_cleaned, numeric_cols, codebook, "Q2")
+    seniority = describe_dimensions(df_cleaned, numeric_cols, codebook, "Q4_grouped")
+    categorical = describe_categorical(df_cleaned, col_types["categorical"], codebook)
+
+    return {
+        "codebook": codebook,
+        "raw": df_renamed,
+        "cleaned": df_cleaned,
+        "col_types": col_types,
+        "overall": overall,
+        "group": group,
+        "seniority": seniority,
+        "categorical": categorical,
+    }
+
+
+# --- 8. 輸出 CSV (與 R write_csv 相同格式) ---
+OUTPUT_FILES = {
+    "codebook": "codebook.csv",
+    "overall": "numeric_descriptive_stats.csv",
+    "categorical": "categorical_descriptive_stats.csv",
+    "group": "grouped_numeric_stats_by_Q2.csv",
+    "seniority": "grouped_numeric_stats_by_Q4.csv",
+    "cleaned": "cleaned_numeric_data.csv",
+}
+
+
+def _format_r_number(x):
+    """
+    比照 readr::write_csv 的數字格式：NA / Inf / -Inf，整數值不帶小數點。
+    """
+    if pd.isna(x):
+        return "NA"
+    if math.isinf(x):
+        return "Inf" if x > 0 else "-Inf"
+    if float(x).is_integer():
+        return str(int(x))
+    return repr(float(x))
+
+
+def write_r_csv(df, path):
+    """
+    以 R write_csv 的格式寫出 CSV，讓 mapping.py 等既有流程可直接沿用。
+    """
+    out = df.copy()
+    for col in out.columns:
+        if pd.api.types.is_float_dtype(out[col]):
+            out[col] = out[col].map(_format_r_number)
+    out.to_csv(path, index=False, na_rep="NA", encoding="utf-8")
+
+
+# 分群統計輸出檔對應的分群維度 (匯出前套用小樣本隱藏)
+SUPPRESSED_OUTPUTS = {"group": ["Q2"], "seniority": ["Q4_grouped"]}
+
+
+def write_outputs(results, out_dir=".", min_cell_size=privacy.MIN_CELL_SIZE):
+    """
+    將 run_pipeline 的結果寫成 R 腳本原本產出的 CSV 檔。
+    分群統計預設套用小樣本隱藏 (被隱藏的格子輸出為 NA)；min_cell_size=None 時輸出完整數值。
+    """
+    for key, filename in OUTPUT_FILES.items():
+        frame = results[key]
+        if key in SUPPRESSED_OUTPUTS and min_cell_size is not None:
+            frame = privacy.strip_suppression(
+                privacy.apply_suppression(frame, SUPPRESSED_OUTPUTS[key], min_cell_size)
+            )
+        write_r_csv(frame, os.path.join(out_dir, filename))
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    print("腳本開始執行...")
+    start = time.perf_counter()
+    results = run_pipeline(RAW_FILE)
+    elapsed = time.perf_counter() - start
+    print(f"成功載入檔案: {RAW_FILE}")
+    print(f"資料維度: {results['raw'].shape[0]} 筆觀察值, {results['raw'].shape[1]} 個欄位")
+    print(f"前處理完成，耗時 {elapsed * 1000:.1f} ms")
+
+    # --no-suppress：輸出未隱藏的分群統計 (與 R 腳本完全相同，僅供內部核對)
+    suppress = "--no-suppress" not in sys.argv
+    write_outputs(results, min_cell_size=privacy.MIN_CELL_SIZE if suppress else None)
+    if suppress:
+        print(f"分群統計已隱藏作答人數少於 {privacy.MIN_CELL_SIZE} 人的格子")
+    for filename in OUTPUT_FILES.values():
+        print(f"已儲存: {filename}")
+    print("--- 分析完成 ---")
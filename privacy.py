@@ -0,0 +1,88 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 小樣本隱藏 (small-cell suppression)
+# 分群統計 (組別、年資、交叉分析) 建好時一次算出每個 (題目, 組別) 的隱藏遮罩：
+# (1) 主要隱藏：作答人數 N 少於 MIN_CELL_SIZE (k-anonymity) 的格子不公開數值
+# (2) 互補隱藏：同一題 (交叉分析時為同一列 / 同一欄) 只有一格被隱藏、或隱藏的格子合計仍少於 k 人時，
+#     可由「整體平均 x 整體 N - 其他組別合計」反推回來，因此再隱藏 N 最小的另一格
+# 頁面與匯出只讀取已套用遮罩的統計表，切換題目時不需要重新計算。
+# ---------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+# --- 設定 ---
+MIN_CELL_SIZE = 3 # 每一格至少要有幾位作答者才公開平均數等統計量
+# 被隱藏的格子中設為 NaN 的欄位 (N 保留，讓讀者知道為何沒有數值)
+MASKED_COLUMNS = ["Mean", "SD", "Median", "Min", "Max"]
+
+PRIMARY = "樣本數不足"
+COMPLEMENTARY = "互補隱藏"
+
+
+def suppression_mask(stats, dims, k=MIN_CELL_SIZE):
+    """
+    計算隱藏遮罩，回傳與 stats 同索引的字串 Series：
+    "" (公開)、PRIMARY (N < k) 或 COMPLEMENTARY (為了避免被反推而一併隱藏)。
+    stats 為 preprocess.describe_dimensions 格式的長表格 (各維度欄位, New_Column, N, ...)。
+    """
+    dims = [dims] if isinstance(dims, str) else list(dims)
+    n = stats["N"].to_numpy()
+    has_data = n > 0 # 沒有人作答的格子不含任何資訊，也不能拿來當互補格
+    reason = np.where(has_data & (n < k), PRIMARY, "").astype(object)
+    suppressed = pd.Series(reason != "", index=stats.index)
+
+    # 每個維度方向上的「一條線」= 同一題、其他維度固定。線上被隱藏的格子可由整體反推出「合計」，
+    # 所以只隱藏一格、或隱藏格子合計仍少於 k 人時，要再補隱藏一格。
+    # 補上的格子可能讓其他方向的線又需要補，因此重複到不再變動為止
+    lines = [["New_Column"] + [d for d in dims if d != dim] for dim in dims]
+    changed = True
+    while changed:
+        changed = False
+        for keys in lines:
+            by_line = [stats[c] for c in keys]
+            hidden = suppressed.groupby(by_line, sort=False).transform("sum")
+            hidden_n = stats["N"].where(suppressed, 0).groupby(by_line, sort=False).transform("sum")
+            leaky = (hidden == 1) | ((hidden_n > 0) & (hidden_n < k))
+            exposed = leaky & ~suppressed & has_data
+            if not exposed.any():
+                continue
+            # 每條線挑 N 最小的公開格子 (資訊損失最少)
+            candidates = stats.loc[exposed, keys + ["N"]]
+            picks = candidates.groupby(keys, sort=False)["N"].idxmin()
+            suppressed.loc[picks.to_numpy()] = True
+            reason[stats.index.get_indexer(picks.to_numpy())] = COMPLEMENTARY
+            changed = True
+
+    return pd.Series(reason, index=stats.index, name="Suppressed")
+
+
+def apply_suppression(stats, dims, k=MIN_CELL_SIZE):
+    """
+    回傳套用遮罩後的複本：被隱藏格子的 MASKED_COLUMNS 設為 NaN，
+    並新增 Suppressed 欄 ("" / PRIMARY / COMPLEMENTARY)。
+    """
+    reason = suppression_mask(stats, dims, k)
+    masked = stats.copy()
+    hidden = (reason != "").to_numpy()
+    masked.loc[hidden, [c for c in MASKED_COLUMNS if c in masked.columns]] = np.nan
+    masked["Suppressed"] = reason
+    return masked
+
+
+def public_groups(sizes, dim, k=MIN_CELL_SIZE):
+    """
+    可以單獨切片 (選項分配、質性回饋篩選、報表的分群圖表) 的組別。
+    sizes 為 (dim, New_Column, N) 的長表格 (每組每題的作答人數)，套用與分群統計表相同的
+    隱藏規則 (suppression_mask，含互補隱藏)：任何一題被隱藏的組別都不提供切片，
+    否則「全體 - 其他公開組別」即可推得該組的回答。
+    """
+    reason = suppression_mask(sizes, [dim], k)
+    hidden = set(sizes.loc[(reason != "").to_numpy(), dim])
+    return [g for g in pd.unique(sizes[dim]) if g not in hidden]
+
+
+def strip_suppression(stats):
+    """
+    匯出 R 格式 CSV 時去掉 Suppressed 欄 (被隱藏的數值輸出為 NA)。
+    """
+    return stats.drop(columns=["Suppressed"], errors="ignore")
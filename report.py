@@ -0,0 +1,251 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 批次報表 (不需開啟 Dashboard)
+# 一次產生 Dashboard 各頁面的所有圖表：每一題的選項分佈、95% 信賴區間 (全體 / 各組別 / 各年資)、
+# 依組別 / 年資的平均分數、量表分數，以及信度與組間差異檢定表。
+# (1) 資料只載入一次 (aggregator.SurveyStream，與 Dashboard 相同的快取與小樣本隱藏)
+# (2) 圖表由 figures.py 產生 (與 Dashboard 共用)，交給行程池平行繪製 / 匯出
+# (3) 輸出一個資料夾：index.html + 每個章節一頁 HTML (plotly.js 只存一份)
+#     --format png / svg / pdf 時改為匯出靜態圖檔 (需要 kaleido 套件；沒有安裝時改回 HTML)
+# 執行方式: python report.py [--out report] [--format html|png|svg|pdf] [--workers N]
+# ---------------------------------------------------------------
+
+import html
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import aggregator
+import datacache
+import figures
+import privacy
+import store
+
+# --- 設定 ---
+REPORT_DIR = "report"
+REPORT_FORMAT = "html" # html = 互動式圖表；png / svg / pdf = 靜態圖檔 (需要 kaleido)
+REPORT_WORKERS = None # None = CPU 數
+IMAGE_SCALE = 2 # 靜態圖檔的解析度倍數
+RENDER_CHUNK = 16 # 每次交給子行程的圖表數 (減少行程間傳遞的次數)
+PLOTLY_JS = "plotly.min.js"
+
+FORMATS = ["html", "png", "svg", "pdf"]
+SECTIONS = {
+    "overview": "總體概況",
+    "distribution": "各題選項分佈",
+    "ci": "選項顯著性 (95% 信賴區間)",
+    "group_Q2": "依「組別」分析",
+    "group_Q4_grouped": "依「年資」分析",
+    "scales": "量表與信度",
+    "tests": "組間差異篩選 (排列檢定)",
+}
+
+_PAGE = """<!DOCTYPE html>
+<html lang="zh-Hant">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotly_js}"></script>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+.figure {{ margin-bottom: 2em; }}
+table {{ border-collapse: collapse; font-size: 0.9em; }}
+th, td {{ border: 1px solid #ccc; padding: 0.2em 0.5em; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+{body}
+</body>
+</html>
+"""
+
+
+def _render(batch, fmt):
+    """
+    子行程的工作函式：依 (figures 中的函式名稱, 參數) 建圖，
+    回傳 HTML 片段 (fmt="html") 或圖檔的位元組。
+    """
+    import plotly.io as pio
+
+    pio.templates.default = "plotly_white" # 與 Dashboard 相同的主題
+    out = []
+    for builder, args in batch:
+        fig = getattr(figures, builder)(*args)
+        if fmt == "html":
+            out.append(pio.to_html(fig, full_html=False, include_plotlyjs=False))
+        else:
+            out.append(pio.to_image(fig, format=fmt, scale=IMAGE_SCALE))
+    return out
+
+
+def image_export_available():
+    """
+    靜態圖檔匯出需要 kaleido (選用套件)。
+    """
+    try:
+        import kaleido # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_jobs(stream, k=privacy.MIN_CELL_SIZE):
+    """
+    列出報表的所有內容 (依章節與題號排序)。每個項目為 (章節, 標題, 內容)：
+    內容為 ("figure", figures 中的函式名稱, 參數) 或 ("table", DataFrame)。
+    分群圖表只使用已套用小樣本隱藏的統計；人數少於 k 的組別不產生選項分配切片。
+    """
+    df_overall = stream.overall_stats()
+    df_overall = df_overall.iloc[df_overall["New_Column"].str[1:].astype(int).argsort()]
+    dist_index = stream.distributions
+    overall_means = dict(zip(df_overall["Original_Column"], df_overall["Mean"]))
+    items = []
+
+    items.append(("overview", "平均分數最高的 10 題", ("figure", "ranked_questions_figure", (df_overall, True))))
+    items.append(("overview", "平均分數最低的 10 題", ("figure", "ranked_questions_figure", (df_overall, False))))
+    items.append(("overview", "各題描述性統計", (
+        "table", df_overall[["New_Column", "Original_Column", "N", "Mean", "SD", "Median", "Min", "Max"]]
+    )))
+
+    for q_id, question in zip(df_overall["New_Column"], df_overall["Original_Column"]):
+        df_counts = figures.option_table(dist_index.get(q_id))
+        if df_counts.empty:
+            continue
+        items.append(("distribution", f"{q_id}", ("figure", "distribution_figure", (df_counts, question))))
+        # 可公開的切片依這一題的作答人數決定 (含互補隱藏，與分群統計表相同的規則)
+        slices = [("All", dist_index.ALL, "全體")]
+        for dim, label in [("Q2", "組別"), ("Q4_grouped", "年資")]:
+            slices += [(dim, g, f"{label}：{g}") for g in dist_index.groups(dim, k=k, question=q_id)]
+        for dim, group, label in slices:
+            df_counts = figures.option_table(dist_index.get(q_id, dim, group))
+            if not df_counts.empty:
+                items.append(("ci", f"{q_id} ({label})", ("figure", "ci_figure", (df_counts, question))))
+
+    for dim in ["Q2", "Q4_grouped"]:
+        df_dim = stream.grouped_intervals((dim,), k=k)
+        for q_id, question in zip(df_overall["New_Column"], df_overall["Original_Column"]):
+            df_q = df_dim[df_dim["New_Column"] == q_id]
+            if df_q.empty or df_q["Mean"].isna().all():
+                continue
+            mean = overall_means.get(question, 0)
+            items.append((f"group_{dim}", q_id, ("figure", "group_figure", (df_q, (dim,), question, mean))))
+
+    df_reliability, df_items = stream.scale_reliability()
+    items.append(("scales", "各量表信度", ("table", df_reliability)))
+    items.append(("scales", "題目分析", ("table", df_items)))
+    labels = dict(zip(df_reliability["Scale"], df_reliability["Label"]))
+    for dim in ["Q2", "Q4_grouped"]:
+        df_scale = stream.scale_stats((dim,), k=k)
+        for scale in labels:
+            df_s = df_scale[df_scale["New_Column"] == scale]
+            if not df_s.empty:
+                items.append(("scales", f"{labels[scale]} ({dim})", ("figure", "scale_figure", (df_s, dim, labels[scale]))))
+
+    for dim in ["Q2", "Q4_grouped"]:
+        items.append(("tests", f"依 {dim}", ("table", stream.group_tests(dim, min_group_size=k))))
+
+    return items
+
+
+def render_all(items, fmt=REPORT_FORMAT, workers=REPORT_WORKERS):
+    """
+    以行程池平行繪製所有圖表，回傳與 items 對應的結果 (表格為 None)。
+    """
+    jobs = [content[1:] for _, _, content in items if content[0] == "figure"]
+    batches = [jobs[i:i + RENDER_CHUNK] for i in range(0, len(jobs), RENDER_CHUNK)]
+    n_workers = min(workers or os.cpu_count() or 1, len(batches) or 1)
+    if n_workers == 1:
+        rendered = [out for batch in batches for out in _render(batch, fmt)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            rendered = [out for outs in pool.map(_render, batches, [fmt] * len(batches)) for out in outs]
+    rendered = iter(rendered)
+    return [next(rendered) if content[0] == "figure" else None for _, _, content in items]
+
+
+def write_report(items, rendered, out_dir=REPORT_DIR, fmt=REPORT_FORMAT, summary=""):
+    """
+    寫出 index.html 與每個章節一頁 HTML；靜態圖檔存到 <章節>/ 子資料夾並由頁面引用。
+    回傳寫出的檔案數。
+    """
+    import plotly.offline
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, PLOTLY_JS), "w", encoding="utf-8") as f:
+        f.write(plotly.offline.get_plotlyjs())
+    n_files = 1
+
+    counts = {}
+    for section, section_title in SECTIONS.items():
+        parts = []
+        for (item_section, title, content), output in zip(items, rendered):
+            if item_section != section:
+                continue
+            parts.append(f"<h2>{html.escape(title)}</h2>")
+            if content[0] == "table":
+                parts.append(content[1].to_html(index=False, na_rep="", float_format=lambda x: f"{x:.3f}"))
+            elif fmt == "html":
+                parts.append(f'<div class="figure">{output}</div>')
+            else:
+                os.makedirs(os.path.join(out_dir, section), exist_ok=True)
+                name = f"{section}/{len(parts):04d}.{fmt}"
+                with open(os.path.join(out_dir, name), "wb") as f:
+                    f.write(output)
+                n_files += 1
+                if fmt == "pdf":
+                    parts.append(f'<p><a href="{name}">{html.escape(title)} (PDF)</a></p>')
+                else:
+                    parts.append(f'<div class="figure"><img src="{name}" style="max-width: 100%"></div>')
+        counts[section] = sum(1 for s, _, _ in items if s == section)
+        with open(os.path.join(out_dir, f"{section}.html"), "w", encoding="utf-8") as f:
+            f.write(_PAGE.format(title=section_title, plotly_js=PLOTLY_JS, body="\n".join(parts)))
+        n_files += 1
+
+    links = "\n".join(
+        f'<li><a href="{section}.html">{title}</a> ({counts[section]} 項)</li>'
+        for section, title in SECTIONS.items()
+    )
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(_PAGE.format(
+            title="2025 誠致 Engagement Survey 報表",
+            plotly_js=PLOTLY_JS,
+            body=f"<p>{html.escape(summary)}</p>\n<ul>\n{links}\n</ul>",
+        ))
+    return n_files + 1
+
+
+def _option(name, default):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+if __name__ == "__main__":
+    out_dir = _option("--out", REPORT_DIR)
+    fmt = _option("--format", REPORT_FORMAT)
+    workers = int(_option("--workers", 0)) or REPORT_WORKERS
+    if fmt not in FORMATS:
+        print(f"用法: python report.py [--out {REPORT_DIR}] [--format {'|'.join(FORMATS)}] [--workers N]")
+        sys.exit(2)
+    if fmt != "html" and not image_export_available():
+        print(f"[!] 匯出 {fmt} 需要 kaleido 套件 (pip install kaleido)，改為輸出互動式 HTML")
+        fmt = "html"
+
+    start = time.perf_counter()
+    source = store.SURVEY_SOURCES[0]
+    stream = aggregator.SurveyStream(
+        source["path"], cache=datacache.FrameCache(), registry=store.QuestionRegistry.load(),
+        wave=source["wave"], schema=source.get("schema"),
+    )
+    items = build_jobs(stream)
+    n_figures = sum(1 for _, _, content in items if content[0] == "figure")
+    print(f"已載入 {len(stream.cleaned)} 筆回覆，共 {n_figures} 張圖表、{len(items) - n_figures} 個表格")
+
+    rendered = render_all(items, fmt, workers)
+    summary = (
+        f"{source['wave']} {source['school']}，N={len(stream.cleaned)}。"
+        f"作答人數少於 {privacy.MIN_CELL_SIZE} 人的組別數值不公開。"
+    )
+    n_files = write_report(items, rendered, out_dir, fmt, summary)
+    print(f"已輸出 {n_files} 個檔案到 {out_dir}/，耗時 {time.perf_counter() - start:.1f} 秒")
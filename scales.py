@@ -0,0 +1,186 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 量表 (多題組合指標) 與信度分析
+# (1) SCALES：量表登錄表，定義每個量表包含哪些題目 (穩定題號) 與反向題
+# (2) 一次算出所有量表題目的共變異數矩陣，再由矩陣直接求
+#     Cronbach's alpha、校正後題目-總分相關、刪題後 alpha
+# (3) 每位受訪者的量表分數 (題目平均)，可像單題一樣依 Q2 / Q4 分群 (見 aggregator.SurveyStream)
+# ---------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+# --- 設定 ---
+# Likert 題的分數範圍 (反向題以 LIKERT_MIN + LIKERT_MAX - x 轉換)
+LIKERT_MIN = 1
+LIKERT_MAX = 4
+# 受訪者至少要回答量表中這個比例的題目，才計算其量表分數
+MIN_ITEM_FRACTION = 0.5
+
+# 量表登錄表：{量表代號: 設定}
+# - label：顯示名稱
+# - items：題號 (question_registry.csv 的穩定題號，跨年度相同)
+# - reverse：反向計分的題目
+SCALES = {
+    "S_VALUES_BELIEF": {
+        "label": "KIST 核心價值認同",
+        "items": ["Q16", "Q17", "Q18", "Q19", "Q20", "Q21"],
+        "reverse": [],
+    },
+    "S_VALUES_PRACTICE": {
+        "label": "KIST 核心價值實踐",
+        "items": ["Q22", "Q23", "Q24", "Q25", "Q26", "Q27"],
+        "reverse": [],
+    },
+    "S_TEACHING": {
+        "label": "KIST 教學特色理解",
+        "items": ["Q28", "Q29", "Q30", "Q31", "Q32", "Q33", "Q34", "Q35"],
+        "reverse": [],
+    },
+    "S_ALLIANCE": {
+        "label": "KIST 聯盟認同",
+        "items": ["Q36", "Q37", "Q38", "Q39", "Q40", "Q41"],
+        "reverse": [],
+    },
+    "S_CLARITY": {
+        "label": "目標清晰與資源",
+        "items": ["Q47", "Q48", "Q49", "Q50", "Q51", "Q52"],
+        "reverse": [],
+    },
+    "S_COLLABORATION": {
+        "label": "協作與溝通",
+        "items": ["Q53", "Q54", "Q55", "Q56", "Q61", "Q63"],
+        "reverse": [],
+    },
+    "S_RECOGNITION": {
+        "label": "回饋、肯定與關懷",
+        "items": ["Q57", "Q58", "Q59", "Q60"],
+        "reverse": [],
+    },
+    "S_CULTURE": {
+        "label": "創新與學習文化",
+        "items": ["Q65", "Q66", "Q67", "Q68", "Q69"],
+        "reverse": ["Q68"], # 「會受到責難或處罰」：同意程度越高越不好
+    },
+    "S_GROWTH": {
+        "label": "能力成長",
+        "items": ["Q86", "Q87", "Q88", "Q89", "Q90", "Q91", "Q92", "Q93", "Q94"],
+        "reverse": [],
+    },
+    "S_ENGAGEMENT": {
+        "label": "敬業度指標",
+        "items": ["Q84", "Q85", "Q103", "Q106"],
+        "reverse": [],
+    },
+}
+
+RELIABILITY_COLUMNS = ["Scale", "Label", "Items", "N_Complete", "Alpha", "Mean_Inter_Item_r"]
+ITEM_COLUMNS = ["Scale", "New_Column", "Original_Column", "Item_Total_r", "Alpha_If_Deleted"]
+
+
+def available_scales(columns, scales=None):
+    """
+    只保留題目都存在於資料中的量表 (某個年度缺題時該量表不計算)。
+    """
+    columns = set(columns)
+    scales = SCALES if scales is None else scales
+    return {name: s for name, s in scales.items() if set(s["items"]) <= columns}
+
+
+def scale_items(df_cleaned, scales):
+    """
+    所有量表用到的題目 (反向題已轉換)，每題只出現一次。
+    """
+    items = list(dict.fromkeys(q for s in scales.values() for q in s["items"]))
+    block = df_cleaned[items].astype(float)
+    reverse = list(dict.fromkeys(q for s in scales.values() for q in s["reverse"]))
+    block[reverse] = LIKERT_MIN + LIKERT_MAX - block[reverse]
+    return block
+
+
+def scale_scores(df_cleaned, scales=None):
+    """
+    每位受訪者的量表分數 (已作答題目的平均；作答題數不足 MIN_ITEM_FRACTION 時為 NaN)。
+    回傳與 df_cleaned 同索引、欄位為量表代號的 DataFrame。
+    """
+    scales = available_scales(df_cleaned.columns, scales)
+    block = scale_items(df_cleaned, scales)
+    scores = {}
+    for name, s in scales.items():
+        items = block[s["items"]]
+        answered = items.notna().sum(axis=1)
+        scores[name] = items.mean(axis=1).where(answered >= MIN_ITEM_FRACTION * len(s["items"]))
+    return pd.DataFrame(scores, index=df_cleaned.index)
+
+
+def _alpha(cov):
+    """
+    由共變異數矩陣求 Cronbach's alpha：k / (k - 1) x (1 - 各題變異數和 / 總分變異數)。
+    """
+    k = cov.shape[0]
+    total = cov.sum()
+    if k < 2 or total <= 0:
+        return np.nan
+    return k / (k - 1) * (1 - np.trace(cov) / total)
+
+
+def reliability(df_cleaned, codebook, scales=None):
+    """
+    所有量表的信度分析。先一次算出全部題目的共變異數矩陣 (成對刪除 NA，同 psych::alpha 預設)，
+    每個量表只需取出子矩陣運算。回傳 (量表表, 題目表)：
+    - 量表表：Scale, Label, Items, N_Complete (所有題都作答的人數), Alpha, Mean_Inter_Item_r
+    - 題目表：Scale, New_Column, Original_Column, Item_Total_r (與其餘題目總分的相關), Alpha_If_Deleted
+    """
+    scales = available_scales(df_cleaned.columns, scales)
+    if not scales:
+        return pd.DataFrame(columns=RELIABILITY_COLUMNS), pd.DataFrame(columns=ITEM_COLUMNS)
+
+    block = scale_items(df_cleaned, scales)
+    cov_all = block.cov()
+    observed = block.notna()
+
+    scale_rows, item_rows = [], []
+    for name, s in scales.items():
+        items = s["items"]
+        cov = cov_all.loc[items, items].to_numpy()
+        var = np.diag(cov)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.sqrt(np.outer(var, var))
+            off_diag = corr[~np.eye(len(items), dtype=bool)]
+            mean_r = np.nanmean(off_diag) if off_diag.size and not np.isnan(off_diag).all() else np.nan
+
+            # 校正後題目-總分相關：cov(題目, 其餘總分) / sqrt(var(題目) x var(其餘總分))
+            row_sums = cov.sum(axis=1)
+            cov_rest = row_sums - var
+            var_rest = cov.sum() - 2 * row_sums + var
+            item_total = cov_rest / np.sqrt(var * var_rest)
+
+        scale_rows.append({
+            "Scale": name,
+            "Label": s["label"],
+            "Items": len(items),
+            "N_Complete": int(observed[items].all(axis=1).sum()),
+            "Alpha": _alpha(cov),
+            "Mean_Inter_Item_r": mean_r,
+        })
+        for i, q in enumerate(items):
+            keep = [j for j in range(len(items)) if j != i]
+            item_rows.append({
+                "Scale": name,
+                "New_Column": q,
+                "Item_Total_r": item_total[i],
+                "Alpha_If_Deleted": _alpha(cov[np.ix_(keep, keep)]),
+            })
+
+    items_table = pd.DataFrame(item_rows).merge(codebook, on="New_Column", how="left")
+    return pd.DataFrame(scale_rows, columns=RELIABILITY_COLUMNS), items_table[ITEM_COLUMNS]
+
+
+def scale_codebook(scales=None):
+    """
+    量表代號 -> 顯示名稱，格式同 codebook (New_Column, Original_Column)，供分群統計合併使用。
+    """
+    scales = SCALES if scales is None else scales
+    return pd.DataFrame({
+        "New_Column": list(scales),
+        "Original_Column": [s["label"] for s in scales.values()],
+    })
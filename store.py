@@ -0,0 +1,351 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 多年度 / 多校區資料模型
+# (1) QuestionRegistry：以「正規化後的題目文字」對應到穩定的題號，
+#     表單在不同年度增刪、調整順序時，同一題仍保有相同的 Q 編號。
+# (2) ResponseStore：以 (年度, 學校, 填答者, 題目) 為鍵的長表格，
+#     全部以小整數代碼存成緊湊的 NumPy 陣列 (年度 / 學校只記在區段上)，可同時載入多個年度與校區。
+# ---------------------------------------------------------------
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import ingest
+import preprocess
+
+# --- 設定 ---
+REGISTRY_FILE = "question_registry.csv"
+
+# 要載入的問卷來源 (每一年度 / 每個學校一個表單匯出檔)
+# schema：預期的欄位 (codebook 格式)，載入時依題目文字驗證標頭 (見 ingest.py)；None = 不驗證
+SURVEY_SOURCES = [
+    {"wave": "2025", "school": "誠致", "path": preprocess.RAW_FILE, "schema": "codebook.csv"},
+]
+
+
+# --- 1. 題號登錄表 ---
+class QuestionRegistry:
+    """
+    題號登錄表，每一列是一個「題目文字版本」：
+    Question_ID, Normalized_Text, Occurrence, Original_Column, First_Wave
+    同一個 Question_ID 可以有多個文字版本 (改版後用 alias 接回原題號)。
+    Occurrence 用來區分同一份表單中文字完全相同的題目 (第幾次出現)。
+    """
+
+    COLUMNS = ["Question_ID", "Normalized_Text", "Occurrence", "Original_Column", "First_Wave"]
+
+    def __init__(self, table=None, path=REGISTRY_FILE):
+        self.table = pd.DataFrame(columns=self.COLUMNS) if table is None else table[self.COLUMNS]
+        self.path = path
+        self._rebuild_lookup()
+        self.dirty = False
+
+    def _rebuild_lookup(self):
+        self._lookup = {
+            (text, int(occ)): qid
+            for qid, text, occ in zip(
+                self.table["Question_ID"], self.table["Normalized_Text"], self.table["Occurrence"]
+            )
+        }
+
+    @classmethod
+    def load(cls, path=REGISTRY_FILE):
+        if not os.path.exists(path):
+            return cls(path=path)
+        return cls(pd.read_csv(path, dtype={"First_Wave": str}), path=path)
+
+    def save(self, path=None):
+        self.table.to_csv(path or self.path, index=False)
+        self.dirty = False
+
+    def fingerprint(self):
+        """
+        登錄表內容的雜湊 (題號對應改變時，讓依賴它的快取失效)。
+        """
+        return hashlib.sha1(self.table.to_csv(index=False).encode("utf-8")).hexdigest()
+
+    def _next_id(self):
+        if self.table.empty:
+            return 1
+        return int(preprocess.q_sort_key(self.table["Question_ID"]).max()) + 1
+
+    def register(self, columns, wave):
+        """
+        將一份表單的欄位 (原始題目文字，依表單順序) 對應到穩定題號。
+        已登錄的文字沿用原題號；新題目依序給新的 Q 編號。回傳題號清單。
+        """
+        ids, new_rows, seen = [], [], {}
+        next_id = self._next_id()
+        for original in columns:
+            text = ingest.normalize_question(original)
+            occ = seen.get(text, 0)
+            seen[text] = occ + 1
+
+            qid = self._lookup.get((text, occ))
+            if qid is None:
+                qid = f"Q{next_id}"
+                next_id += 1
+                self._lookup[(text, occ)] = qid
+                new_rows.append([qid, text, occ, original, str(wave)])
+            ids.append(qid)
+
+        if new_rows:
+            new_table = pd.DataFrame(new_rows, columns=self.COLUMNS)
+            self.table = new_table if self.table.empty else pd.concat([self.table, new_table], ignore_index=True)
+            self.dirty = True
+        return ids
+
+    def alias(self, question_id, original, wave):
+        """
+        手動將改版後的題目文字接回既有題號 (例如題目措辭調整)。
+        """
+        text = ingest.normalize_question(original)
+        self.table = self.table[
+            ~((self.table["Normalized_Text"] == text) & (self.table["Occurrence"] == 0))
+        ]
+        row = pd.DataFrame([[question_id, text, 0, original, str(wave)]], columns=self.COLUMNS)
+        self.table = pd.concat([self.table, row], ignore_index=True)
+        self._rebuild_lookup()
+        self.dirty = True
+
+    def label(self, question_id):
+        """
+        題號最新版本的題目文字。
+        """
+        rows = self.table[self.table["Question_ID"] == question_id]
+        return rows["Original_Column"].iloc[-1] if not rows.empty else question_id
+
+
+# --- 2. 回覆資料庫 ---
+def _int_type(max_code):
+    """
+    能容納 -1 (缺值) 到 max_code 的最小整數型別。
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_code <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _encode(labels, values):
+    """
+    值 -> 代碼 (沿用 labels 中既有的代碼，新的值接在後面)；缺值為 -1。
+    """
+    known = {label: i for i, label in enumerate(labels)}
+    for label in pd.unique(values[pd.notna(values)]):
+        if label not in known:
+            known[label] = len(labels)
+            labels.append(label)
+    codes = pd.Series(values).map(known).fillna(-1).to_numpy(dtype=np.int64)
+    return codes.astype(_int_type(len(labels)))
+
+
+class ResponseStore:
+    """
+    以 (年度, 學校, 填答者, 題目) 為鍵的回覆長表格 (只存有填答的格子)。
+    每加入一份表單就是一個區段 (block)：年度 / 學校只記在區段上 (對應合併後陣列的 start:stop)，
+    不逐格保存。每一格以整數代碼保存，代碼型別依代碼個數取最小的 int8 / int16 / int32：
+    - respondent：同一年度、學校內的填答者序號
+    - question：題號代碼 (對應 self.questions)
+    - option：該題選項文字的代碼 (對應 self.options[題號])
+    - score：該題清理後數值的代碼 (對應 self.scores[題號]，Likert 0-4 等；-1 = 無數值，例如文字題)
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry if registry is not None else QuestionRegistry()
+        self.waves, self.schools, self.questions = [], [], []
+        self.options = {}
+        self.scores = {}
+        self.col_types = {}
+        self.blocks = [] # {"wave", "school", "start", "stop"}：年度 / 學校代碼與格子範圍
+        self._chunks = []
+        self._arrays = None
+
+    @staticmethod
+    def _code(values, item):
+        if item not in values:
+            values.append(item)
+        return values.index(item)
+
+    def add_wave(self, wave, school, df_raw):
+        """
+        加入一份表單匯出 (df_raw 為原始題目文字欄名)。
+        欄位以 QuestionRegistry 轉成穩定題號後，沿用 preprocess 的分類與清理規則。
+        """
+        results = preprocess.run_pipeline(df_raw=df_raw, registry=self.registry, wave=wave)
+        raw, cleaned = results["raw"], results["cleaned"]
+        self.col_types[(wave, school)] = results["col_types"]
+        numeric_cols = set(preprocess.numeric_analysis_columns(results["col_types"]))
+
+        wave_code = self._code(self.waves, wave)
+        school_code = self._code(self.schools, school)
+        respondents = np.arange(len(raw), dtype=_int_type(len(raw)))
+
+        parts = {"respondent": [], "question": [], "option": [], "score": []}
+        for qid in raw.columns:
+            present = raw[qid].notna().to_numpy()
+            if not present.any():
+                continue
+            q_code = self._code(self.questions, qid)
+            n = int(present.sum())
+
+            option_codes = _encode(self.options.setdefault(qid, []), raw[qid][present].astype(str).to_numpy())
+            score_levels = self.scores.setdefault(qid, [])
+            if qid in numeric_cols:
+                score_codes = _encode(score_levels, cleaned[qid].to_numpy(dtype=np.float32)[present])
+            else:
+                score_codes = np.full(n, -1, dtype=np.int8)
+
+            parts["respondent"].append(respondents[present])
+            parts["question"].append(np.full(n, q_code, dtype=np.int16))
+            parts["option"].append(option_codes)
+            parts["score"].append(score_codes)
+
+        chunk = {k: np.concatenate(v) if v else np.array([], dtype=np.int8) for k, v in parts.items()}
+        start = self.blocks[-1]["stop"] if self.blocks else 0
+        self.blocks.append({"wave": wave_code, "school": school_code, "start": start, "stop": start + len(chunk["question"])})
+        self._chunks.append(chunk)
+        self._arrays = None
+        return results
+
+    @property
+    def arrays(self):
+        """
+        所有年度 / 學校合併後的逐格陣列 (dict of NumPy arrays：respondent、question、option、score)，
+        區段 self.blocks 的 start:stop 即為各年度 / 學校的範圍。
+        """
+        if self._arrays is None:
+            keys = ["respondent", "question", "option", "score"]
+            if not self._chunks:
+                self._arrays = {k: np.array([], dtype=np.int8) for k in keys}
+            else:
+                self._arrays = {k: np.concatenate([c[k] for c in self._chunks]) for k in keys}
+                self._chunks = [self._arrays]
+        return self._arrays
+
+    def _groups(self, wave=None, school=None):
+        """
+        符合條件的 (年度代碼, 學校代碼) -> 區段範圍 [(start, stop), ...]。
+        """
+        wave_code = self.waves.index(wave) if wave is not None else None
+        school_code = self.schools.index(school) if school is not None else None
+        groups = {}
+        for block in self.blocks:
+            if wave_code is not None and block["wave"] != wave_code:
+                continue
+            if school_code is not None and block["school"] != school_code:
+                continue
+            groups.setdefault((block["wave"], block["school"]), []).append((block["start"], block["stop"]))
+        return groups
+
+    def _cells(self, ranges, keys):
+        a = self.arrays
+        if len(ranges) == 1:
+            start, stop = ranges[0]
+            return {k: a[k][start:stop] for k in keys}
+        return {k: np.concatenate([a[k][start:stop] for start, stop in ranges]) for k in keys}
+
+    def _score_table(self):
+        """
+        [題號代碼, 數值代碼] -> 數值 的查表 (float32)；最後一行為 NaN，代碼 -1 會對應到這一行。
+        """
+        width = max((len(v) for v in self.scores.values()), default=0) + 1
+        table = np.full((len(self.questions), width), np.nan, dtype=np.float32)
+        for code, qid in enumerate(self.questions):
+            levels = self.scores.get(qid, [])
+            table[code, :len(levels)] = levels
+        return table
+
+    def n_respondents(self, wave=None, school=None):
+        return sum(
+            len(np.unique(self._cells(ranges, ["respondent"])["respondent"]))
+            for ranges in self._groups(wave, school).values()
+        )
+
+    def wide(self, wave, school, kind="score"):
+        """
+        還原某一年度 / 學校的「填答者 x 題號」寬表格。
+        kind="score" 回傳清理後數值；kind="label" 回傳選項文字。
+        """
+        ranges = self._groups(wave, school).get((self.waves.index(wave), self.schools.index(school)), [(0, 0)])
+        cells = self._cells(ranges, ["respondent", "question", "score" if kind == "score" else "option"])
+        respondent = cells["respondent"]
+        question = cells["question"]
+        n_rows = int(respondent.max()) + 1 if len(respondent) else 0
+
+        q_codes = np.unique(question)
+        columns = sorted((self.questions[c] for c in q_codes), key=lambda q: int(q[1:]))
+        col_pos = {self.questions[c]: i for i, c in enumerate(q_codes)}
+        order = [col_pos[q] for q in columns]
+
+        if kind == "score":
+            grid = np.full((n_rows, len(q_codes)), np.nan, dtype=np.float32)
+            grid[respondent, np.searchsorted(q_codes, question)] = self._score_table()[question, cells["score"]]
+            return pd.DataFrame(grid[:, order], columns=columns)
+
+        grid = np.full((n_rows, len(q_codes)), -1, dtype=np.int32)
+        grid[respondent, np.searchsorted(q_codes, question)] = cells["option"]
+        out = {}
+        for i, qid in zip(order, columns):
+            labels = np.array(self.options[qid] + [None], dtype=object)
+            out[qid] = labels[grid[:, i]]  # 代碼 -1 會對應到最後的 None
+        return pd.DataFrame(out)
+
+    def compare(self, questions=None):
+        """
+        跨年度 / 學校比較：每個 (年度, 學校, 題號) 的 N / Mean / SD，逐年度 / 學校在陣列上分組計算。
+        """
+        table = self._score_table()
+        q_codes = None
+        if questions is not None:
+            q_codes = [self.questions.index(q) for q in questions if q in self.questions]
+
+        frames = []
+        for (wave_code, school_code), ranges in sorted(self._groups().items()):
+            cells = self._cells(ranges, ["question", "score"])
+            frame = pd.DataFrame({
+                "question": cells["question"],
+                "score": table[cells["question"], cells["score"]].astype(float),
+            })
+            if q_codes is not None:
+                frame = frame[frame["question"].isin(q_codes)]
+            frame = frame[frame["score"].notna()]
+            stats = frame.groupby("question")["score"].agg(["count", "mean", "std"]).reset_index()
+            stats.insert(0, "school", school_code)
+            stats.insert(0, "wave", wave_code)
+            frames.append(stats)
+
+        columns = ["wave", "school", "Question_ID", "Original_Column", "N", "Mean", "SD"]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        stats = pd.concat(frames, ignore_index=True).rename(columns={"count": "N", "mean": "Mean", "std": "SD"})
+        stats["wave"] = [self.waves[c] for c in stats["wave"]]
+        stats["school"] = [self.schools[c] for c in stats["school"]]
+        stats["Question_ID"] = [self.questions[c] for c in stats["question"]]
+        stats["Original_Column"] = stats["Question_ID"].map(self.registry.label)
+        return stats[columns]
+
+    def memory_usage(self):
+        """
+        陣列所占的位元組數 (不含選項文字與數值的字典)。
+        """
+        return sum(arr.nbytes for arr in self.arrays.values())
+
+
+def load_store(sources=None, registry_path=REGISTRY_FILE):
+    """
+    依 SURVEY_SOURCES 載入所有年度 / 學校的表單，回傳 ResponseStore。
+    有 schema 的來源先驗證欄位 (欄位順序改變時依題目文字重新對應)。
+    有新題目時會更新題號登錄表檔案。
+    """
+    registry = QuestionRegistry.load(registry_path)
+    response_store = ResponseStore(registry)
+    for source in sources or SURVEY_SOURCES:
+        schema = pd.read_csv(source["schema"]) if source.get("schema") else None
+        df_raw, _ = ingest.read_export(source["path"], schema)
+        response_store.add_wave(source["wave"], source["school"], df_raw)
+    if registry.dirty:
+        registry.save()
+    return response_store
@@ -0,0 +1,284 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 合成問卷資料產生器 (效能測試用)
+# 以實際的表單匯出檔為範本，逐欄建立「題型設定」(profile)，再依設定抽樣出任意人數的回覆：
+# (1) 評分題 (Likert 文字、數字、Q31-Q33、Q4 / Q100 特殊編碼)：依實際的選項分配抽樣，
+#     並共用一個「整體敬業度」潛在因素，讓相關 / 迴歸篩選有真實的訊號
+# (2) 類別題 (Q2 組別、Q3 職稱...)：依實際的選項分配獨立抽樣
+# (3) 開放題：以實際回覆切成的短句重新組合 (長度分佈接近真實，可測斷詞效能)
+# (4) Q1 時間戳記：在實際的填答期間內依序遞增 (與表單匯出格式相同)
+# 產出的 CSV 與表單匯出檔格式相同，可直接交給 preprocess / aggregator / ingest 讀取。
+# 執行方式: python synthetic.py <人數> [--out synthetic.csv] [--seed 2025]
+# ---------------------------------------------------------------
+
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+import ingest
+import preprocess
+
+# --- 設定 ---
+SYNTHETIC_SEED = 2025
+SYNTHETIC_CHUNK_ROWS = 50_000 # 每批產生並寫出的列數 (10^6 人時不需一次放進記憶體)
+LATENT_LOADING = 0.6 # 評分題與潛在因素的相關程度 (0 = 各題獨立)
+OPTION_SMOOTHING = 0.5 # 每個選項的次數再加上這個值，讓樣本中沒出現的選項也有機會被抽到
+TEXT_POOL_SIZE = 5_000 # 每個開放題先組好這麼多則回覆再抽樣 (大量產生時不必逐則組句)
+FRAGMENT_PATTERN = r"[，。！？；\n,.!?;]+"
+
+TIMESTAMP_FORMAT = "{year}/{month}/{day} {half} {hour}:{minute:02d}:{second:02d}"
+
+
+def _timestamp_strings(times):
+    """
+    時間轉成 Google 表單的格式，例如 "2025/10/8 下午 1:26:10"。
+    """
+    out = []
+    for t in times:
+        hour = t.hour % 12 or 12
+        out.append(TIMESTAMP_FORMAT.format(
+            year=t.year, month=t.month, day=t.day, half="上午" if t.hour < 12 else "下午",
+            hour=hour, minute=t.minute, second=t.second,
+        ))
+    return out
+
+
+def _option_probs(counts):
+    weights = np.asarray(counts, dtype=float) + OPTION_SMOOTHING
+    return weights / weights.sum()
+
+
+def _ordinal_spec(column, non_na, order=None):
+    """
+    評分題：可排序的選項 (依分數) + 不計分的其他選項 (例如「我不理解這項 KIST 教學特色」)。
+    order：指定選項順序 (Q4 / Q100 的編碼表)；否則數字依大小、Likert 文字依開頭數字排序。
+    """
+    counts = non_na.value_counts()
+    if order is not None:
+        ordered = list(order)
+        extras = [o for o in counts.index if o not in set(order)]
+    elif pd.api.types.is_numeric_dtype(non_na):
+        values = sorted(counts.index)
+        if all(float(v).is_integer() for v in values):
+            values = list(range(int(min(values)), int(max(values)) + 1))
+        ordered, extras = values, []
+    else:
+        scored = [o for o in counts.index if re.match(preprocess.LIKERT_PATTERN, str(o))]
+        ordered = sorted(scored, key=lambda o: int(re.match(r"^\s*(\d+)", o).group(1)))
+        extras = [o for o in counts.index if o not in set(scored)]
+    return {
+        "column": column,
+        "kind": "ordinal",
+        "options": ordered,
+        "probs": _option_probs([counts.get(o, 0) for o in ordered]),
+        "extras": extras,
+        "extra_rate": counts[extras].sum() / len(non_na) if extras else 0.0,
+        "extra_probs": _option_probs(counts[extras].to_numpy()) if extras else None,
+    }
+
+
+def _text_spec(column, non_na):
+    """
+    開放題：把實際回覆切成短句，記錄每則回覆的句數，產生時再隨機組合。
+    """
+    answers = non_na.astype(str)
+    pieces = answers.str.split(FRAGMENT_PATTERN, regex=True)
+    pieces = pieces.apply(lambda parts: [p.strip() for p in parts if p.strip()])
+    fragments = [p for parts in pieces for p in parts] or list(answers)
+    return {
+        "column": column,
+        "kind": "text",
+        "fragments": fragments,
+        "mean_fragments": max(pieces.str.len().mean(), 1.0),
+    }
+
+
+def survey_profile(path=preprocess.RAW_FILE):
+    """
+    讀取實際的表單匯出檔，回傳每一欄的產生設定 (list of dict，順序與原始標頭相同)。
+    題型沿用 preprocess.classify_columns 的分類，缺值比例與選項分配取自實際資料。
+    """
+    df_raw = preprocess.load_raw(path)
+    header = ingest.read_header(path)
+    renamed = df_raw.copy()
+    renamed.columns = [f"Q{i}" for i in range(1, len(df_raw.columns) + 1)]
+    col_types = preprocess.classify_columns(renamed)
+    kinds = {col: kind for kind, cols in col_types.items() for col in cols}
+
+    profile = []
+    for q_id, column in zip(renamed.columns, header):
+        series = renamed[q_id]
+        non_na = series.dropna()
+        kind = kinds.get(q_id)
+        if q_id == "Q1":
+            times = preprocess.parse_timestamps(non_na).dropna()
+            spec = {"column": column, "kind": "timestamp", "start": times.min(), "end": times.max()}
+        elif q_id == "Q4":
+            spec = _ordinal_spec(column, non_na, order=list(preprocess.Q4_ENCODING))
+        elif q_id == "Q100":
+            spec = _ordinal_spec(column, non_na, order=list(preprocess.Q100_ENCODING))
+        elif kind in ("numeric", "likert_text", "custom_likert", "custom_numeric"):
+            spec = _ordinal_spec(column, non_na)
+        elif kind == "qualitative":
+            spec = _text_spec(column, non_na)
+        else:
+            # 類別題 (或整欄空白)：只抽實際出現過的選項，維持「選項數少」的分類
+            counts = non_na.value_counts()
+            spec = {
+                "column": column,
+                "kind": "categorical",
+                "options": list(counts.index),
+                "probs": _option_probs(counts.to_numpy()) if len(counts) else None,
+            }
+        spec["missing"] = 1 - len(non_na) / len(series) if len(series) else 0.0
+        profile.append(spec)
+    return profile
+
+
+def _text_pool(spec, rng, size):
+    fragments = spec["fragments"]
+    n_parts = 1 + rng.poisson(spec["mean_fragments"] - 1, size=size)
+    picks = rng.integers(0, len(fragments), size=n_parts.sum())
+    bounds = np.concatenate([[0], np.cumsum(n_parts)])
+    return np.array(
+        ["，".join(fragments[j] for j in picks[bounds[i]:bounds[i + 1]]) for i in range(size)],
+        dtype=object,
+    )
+
+
+def _sample_chunk(profile, n, start, total, rng, first):
+    """
+    產生第 start ~ start + n 列 (total 為總人數，用來分配時間戳記)。
+    first=True 時第一列的評分題一律填可計分的選項：preprocess 以第一個非空值判斷 Likert 欄位。
+    """
+    latent = rng.standard_normal(n)
+    noise_scale = np.sqrt(1 - LATENT_LOADING ** 2)
+    columns = {}
+    for spec in profile:
+        kind = spec["kind"]
+        if kind == "timestamp":
+            span = (spec["end"] - spec["start"]).total_seconds()
+            offsets = (start + np.arange(n) + rng.random(n)) / max(total, 1) * span
+            values = np.array(_timestamp_strings(spec["start"] + pd.to_timedelta(offsets, unit="s")), dtype=object)
+        elif kind == "ordinal":
+            # 潛在分數 -> 近似常態的累積機率 (logistic 近似 Φ) -> 依選項的累積分配切點對應
+            score = LATENT_LOADING * latent + noise_scale * rng.standard_normal(n)
+            u = 1 / (1 + np.exp(-1.702 * score))
+            cuts = np.cumsum(spec["probs"])[:-1]
+            values = np.asarray(spec["options"], dtype=object)[np.searchsorted(cuts, u)]
+            if spec["extras"]:
+                extra = rng.random(n) < spec["extra_rate"]
+                if first:
+                    extra[0] = False
+                picks = rng.choice(len(spec["extras"]), size=int(extra.sum()), p=spec["extra_probs"])
+                values[extra] = np.asarray(spec["extras"], dtype=object)[picks]
+        elif kind == "text":
+            pool = _text_pool(spec, rng, min(n, TEXT_POOL_SIZE))
+            values = pool[rng.integers(0, len(pool), size=n)]
+        elif spec["probs"] is None:
+            values = np.full(n, None, dtype=object)
+        else:
+            values = np.asarray(spec["options"], dtype=object)[
+                rng.choice(len(spec["options"]), size=n, p=spec["probs"])
+            ]
+
+        if kind != "timestamp" and spec["missing"] > 0:
+            values = values.copy()
+            missing = rng.random(n) < spec["missing"]
+            if first and kind == "ordinal":
+                missing[0] = False
+            values[missing] = None
+        columns[len(columns)] = values
+
+    df = pd.DataFrame(columns)
+    df.columns = [spec["column"] for spec in profile]
+    return df
+
+
+def question_variants(texts, n, seed=SYNTHETIC_SEED, edit_rate=0.1):
+    """
+    模糊比對測試用的題目文字：由 texts 隨機挑題，並以約 edit_rate 比例的字元做刪除 / 替換 / 插入
+    (模擬不同年度或學校版本的措辭修改)。回傳 n 個字串。
+    """
+    rng = np.random.default_rng(seed)
+    texts = list(texts)
+    alphabet = "".join(dict.fromkeys("".join(texts)))
+    out = []
+    for i in rng.integers(0, len(texts), size=n):
+        chars = list(texts[i])
+        for pos in sorted(rng.choice(len(chars), size=int(len(chars) * edit_rate), replace=False), reverse=True):
+            op = rng.integers(3)
+            if op == 0:
+                del chars[pos]
+            elif op == 1:
+                chars[pos] = alphabet[rng.integers(len(alphabet))]
+            else:
+                chars.insert(pos, alphabet[rng.integers(len(alphabet))])
+        out.append("".join(chars))
+    return out
+
+
+def iter_chunks(n, profile=None, seed=SYNTHETIC_SEED, chunk_rows=SYNTHETIC_CHUNK_ROWS):
+    """
+    逐批產生 n 位受訪者的回覆 (DataFrame，欄位為原始題目文字)。
+    每一批使用由 seed 衍生的獨立亂數流，同樣的 (n, seed, chunk_rows) 每次產生相同的資料。
+    """
+    profile = survey_profile() if profile is None else profile
+    starts = list(range(0, n, chunk_rows))
+    streams = np.random.SeedSequence(seed).spawn(len(starts))
+    for start, stream in zip(starts, streams):
+        size = min(chunk_rows, n - start)
+        yield _sample_chunk(profile, size, start, n, np.random.default_rng(stream), first=start == 0)
+
+
+def generate(n, profile=None, seed=SYNTHETIC_SEED):
+    """
+    一次產生 n 位受訪者的回覆 (適合小量資料；大量請用 write_csv)。
+    """
+    return pd.concat(list(iter_chunks(n, profile, seed)), ignore_index=True)
+
+
+def write_csv(path, n, profile=None, seed=SYNTHETIC_SEED, chunk_rows=SYNTHETIC_CHUNK_ROWS):
+    """
+    分批產生並寫出與表單匯出檔相同格式的 CSV (UTF-8 BOM)，回傳寫出的列數。
+    """
+    rows = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        for chunk in iter_chunks(n, profile, seed, chunk_rows):
+            chunk.to_csv(f, index=False, header=rows == 0)
+            rows += len(chunk)
+    return rows
+
+
+VALUE_OPTIONS = ("--out", "--seed") # 後面接一個值的選項
+
+
+def _option(name, default):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def _positional():
+    # 依位置解析：選項後面的值不算位置參數 (人數與 --seed / --out 的值相同時也不會被略過)
+    args, values = [], set()
+    for i, arg in enumerate(sys.argv[1:], start=1):
+        if arg in VALUE_OPTIONS:
+            values.add(i + 1)
+        elif not arg.startswith("--") and i not in values:
+            args.append(arg)
+    return args
+
+
+if __name__ == "__main__":
+    args = _positional()
+    out = _option("--out", "synthetic.csv")
+    seed = int(_option("--seed", SYNTHETIC_SEED))
+    if not args:
+        print("用法: python synthetic.py <人數> [--out synthetic.csv] [--seed 2025]")
+        sys.exit(2)
+
+    n = int(float(args[0])) # 可寫成 1e6
+    rows = write_csv(out, n, seed=seed)
+    print(f"已產生 {rows} 位受訪者的合成回覆: {out}")
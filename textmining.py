@@ -0,0 +1,231 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 質性回饋斷詞與詞雲
+# (1) 所有質性題目一次斷詞 (jieba cut_for_search)，回覆很多時以多個行程平行處理
+# (2) 每題的詞頻表依「該題回覆內容的雜湊」存到 .survey_cache/text/，
+#     回覆沒變就直接讀回，不必載入 jieba 詞典
+# (3) 詞雲圖片 (PNG) 也依相同的鍵快取，重複點選立即顯示
+# ---------------------------------------------------------------
+
+import hashlib
+import io
+import os
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import datacache
+
+# --- 設定 ---
+TEXT_CACHE_DIR = os.path.join(datacache.CACHE_DIR, "text")
+# 停用詞或斷詞規則有變動時請遞增，舊的詞頻表與詞雲會自動失效
+TEXT_CACHE_VERSION = 1
+# 待斷詞的回覆超過此筆數才使用多行程 (行程啟動與載入詞典本身約需 1 秒)
+PARALLEL_MIN_ANSWERS = 2000
+TOKENIZE_WORKERS = None # None = CPU 數
+# 記憶體中保留的詞頻表 / 詞雲數量 (LRU；回覆更新後舊內容的鍵不會再被使用，逐漸被淘汰)
+TERMS_CACHE_MAX_ITEMS = 128
+IMAGE_CACHE_MAX_ITEMS = 32
+
+# [真正正確的清單 v5.1，基於 codebook.csv]
+# (包含 Q105, Q108; 排除 Q106, Q107)
+QUALITATIVE_Q_NUMBERS = [
+    "Q13",  # 承上題，如有「其他」原因...
+    "Q42",  # 請描述或形容後台與學校協作的關係？
+    "Q43",  # 與學校協作方式，做什麼樣的改變...
+    "Q44",  # 針對 KIST 聯盟，我想要許願...
+    "Q45",  # 針對聯盟協作經驗，我想要補充...
+    "Q70",  # 我最喜歡 誠致 的地方是：
+    "Q71",  # 如果調整或改變這些事情...
+    "Q72",  # 相較過去我待過的組織...[更好]
+    "Q73",  # 相較過去我待過的組織...[需要加強]
+    "Q83",  # 誠致 所提供的 職場體驗，做什麼樣的改變...
+    "Q95",  # 我目前工作上，最有意義感或持續成長的時刻？
+    "Q102", # 對於自己在 誠致 的發展規劃與許願？
+    "Q105", # 歡迎補充上一題滿意度評分的原因是？
+    "Q107", #針對 誠致，我想要許願（非必填）
+    "Q108"  # 最後，我還想說（非必填）
+]
+
+# 中文停用詞 (Stop Words)
+STOP_WORDS = frozenset([
+    "的", "了", "我", "你", "他", "她", "我們", "你們", "他們", "她們",
+    "是", "在", "有", "也", "會", "就", "都", "還", "與", "和", "或",
+    "一個", "一些", "這個", "那個", "這些", "那些", "可以", "可能",
+    "覺得", "希望", "比較", "如果", "但", "但是", "所以", "因為",
+    "不", "沒", "太", "很", "更", "最",
+    " ", "\n", "nan"
+])
+
+
+def _tokenize_batch(texts):
+    """
+    斷詞並過濾停用詞與單字詞，回傳每筆回覆的詞彙清單 (也是子行程的工作函式)。
+    """
+    import jieba # 延後載入：詞頻表已快取時完全不需要 jieba
+
+    return [
+        [word for word in jieba.cut_for_search(text) if word not in STOP_WORDS and len(word.strip()) > 1]
+        for text in texts
+    ]
+
+
+def tokenize(texts, workers=TOKENIZE_WORKERS):
+    """
+    對多筆回覆斷詞；筆數多時切成數批交給行程池平行處理。
+    """
+    texts = list(texts)
+    if len(texts) < PARALLEL_MIN_ANSWERS:
+        return _tokenize_batch(texts)
+
+    n_workers = workers or os.cpu_count() or 1
+    size = -(-len(texts) // n_workers)
+    batches = [texts[i:i + size] for i in range(0, len(texts), size)]
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        return [tokens for batch in pool.map(_tokenize_batch, batches) for tokens in batch]
+
+
+def answers(df_raw, question_id):
+    """
+    某一題所有非空回覆 (轉成字串)。
+    """
+    return [str(item) for item in df_raw[question_id].dropna().tolist()]
+
+
+def corpus_key(texts):
+    """
+    回覆內容的雜湊 (內容不變 = 詞頻與詞雲不變)。
+    """
+    hasher = hashlib.sha1(f"v{TEXT_CACHE_VERSION}".encode("utf-8"))
+    for text in texts:
+        hasher.update(text.encode("utf-8"))
+        hasher.update(b"\x1f")
+    return hasher.hexdigest()[:16]
+
+
+class TextMiner:
+    """
+    詞頻表與詞雲的兩層快取 (記憶體 + 磁碟)，所有使用者共用。
+    記憶體層為 LRU (最多 max_terms 個詞頻表、max_images 張詞雲)，被淘汰的項目仍可從磁碟讀回。
+    """
+
+    def __init__(self, cache_dir=TEXT_CACHE_DIR, max_terms=TERMS_CACHE_MAX_ITEMS, max_images=IMAGE_CACHE_MAX_ITEMS):
+        self.cache_dir = cache_dir
+        self.max_terms = max_terms
+        self.max_images = max_images
+        self._terms = OrderedDict() # corpus_key -> DataFrame[Term, Count]
+        self._images = OrderedDict() # (corpus_key, 字體, 寬, 高) -> PNG bytes
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _recall(self, entries, key):
+        with self._lock:
+            value = entries.get(key)
+            if value is not None:
+                entries.move_to_end(key)
+            return value
+
+    def _remember(self, entries, key, value, max_items):
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > max_items:
+                entries.popitem(last=False)
+
+    def _load_terms(self, key):
+        terms = self._recall(self._terms, key)
+        if terms is not None:
+            return terms
+        try:
+            terms = pd.read_csv(
+                self._path(f"terms_{key}.csv"), dtype={"Term": str, "Count": int}, keep_default_na=False
+            )
+        except FileNotFoundError:
+            return None
+        self._remember(self._terms, key, terms, self.max_terms)
+        return terms
+
+    def _save_terms(self, key, terms):
+        self._remember(self._terms, key, terms, self.max_terms)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(f"terms_{key}.csv")
+        terms.to_csv(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+
+    def prepare(self, df_raw, questions=QUALITATIVE_Q_NUMBERS):
+        """
+        確保每一題都有詞頻表：只把「快取中沒有」的題目的回覆集中起來一次斷詞。
+        回傳 {題號: corpus_key}。
+        """
+        keys, pending = {}, {}
+        for qid in questions:
+            if qid not in df_raw.columns:
+                continue
+            texts = answers(df_raw, qid)
+            keys[qid] = corpus_key(texts)
+            if self._load_terms(keys[qid]) is None:
+                pending[qid] = texts
+
+        if pending:
+            all_texts = [text for texts in pending.values() for text in texts]
+            all_tokens = iter(tokenize(all_texts))
+            for qid, texts in pending.items():
+                counts = Counter()
+                for _ in texts:
+                    counts.update(next(all_tokens))
+                terms = pd.DataFrame(counts.most_common(), columns=["Term", "Count"])
+                self._save_terms(keys[qid], terms)
+        return keys
+
+    def term_frequencies(self, df_raw, question_id):
+        """
+        某一題的詞頻表 (Term, Count，依次數由高到低)。
+        """
+        key = self.prepare(df_raw, [question_id])[question_id]
+        return self._load_terms(key)
+
+    def wordcloud_png(self, df_raw, question_id, font_path, width=800, height=400):
+        """
+        某一題的詞雲 PNG (bytes)；沒有任何詞彙時回傳 None。
+        以詞頻表直接產生 (不再把詞彙串回長字串重新切割)，結果依 (內容, 字體) 快取。
+        """
+        if not os.path.exists(font_path):
+            raise FileNotFoundError(font_path)
+        terms = self.term_frequencies(df_raw, question_id)
+        if terms.empty:
+            return None
+
+        key = corpus_key(answers(df_raw, question_id))
+        font_name = os.path.basename(font_path)
+        image_key = (key, font_name, width, height)
+        png = self._recall(self._images, image_key)
+        if png is not None:
+            return png
+
+        path = self._path(f"wordcloud_{key}_{font_name}_{width}x{height}.png")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                png = f.read()
+        else:
+            from wordcloud import WordCloud
+
+            wc = WordCloud(
+                font_path=font_path,
+                width=width,
+                height=height,
+                background_color="white",
+                collocations=False,
+            ).generate_from_frequencies(dict(zip(terms["Term"], terms["Count"])))
+            buffer = io.BytesIO()
+            wc.to_image().save(buffer, format="PNG")
+            png = buffer.getvalue()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(png)
+            os.replace(path + ".tmp", path)
+
+        self._remember(self._images, image_key, png, self.max_images)
+        return png
@@ -0,0 +1,259 @@
+# ---------------------------------------------------------------
+# 誠致 敬業度調查 - 質性回饋全文檢索 (倒排索引，SQLite)
+# (1) 所有開放題 (textmining.QUALITATIVE_Q_NUMBERS) 的回覆切成中文字的二字組 (bigram)，
+#     建立「二字組 -> 回覆」的倒排索引，存在 .survey_cache/search/ 的 SQLite 檔
+#     (不用 jieba 斷詞：內建的簡體詞典常把繁體詞切開，例如「老師」，以詞彙建索引會漏掉回覆)
+# (2) 有新回覆時只處理新增 / 內容有改動的回覆 (依資料版本判斷是否需要比對)
+# (3) 查詢：關鍵字與 "片語" / 「片語」 都以原文是否出現比對 (關鍵字各自出現即可，順序不限)，
+#     關鍵字的二字組先以倒排索引縮小範圍，
+#     可依題目與 Q2 組別 / Q4 年資篩選，結果在資料庫中排序 (題號 / 填答時間 / 字數) 與分頁，
+#     只取回目前這一頁 (Dashboard 的回饋瀏覽也以此分頁，不必把整題的回覆送到瀏覽器)
+# ---------------------------------------------------------------
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+
+import pandas as pd
+
+import datacache
+import preprocess
+import textmining
+
+# --- 設定 ---
+SEARCH_CACHE_DIR = os.path.join(datacache.CACHE_DIR, "search")
+# 索引的切分方式或格式有變動時請遞增，舊的索引會自動重建
+SEARCH_INDEX_VERSION = 3
+SEARCH_PAGE_SIZE = 20
+# 可篩選的分群維度 (回覆的組別標籤一起存進索引)
+FILTER_DIMENSIONS = ["Q2", "Q4_grouped"]
+
+CJK_PATTERN = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]+") # 連續的中文字 (切成二字組建索引)
+QUERY_PATTERN = re.compile(r'"([^"]+)"|「([^」]+)」|“([^”]+)”|(\S+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id INTEGER PRIMARY KEY,
+    row INTEGER NOT NULL,            -- df_raw 的列號
+    question TEXT NOT NULL,          -- 題號
+    q_order INTEGER NOT NULL,        -- 題號的數字 (排序用)
+    text TEXT NOT NULL,
+    submitted TEXT,                  -- Q1 填答時間 (ISO 格式，可直接排序)
+    q2 TEXT,
+    q4_grouped TEXT,
+    UNIQUE (row, question)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+DOC_COLUMNS = ["row", "question", "text", "submitted"] + [d.lower() for d in FILTER_DIMENSIONS]
+RESULT_COLUMNS = ["Row", "New_Column", "Text", "Submitted"]
+# 排序方式 -> ORDER BY (同分時依題號、列號，分頁結果才穩定)
+SORT_ORDERS = {
+    "question": "q_order, row",
+    "newest": "submitted DESC, q_order, row",
+    "oldest": "submitted, q_order, row",
+    "longest": "length(text) DESC, q_order, row",
+    "shortest": "length(text), q_order, row",
+}
+TIMESTAMP_COLUMN = "Q1"
+
+
+def _bigrams(text):
+    """
+    文字中每一段連續中文字的二字組 (去除重複)，例如「老師很好」-> 老師、師很、很好。
+    """
+    return sorted({run[i:i + 2] for run in CJK_PATTERN.findall(text) for i in range(len(run) - 1)})
+
+
+def index_path(source_path, cache_dir=SEARCH_CACHE_DIR):
+    """
+    來源檔對應的索引檔路徑 (每個來源一個 SQLite 檔)。
+    """
+    key = hashlib.sha1(os.path.abspath(source_path).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"feedback_{key}.sqlite")
+
+
+def parse_query(query):
+    """
+    拆解查詢字串，回傳 (關鍵字 list, 片語 list)。以雙引號或「」括住的是片語，其餘以空白分隔為關鍵字。
+    """
+    keywords, phrases = [], []
+    for match in QUERY_PATTERN.finditer(query or ""):
+        phrase = match.group(1) or match.group(2) or match.group(3)
+        if phrase and phrase.strip():
+            phrases.append(phrase.strip())
+        elif match.group(4):
+            keywords.append(match.group(4))
+    return keywords, phrases
+
+
+def highlight_terms(query):
+    """
+    要在結果中標示的字串 (關鍵字與片語原文，長的優先)。
+    """
+    keywords, phrases = parse_query(query)
+    return sorted(set(keywords + phrases), key=len, reverse=True)
+
+
+def highlight(text, terms):
+    """
+    以 Markdown 粗體標示 text 中的 terms (不分大小寫)。單次比對：重疊時取最長的字串，不會產生巢狀的 **。
+    """
+    if not terms:
+        return text
+    pattern = re.compile("|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    return pattern.sub(lambda m: f"**{m.group(0)}**", text)
+
+
+class FeedbackIndex:
+    """
+    開放題回覆的倒排索引。同一個實例可給多個使用者共用 (內部以鎖保護資料庫連線)。
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        if self._meta("index_version") != str(SEARCH_INDEX_VERSION):
+            # 格式不同：整個重建 (舊版的資料表欄位可能不同)
+            self.conn.executescript("DROP TABLE postings; DROP TABLE documents; DROP TABLE meta;")
+            self.conn.executescript(SCHEMA)
+            self._set_meta("index_version", SEARCH_INDEX_VERSION)
+
+    def close(self):
+        self.conn.close()
+
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def _set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, str(value)),
+            )
+
+    @staticmethod
+    def _documents(df_raw, df_cleaned, questions):
+        """
+        目前資料中的所有開放題回覆 (長表格：row, question, text, submitted, 各篩選維度的組別)。
+        """
+        questions = [q for q in questions if q in df_raw.columns]
+        texts = df_raw[questions].astype("string").apply(lambda s: s.str.strip())
+        long = texts.melt(ignore_index=False, var_name="question", value_name="text").dropna(subset=["text"])
+        long = long[long["text"] != ""]
+        long["row"] = long.index.astype("int64")
+        if TIMESTAMP_COLUMN in df_raw.columns:
+            submitted = preprocess.parse_timestamps(df_raw[TIMESTAMP_COLUMN]).dt.strftime("%Y-%m-%d %H:%M:%S")
+            long["submitted"] = submitted.reindex(long.index).astype("string").to_numpy()
+        else:
+            long["submitted"] = pd.array([pd.NA] * len(long), dtype="string")
+        for dim in FILTER_DIMENSIONS:
+            labels = preprocess.dimension_values(df_cleaned, dim)
+            long[dim.lower()] = labels.reindex(long.index).astype("string").to_numpy()
+        return long[DOC_COLUMNS].reset_index(drop=True)
+
+    def refresh(self, df_raw, df_cleaned, version=None, questions=textmining.QUALITATIVE_Q_NUMBERS):
+        """
+        讓索引與目前的資料一致：新增 / 內容或組別有改動的回覆重新建索引，消失的回覆移除。
+        version (例如 SurveyStream.data_version) 與上次相同時直接跳過。回傳變動的回覆數。
+        """
+        with self._lock:
+            if version is not None and self._meta("data_version") == str(version):
+                return 0
+
+            current = self._documents(df_raw, df_cleaned, questions)
+            stored = pd.read_sql_query(f"SELECT doc_id, {', '.join(DOC_COLUMNS)} FROM documents", self.conn)
+            merged = current.merge(stored, on=DOC_COLUMNS, how="outer", indicator=True)
+            added = merged[merged["_merge"] == "left_only"]
+            removed = merged.loc[merged["_merge"] == "right_only", "doc_id"].astype("int64").tolist()
+
+            # 同一段文字只切一次 (例如「無」、「目前沒有」)
+            tokens = {text: _bigrams(text) for text in dict.fromkeys(added["text"])}
+
+            with self.conn:
+                if removed:
+                    self.conn.executemany("DELETE FROM postings WHERE doc_id = ?", [(d,) for d in removed])
+                    self.conn.executemany("DELETE FROM documents WHERE doc_id = ?", [(d,) for d in removed])
+                for doc in added.to_dict("records"):
+                    values = [None if pd.isna(doc[c]) else doc[c] for c in DOC_COLUMNS]
+                    values[0] = int(doc["row"])
+                    cursor = self.conn.execute(
+                        f"INSERT INTO documents ({', '.join(DOC_COLUMNS)}, q_order) "
+                        f"VALUES ({', '.join('?' * (len(DOC_COLUMNS) + 1))})",
+                        values + [int(re.sub(r"\D", "", doc["question"]) or 0)],
+                    )
+                    self.conn.executemany(
+                        "INSERT INTO postings (term, doc_id) VALUES (?, ?)",
+                        [(term, cursor.lastrowid) for term in tokens[doc["text"]]],
+                    )
+            if version is not None:
+                self._set_meta("data_version", version)
+            return len(added) + len(removed)
+
+    def _where(self, query, questions, filters):
+        """
+        查詢條件 (SQL WHERE 子句與參數)：每個關鍵字與片語都要出現在回覆的原文中 (不分大小寫)。
+        關鍵字的二字組都必須在回覆中 (倒排索引)，先以此縮小範圍再比對原文；
+        單一中文字或英數字的關鍵字沒有二字組，直接比對原文。
+        """
+        keywords, phrases = parse_query(query)
+        terms = list(dict.fromkeys(t for keyword in keywords for t in _bigrams(keyword)))
+        clauses, params = [], []
+        if terms:
+            intersect = " INTERSECT ".join(["SELECT doc_id FROM postings WHERE term = ?"] * len(terms))
+            clauses.append(f"doc_id IN ({intersect})")
+            params += terms
+        for text in keywords + phrases:
+            clauses.append("instr(lower(text), ?) > 0")
+            params.append(text.lower())
+        if questions:
+            clauses.append(f"question IN ({', '.join('?' * len(questions))})")
+            params += list(questions)
+        for dim, groups in (filters or {}).items():
+            if groups:
+                clauses.append(f"{dim.lower()} IN ({', '.join('?' * len(groups))})")
+                params += list(groups)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, query="", questions=None, filters=None):
+        """
+        符合條件的回覆數 (不取回內容)。
+        """
+        where, params = self._where(query, questions, filters)
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM documents{where}", params).fetchone()[0]
+
+    def search(self, query="", questions=None, filters=None, page=1, page_size=SEARCH_PAGE_SIZE,
+               sort="question"):
+        """
+        全文檢索 (查詢字串為空時列出所有回覆)。
+        questions：只搜尋這些題號；filters：{分群維度: [組別, ...]}，例如 {"Q2": ["教學發展"]}；
+        sort：SORT_ORDERS 中的排序方式 (題號 / 填答時間新舊 / 字數多寡)。
+        回傳 (該頁的結果 DataFrame[Row, New_Column, Text, Submitted]，符合的總筆數)。
+        """
+        where, params = self._where(query, questions, filters)
+        offset = (max(int(page), 1) - 1) * page_size
+        with self._lock:
+            total = self.conn.execute(f"SELECT COUNT(*) FROM documents{where}", params).fetchone()[0]
+            rows = self.conn.execute(
+                f"SELECT row, question, text, submitted FROM documents{where} "
+                f"ORDER BY {SORT_ORDERS[sort]} LIMIT ? OFFSET ?",
+                params + [page_size, offset],
+            ).fetchall()
+        return pd.DataFrame(rows, columns=RESULT_COLUMNS), total